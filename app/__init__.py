@@ -8,6 +8,7 @@ from flask_sqlalchemy import SQLAlchemy
 from core.configuration.configuration import get_app_version
 from core.managers.config_manager import ConfigManager
 from core.managers.error_handler_manager import ErrorHandlerManager
+from core.managers.job_manager import JobManager
 from core.managers.logging_manager import LoggingManager
 from core.managers.module_manager import ModuleManager
 
@@ -30,6 +31,10 @@ def create_app(config_name="development"):
     db.init_app(app)
     migrate.init_app(app, db)
 
+    # Initialize background jobs (backend + status endpoint)
+    job_manager = JobManager(app)
+    job_manager.init_jobs()
+
     # Register modules
     module_manager = ModuleManager(app)
     module_manager.register_modules()
@@ -1,9 +1,13 @@
 from app import db
 from datetime import datetime
-from app.modules.dataset.models import Author
+from sqlalchemy import event
+from app.modules.dataset.models import BaseDataset
 from app.modules.dataset.models import DataSet
 
 class Comments(db.Model):
+    # Los comentarios de un dataset se listan por fecha (paginación por clave)
+    __table_args__ = (db.Index("ix_comments_dataset_id_date_posted", "dataset_id", "date_posted"),)
+
     id = db.Column(db.Integer, primary_key=True)
 
     # Relación con Author
@@ -19,3 +23,21 @@ class Comments(db.Model):
 
     def __repr__(self):
         return f'Comments<{self.author.name} on DataSet {self.dataset_id}>'
+
+
+def update_comments_count(connection, dataset_id, delta):
+    data_set = BaseDataset.__table__
+    connection.execute(
+        data_set.update().where(data_set.c.id == dataset_id).values(comments_count=data_set.c.comments_count + delta)
+    )
+
+
+# El contador se actualiza en la misma transacción que el comentario
+@event.listens_for(Comments, "after_insert")
+def _count_comment(mapper, connection, target):
+    update_comments_count(connection, target.dataset_id, 1)
+
+
+@event.listens_for(Comments, "after_delete")
+def _uncount_comment(mapper, connection, target):
+    update_comments_count(connection, target.dataset_id, -1)
@@ -1,3 +1,6 @@
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+
 from app.modules.comments.models import Comments
 from core.repositories.BaseRepository import BaseRepository
 
@@ -5,3 +8,19 @@ from core.repositories.BaseRepository import BaseRepository
 class CommentsRepository(BaseRepository):
     def __init__(self):
         super().__init__(Comments)
+
+    def page(self, dataset_id: int, cursor=None, limit: int = 20) -> list:
+        """Comments of a dataset, newest first, posted before ``cursor`` = ``(date_posted, id)``.
+
+        Uses the (dataset_id, date_posted) index and loads the authors in the same query.
+        """
+        query = self.model.query.filter(self.model.dataset_id == dataset_id).options(joinedload(self.model.author))
+        if cursor is not None:
+            posted, comment_id = cursor
+            query = query.filter(
+                or_(
+                    self.model.date_posted < posted,
+                    and_(self.model.date_posted == posted, self.model.id < comment_id),
+                )
+            )
+        return query.order_by(self.model.date_posted.desc(), self.model.id.desc()).limit(limit).all()
@@ -1,4 +1,4 @@
-from flask import render_template, request, redirect, url_for, flash
+from flask import jsonify, render_template, request, redirect, url_for
 from app.modules.comments import comments_bp
 from app.modules.comments.models import Comments 
 from flask_login import current_user, login_required
@@ -6,9 +6,41 @@ from app import db
 from app.modules.dataset.models import DataSet
 from app.modules.comments.models import Comments
 from app.modules.comments.services import CommentsService
-from app.modules.dataset.services import DataSetService
+from app.modules.dataset.detail import DatasetDetailService
 comments_service = CommentsService()
 
+
+# La ficha del dataset pinta solo la primera página; el resto se pide con el endpoint de abajo
+@comments_bp.app_context_processor
+def inject_comments_page():
+    return {"comments_page": comments_service.get_page}
+
+
+@comments_bp.route('/dataset/<int:dataset_id>/comments', methods=['GET'])
+def list_comments(dataset_id):
+    dataset = DataSet.query.get_or_404(dataset_id)
+    try:
+        comments, next_cursor = comments_service.get_page(dataset.id, request.args.get('cursor'))
+    except ValueError:
+        return jsonify({"message": "Invalid cursor"}), 400
+    return jsonify({
+        "comments": [
+            {
+                "id": comment.id,
+                "author": comment.author.name,
+                "date_posted": comment.date_posted.strftime('%Y-%m-%d %H:%M'),
+                "content": comment.content,
+                "delete_url": (
+                    url_for('comments.delete_comment', comment_id=comment.id)
+                    if comments_service.can_delete(comment, dataset, current_user) else None
+                ),
+            }
+            for comment in comments
+        ],
+        "next_cursor": next_cursor,
+        "count": dataset.comments_count,
+    })
+
 @comments_bp.route('/create/<int:dataset_id>', methods=['POST'])
 @login_required
 def create_comment(dataset_id):
@@ -20,8 +52,8 @@ def create_comment(dataset_id):
     if comment is None:
         return redirect(url_for("dataset.view_dataset", dataset_id=dataset.id))
 
-    downloads = DataSetService().get_number_of_downloads(dataset.id)
-    return render_template("dataset/view_dataset.html", dataset=dataset, downloads=downloads)
+    detail = DatasetDetailService().assemble(dataset.id)
+    return render_template("dataset/view_dataset.html", dataset=detail["dataset"], detail=detail)
 
 
 @comments_bp.route('/delete/<int:comment_id>', methods=['POST'])
@@ -32,5 +64,5 @@ def delete_comment(comment_id):
     if result is None:
         return redirect(url_for("dataset.dataset", id=dataset.id))
 
-    downloads = DataSetService().get_number_of_downloads(dataset.id)
-    return render_template("dataset/view_dataset.html", dataset=dataset, downloads=downloads)
+    detail = DatasetDetailService().assemble(dataset.id)
+    return render_template("dataset/view_dataset.html", dataset=detail["dataset"], detail=detail)
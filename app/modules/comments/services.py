@@ -1,12 +1,44 @@
 # app/modules/comments/services.py
+from datetime import datetime
+
 from flask import flash
 
 from app import db
 from app.modules.comments.models import Comments
+from app.modules.comments.repositories import CommentsRepository
 from app.modules.dataset.models import DataSet
 
+COMMENTS_PAGE_SIZE = 20
+
+
+def encode_cursor(comment: Comments) -> str:
+    return f"{comment.date_posted.isoformat()}_{comment.id}"
+
+
+def decode_cursor(cursor):
+    """``(date_posted, id)`` from a cursor (None for the first page). Raises ValueError if malformed."""
+    if not cursor:
+        return None
+    date_posted, _, comment_id = cursor.rpartition("_")
+    return datetime.fromisoformat(date_posted), int(comment_id)
+
 
 class CommentsService:
+    def __init__(self):
+        self.repository = CommentsRepository()
+
+    def get_page(self, dataset_id, cursor=None, limit=None):
+        """A page of comments (newest first) and the cursor of the next one (None on the last page)."""
+        limit = limit or COMMENTS_PAGE_SIZE
+        comments = self.repository.page(dataset_id, decode_cursor(cursor), limit + 1)
+        next_cursor = encode_cursor(comments[limit - 1]) if len(comments) > limit else None
+        return comments[:limit], next_cursor
+
+    def can_delete(self, comment, dataset, user) -> bool:
+        if not user.is_authenticated:
+            return False
+        return (user.profile is not None and user.profile.id == comment.author_id) or user.id == dataset.user_id
+
     def create_comment(self, dataset_id, author_id, content):
         dataset = DataSet.query.get_or_404(dataset_id)
 
@@ -1,4 +1,7 @@
+from datetime import datetime, timedelta
+
 import pytest
+from sqlalchemy import event
 
 from app import db
 from app.modules.auth.models import User
@@ -108,6 +111,63 @@ def test_delete_comment(test_client):
         assert deleted is not None, "El comentario no se eliminó"
         assert Comments.query.get(comment_id) is None, "El comentario sigue existiendo"
         assert returned_dataset.id == dataset.id
-    
+
+
+def test_comments_are_paginated_by_key_with_a_maintained_count(test_client):
+    app = test_client.application
+    with app.app_context():
+        dataset = DataSet.query.first()
+        author = Author.query.filter_by(name="Pepe").first()
+        dataset_id = dataset.id
+        start = dataset.comments_count
+        assert start == Comments.query.filter_by(dataset_id=dataset_id).count()
+        # Posteriores a los ya existentes; los últimos comparten fecha y el id desempata
+        posted = datetime.utcnow() + timedelta(days=1)
+        for i in range(25):
+            db.session.add(Comments(
+                author_id=author.id, dataset_id=dataset_id, content=f"Comentario {i:02d}",
+                date_posted=posted + timedelta(minutes=min(i, 20)),
+            ))
+        db.session.commit()
+        assert db.session.get(DataSet, dataset_id).comments_count == start + 25
+        engine = db.engine
+
+    client = app.test_client()
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    contents, ids, params, queries = [], set(), {}, []
+    while True:
+        statements.clear()
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            response = client.get(f"/dataset/{dataset_id}/comments", query_string=params)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        assert response.status_code == 200
+        page = response.get_json()
+        contents += [comment["content"] for comment in page["comments"]]
+        ids |= {comment["id"] for comment in page["comments"]}
+        queries.append(len(statements))
+        if not page["next_cursor"]:
+            break
+        params = {"cursor": page["next_cursor"]}
+
+    assert page["count"] == start + 25
+    assert contents[:25] == [f"Comentario {i:02d}" for i in range(24, -1, -1)]
+    assert len(contents) == len(ids) == start + 25
+    # Dataset y comentarios con sus autores: nunca una consulta por comentario
+    assert max(queries) <= 2
+    assert client.get(f"/dataset/{dataset_id}/comments?cursor=nope").status_code == 400
+
+    with app.app_context():
+        comment = Comments.query.filter_by(content="Comentario 00").first()
+        db.session.delete(comment)
+        db.session.commit()
+        assert db.session.get(DataSet, dataset_id).comments_count == start + 24
+
+
 # He utilizado parcialmente la inteligencia artificial (IA) como herramienta de apoyo durante el desarrollo y modificación de este archivo de código. 
 # La IA me ha ayudado a entender, optimizar y automatizar ciertas tareas, pero la implementación final y las decisiones clave han sido realizadas por mí.
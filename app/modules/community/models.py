@@ -14,6 +14,8 @@ class Community(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
     created_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Mantenido por los eventos de Followcommunity (ver followCommunity/models.py)
+    followers_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Curators relationship
     curators = db.relationship(
@@ -50,6 +52,8 @@ class CommunityDatasetStatus(Enum):
 
 class CommunityDataset(db.Model):
     _tablename__ = 'community_dataset'
+    # Listados de una comunidad por estado (aprobados, propuestas pendientes)
+    __table_args__ = (db.Index('ix_community_dataset_community_id_status', 'community_id', 'status'),)
     id = db.Column(db.Integer, primary_key=True)
     community_id = db.Column(db.Integer, db.ForeignKey('community.id'), nullable=False)
     dataset_id = db.Column(db.Integer, db.ForeignKey('data_set.id'), nullable=False)
@@ -0,0 +1,111 @@
+"""Curator permissions with a per-request memo and a short-lived shared cache.
+
+Routes and templates ask several times per request whether the current user curates a community.
+``curated_community_ids`` loads the ids of the communities a user curates once (through the
+``curated_communities`` relationship) and keeps them in ``flask.g`` for the rest of the request, so
+``is_curator`` is a set lookup. Across requests the sets are kept in an in-process cache for
+``CURATOR_CACHE_TTL`` seconds.
+
+A commit that adds or removes a ``CommunityCurator`` drops the sets of the users involved (and a
+deleted community drops every set), so a worker never answers from a membership it has itself
+changed. Other worker processes see the change when their entry expires, so endpoints that change
+data ask with ``fresh=True``, which reloads the set from the database (and refreshes the shared entry).
+"""
+
+import os
+import threading
+import time
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.modules.community.models import Community, CommunityCurator
+
+_G_KEY = "curated_community_ids"
+
+
+class CuratorCache:
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("CURATOR_CACHE_TTL", "30"))
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, load) -> frozenset:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+        value = frozenset(load())
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+curator_cache = CuratorCache()
+
+
+def curated_community_ids(user, fresh=False) -> frozenset:
+    """Ids of the communities ``user`` curates (empty for anonymous users)."""
+    if user is None or not getattr(user, "is_authenticated", False):
+        return frozenset()
+    memo = g.setdefault(_G_KEY, {}) if has_app_context() else {}
+    if fresh:
+        curator_cache.invalidate(user.id)
+    if fresh or user.id not in memo:
+        memo[user.id] = curator_cache.get(
+            user.id, lambda: [row.id for row in user.curated_communities.with_entities(Community.id)]
+        )
+    return memo[user.id]
+
+
+def is_curator(community, user, fresh=False) -> bool:
+    return community is not None and community.id in curated_community_ids(user, fresh)
+
+
+def invalidate_curators(user_ids=None):
+    """Drops the memo of this request and the shared entries (all of them when ``user_ids`` is None)."""
+    if user_ids is None:
+        curator_cache.clear()
+    else:
+        curator_cache.invalidate(*user_ids)
+    if has_app_context():
+        memo = g.get(_G_KEY)
+        if memo is not None:
+            for user_id in list(memo) if user_ids is None else user_ids:
+                memo.pop(user_id, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_curator_changes(session, flush_context):
+    pending = session.info.setdefault("curator_invalidations", set())
+    for instance in list(session.new) + list(session.deleted):
+        if isinstance(instance, CommunityCurator):
+            pending.add(instance.user_id)
+    if any(isinstance(instance, Community) for instance in session.deleted):
+        session.info["curator_invalidate_all"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    user_ids = session.info.pop("curator_invalidations", None)
+    if session.info.pop("curator_invalidate_all", False):
+        invalidate_curators()
+    elif user_ids:
+        invalidate_curators(user_ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session, previous_transaction):
+    session.info.pop("curator_invalidations", None)
+    session.info.pop("curator_invalidate_all", None)
@@ -1,4 +1,10 @@
-from app.modules.community.models import Community, CommunityCurator, CommunityDataset
+from sqlalchemy import select, update
+from sqlalchemy.orm import selectinload
+
+from app import db
+
+from app.modules.community.models import Community, CommunityCurator, CommunityDataset, CommunityDatasetStatus
+from app.modules.dataset.models import DataSet
 from core.repositories.BaseRepository import BaseRepository
 
 
@@ -21,3 +27,37 @@ class CommunityRepository(BaseRepository):
             .order_by(self.model.created_at.desc())
             .all()
         )
+
+
+class CommunityDatasetRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(CommunityDataset)
+
+    def approved_page(self, community_id: int, before_id: int = None, limit: int = 20) -> list:
+        """Approved links of a community, newest first, older than the link ``before_id``.
+
+        Datasets and their metadata are loaded in batches (one IN query each) for the whole page.
+        """
+        query = self.model.query.filter(
+            self.model.community_id == community_id, self.model.status == CommunityDatasetStatus.APPROVED
+        ).options(selectinload(self.model.dataset).selectinload(DataSet.ds_meta_data))
+        if before_id:
+            query = query.filter(self.model.id < before_id)
+        return query.order_by(self.model.id.desc()).limit(limit).all()
+
+    def status_rows(self, community_id: int, link_ids) -> list:
+        """``(id, dataset_id, status)`` of the links of a community among ``link_ids`` (one query)."""
+        if not link_ids:
+            return []
+        return db.session.execute(
+            select(self.model.id, self.model.dataset_id, self.model.status)
+            .where(self.model.community_id == community_id, self.model.id.in_(link_ids))
+            .order_by(self.model.id)
+        ).all()
+
+    def update_status(self, link_ids, status) -> int:
+        """Sets ``status`` on every link in ``link_ids`` with a single UPDATE (without committing)."""
+        if not link_ids:
+            return 0
+        stmt = update(self.model).where(self.model.id.in_(link_ids)).values(status=status)
+        return db.session.execute(stmt.execution_options(synchronize_session=False)).rowcount
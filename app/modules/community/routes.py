@@ -2,18 +2,22 @@ from flask import abort, jsonify, render_template, request
 from flask_login import current_user, login_required  # type: ignore
 
 from app.modules.dataset.models import DataSet
+from app.modules.dataset.services import DataSetService
 
 from . import community_bp
 from .forms import CommunityForm
 from .models import CommunityDatasetStatus
 from .services import CommunityDatasetService, CommunityService
 from app.modules.auth.models import User
+from app.modules.followCommunity.services import FollowcommunityService
 
 community_service = CommunityService()
 link_service = CommunityDatasetService()
 
 def _ensure_curator(community):
-    if not community_service.is_curator(community, current_user):
+    # Solo lo usan endpoints que modifican datos: un curador recién retirado no puede seguir
+    # actuando en otros procesos mientras dure su entrada en la caché compartida
+    if not community_service.is_curator(community, current_user, fresh=True):
         abort(403)
 
 @community_bp.route("/community/create", methods=["GET", "POST"])
@@ -39,19 +43,23 @@ def community_detail(slug):
     if not c:
         abort(404)
 
+    approved, next_before = link_service.approved_page(c, request.args.get("before", type=int))
     is_following = False
     user_datasets = []
     if current_user.is_authenticated:
-        # Verifica si el usuario aparece en los seguidores de la comunidad
-        is_following = c.followers.filter_by(follower_id=current_user.id).first() is not None
-        # Get all user's datasets with version info
-        user_datasets = DataSet.query.filter(DataSet.user_id == current_user.id).all()
+        is_following = c.id in FollowcommunityService().followed_community_ids(current_user, [c.id])
+        # Solo id, título y versión para el desplegable
+        user_datasets = DataSetService().get_title_options(current_user.id)
 
     return render_template(
         "community/detail.html",
         community=c,
+        curators=community_service.get_curators(c),
+        is_curator=community_service.is_curator(c, current_user),
         CommunityDatasetStatus=CommunityDatasetStatus,
         is_following=is_following,
+        approved=approved,
+        next_before=next_before,
         user_datasets=user_datasets
     )
 
@@ -97,6 +105,34 @@ def reject_dataset(slug, link_id):
     link = link_service.set_status(link_id, CommunityDatasetStatus.REJECTED, current_user)
     return jsonify({"message": "Rejected", "link_id": link.id})
 
+
+# Aceptar/Rechazar varias propuestas a la vez (solo curadores)
+@community_bp.route("/community/<slug>/proposals/bulk", methods=["POST"])
+@login_required
+def curate_datasets(slug):
+    c = community_service.get_by_slug(slug)
+    _ensure_curator(c)
+    payload = request.get_json(silent=True) or {}
+    decisions = {}
+    for key, status in (("approve", CommunityDatasetStatus.APPROVED), ("reject", CommunityDatasetStatus.REJECTED)):
+        link_ids = payload.get(key) or []
+        if not isinstance(link_ids, list) or not all(isinstance(i, int) for i in link_ids):
+            return jsonify({"message": f"'{key}' must be a list of link ids"}), 400
+        decisions[status] = link_ids
+    requested = [i for link_ids in decisions.values() for i in link_ids]
+    if not requested:
+        return jsonify({"message": "Nothing to curate"}), 400
+    if len(requested) > link_service.BULK_LIMIT:
+        return jsonify({"message": f"At most {link_service.BULK_LIMIT} links per request"}), 400
+    if len(set(requested)) != len(requested):
+        return jsonify({"message": "A link can only appear once"}), 400
+    result = link_service.set_statuses(c, decisions)
+    return jsonify({
+        "approved": result[CommunityDatasetStatus.APPROVED],
+        "rejected": result[CommunityDatasetStatus.REJECTED],
+        "skipped": result["skipped"],
+    })
+
 # Añadir un curador (solo curadores)
 @community_bp.route("/community/<slug>/curators/add", methods=["POST"])
 @login_required
@@ -108,4 +144,18 @@ def add_curator(slug):
         return jsonify({"message": "user_id is required"}), 400
     user = User.query.get_or_404(user_id)
     community_service.add_curator(c, user)
-    return jsonify({"message": "Curator added", "user_id": user.id})
\ No newline at end of file
+    return jsonify({"message": "Curator added", "user_id": user.id})
+
+
+# Quitar un curador (solo curadores)
+@community_bp.route("/community/<slug>/curators/remove", methods=["POST"])
+@login_required
+def remove_curator(slug):
+    c = community_service.get_by_slug(slug)
+    _ensure_curator(c)
+    user_id = request.form.get("user_id", type=int)
+    if not user_id:
+        return jsonify({"message": "user_id is required"}), 400
+    user = User.query.get_or_404(user_id)
+    community_service.remove_curator(c, user)
+    return jsonify({"message": "Curator removed", "user_id": user.id})
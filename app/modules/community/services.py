@@ -1,16 +1,23 @@
+import logging
 import os
+import uuid
 from datetime import datetime
 
 from flask import current_app
 from werkzeug.utils import secure_filename
 
 from app import db
-from app.modules.community.repositories import CommunityRepository
-from app.utils.notifications import notify_followers_of_community
+from app.modules.community import permissions
+from app.modules.community.repositories import CommunityDatasetRepository, CommunityRepository
+from app.modules.feed.services import FeedService
+from app.utils.notifications import notify_followers_of_community, notify_followers_of_community_datasets
+from core.jobs import enqueue
 from core.services.BaseService import BaseService
 
 from .models import Community, CommunityCurator, CommunityDataset, CommunityDatasetStatus
 
+logger = logging.getLogger(__name__)
+
 
 class CommunityService(BaseService):
 
@@ -43,8 +50,30 @@ class CommunityService(BaseService):
     def list_all(self):
         return Community.query.order_by(Community.created_at.desc()).all()
     
-    def is_curator(self, community, user):
-        return community.curators.filter(CommunityCurator.user_id == user.id).count() > 0
+    def is_curator(self, community, user, fresh=False):
+        # Resuelto desde los ids de comunidades del usuario, cargados una vez por petición
+        # (con ``fresh`` se leen de la base de datos y no de la caché compartida)
+        return permissions.is_curator(community, user, fresh)
+
+    def get_curators(self, community):
+        return community.curators.all()
+
+    def add_curator(self, community, user) -> bool:
+        """Returns False if ``user`` already curates ``community``."""
+        if db.session.get(CommunityCurator, (community.id, user.id)) is not None:
+            return False
+        db.session.add(CommunityCurator(community_id=community.id, user_id=user.id))
+        db.session.commit()
+        return True
+
+    def remove_curator(self, community, user) -> bool:
+        """Returns False if ``user`` does not curate ``community``."""
+        curator = db.session.get(CommunityCurator, (community.id, user.id))
+        if curator is None:
+            return False
+        db.session.delete(curator)
+        db.session.commit()
+        return True
     
     def get_by_slug(self, slug):
         return Community.query.filter_by(slug=slug).first_or_404()
@@ -56,6 +85,55 @@ class CommunityService(BaseService):
         return self.repository.get_unsynchronized(current_user_id)
     
 class CommunityDatasetService:
+    APPROVED_PAGE_SIZE = 20
+    # Enlaces como máximo por petición de curación en bloque
+    BULK_LIMIT = 500
+
+    def __init__(self):
+        self.repository = CommunityDatasetRepository()
+
+    def approved_page(self, community, before_id=None, limit=None):
+        """A page of approved links and the ``before_id`` of the next one (None on the last page)."""
+        limit = limit or self.APPROVED_PAGE_SIZE
+        links = self.repository.approved_page(community.id, before_id, limit + 1)
+        next_before = links[limit - 1].id if len(links) > limit else None
+        return links[:limit], next_before
+
+    def set_statuses(self, community, decisions) -> dict:
+        """Applies ``{status: [link_id, ...]}`` to the links of ``community`` in one transaction.
+
+        Links of other communities, unknown ids and links that already have the status are skipped.
+        Each status is one UPDATE; the approved datasets get their feed fan-out and a single
+        coalesced follower notification (a background job) instead of one email per dataset.
+        Returns ``{status: [updated link ids], "skipped": [link ids]}``.
+        """
+        requested = [link_id for link_ids in decisions.values() for link_id in link_ids]
+        rows = {row.id: row for row in self.repository.status_rows(community.id, requested)}
+        result = {"skipped": sorted(set(requested) - set(rows))}
+        approved_datasets = []
+        for status, link_ids in decisions.items():
+            changed = sorted({i for i in link_ids if i in rows and rows[i].status != status})
+            result["skipped"] += sorted({i for i in link_ids if i in rows and rows[i].status == status})
+            self.repository.update_status(changed, status)
+            result[status] = changed
+            if status == CommunityDatasetStatus.APPROVED:
+                approved_datasets = [rows[i].dataset_id for i in changed]
+        db.session.commit()
+        result["skipped"].sort()
+
+        if approved_datasets:
+            try:
+                feed_service = FeedService()
+                for dataset_id in approved_datasets:
+                    feed_service.schedule_fan_out(dataset_id, community.id)
+                # Una clave por llamada: un enlace aprobado de nuevo mientras sigue activo el job anterior
+                # también se notifica
+                key = f"community-approvals:{community.id}:{uuid.uuid4().hex}"
+                enqueue(notify_followers_of_community_datasets, community.id, approved_datasets, key=key)
+            except Exception:
+                logger.exception("Failed to notify followers after bulk community dataset approval")
+        return result
+
     def propose(self, community, dataset, proposer):
         link = CommunityDataset(
             community_id=community.id,
@@ -75,9 +153,9 @@ class CommunityDatasetService:
             # If the dataset was approved, notify community followers (non-blocking)
             try:
                 if status == CommunityDatasetStatus.APPROVED:
+                    FeedService().schedule_fan_out(link.dataset_id, link.community_id)
                     notify_followers_of_community(link.community, link.dataset)
             except Exception:
-                logger = __import__("logging").getLogger(__name__)
                 logger.exception("Failed to notify followers after community dataset approval")
 
         return link
@@ -1,13 +1,18 @@
 import json
+import re
+from datetime import datetime
 
 import pytest
+from sqlalchemy import delete, event
 
 from app import db
 from app.modules.auth.models import User
+from app.modules.conftest import login, logout
 from app.modules.community.models import Community, CommunityCurator, CommunityDataset, CommunityDatasetStatus
 from app.modules.community.services import CommunityDatasetService, CommunityService
 from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
 from app.modules.profile.models import UserProfile
+from core.jobs.models import Job
 
 community_service = CommunityService()
 link_service = CommunityDatasetService()
@@ -100,3 +105,224 @@ def test_propose_and_set_status(clean_database, test_client):
         assert rejected.status == CommunityDatasetStatus.REJECTED
 
 
+def test_community_detail_pages_approved_datasets_with_constant_queries(test_client, monkeypatch):
+    app = test_client.application
+    with app.app_context():
+        owner = User(email='pager-owner@example.com', password='1234')
+        db.session.add(owner)
+        db.session.flush()
+        community = Community(name='Pages', slug='pages-community', created_by_id=owner.id)
+        db.session.add(community)
+        db.session.flush()
+        for i in range(12):
+            meta = DSMetaData(title=f'Approved {i:02d}', description='d', publication_type=PublicationType.NONE)
+            db.session.add(meta)
+            db.session.flush()
+            ds = DataSet(user_id=owner.id, ds_meta_data_id=meta.id)
+            db.session.add(ds)
+            db.session.flush()
+            status = CommunityDatasetStatus.APPROVED if i % 4 else CommunityDatasetStatus.PENDING
+            db.session.add(CommunityDataset(
+                community_id=community.id, dataset_id=ds.id, proposed_by_id=owner.id, status=status
+            ))
+        db.session.commit()
+
+    client = app.test_client()
+    login(client, 'pager-owner@example.com', '1234')
+    with app.app_context():
+        engine = db.engine
+
+    def get(page_size, **params):
+        monkeypatch.setattr(CommunityDatasetService, 'APPROVED_PAGE_SIZE', page_size)
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            response = client.get('/community/pages-community', query_string=params)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        assert response.status_code == 200
+        return response.data.decode(), len(statements)
+
+    get(2)  # calienta la caché de permisos de curador
+    small, small_queries = get(2)
+    big, big_queries = get(20)
+    # Cargar 2 o 9 datasets aprobados cuesta las mismas consultas
+    assert small_queries == big_queries
+    assert len(re.findall(r'Approved \d\d', big)) == 9 + 12  # lista de aprobados + desplegable del propietario
+
+    titles = []
+    params = {}
+    while True:
+        html, _ = get(4, **params)
+        page = [line.strip() for line in html.splitlines() if line.strip().startswith('Approved ')]
+        titles += page[:-12]
+        marker = 'before='
+        if marker not in html:
+            break
+        params = {'before': html.split(marker, 1)[1].split('"', 1)[0]}
+    assert titles == [f'Approved {i:02d}' for i in range(11, -1, -1) if i % 4]
+
+
+def test_bulk_curation_updates_links_in_one_transaction(test_client):
+    app = test_client.application
+    with app.app_context():
+        curator = User(email='bulk-curator@example.com', password='1234')
+        outsider = User(email='bulk-outsider@example.com', password='1234')
+        db.session.add_all([curator, outsider])
+        db.session.flush()
+        community = Community(name='Bulk', slug='bulk-community', created_by_id=curator.id)
+        other = Community(name='Bulk other', slug='bulk-other', created_by_id=curator.id)
+        db.session.add_all([community, other])
+        db.session.flush()
+        db.session.add(CommunityCurator(community_id=community.id, user_id=curator.id))
+        links = []
+        for i, target in enumerate([community] * 4 + [other]):
+            meta = DSMetaData(title=f'Bulk {i}', description='d', publication_type=PublicationType.NONE)
+            db.session.add(meta)
+            db.session.flush()
+            ds = DataSet(user_id=curator.id, ds_meta_data_id=meta.id)
+            db.session.add(ds)
+            db.session.flush()
+            link = CommunityDataset(community_id=target.id, dataset_id=ds.id, proposed_by_id=curator.id)
+            db.session.add(link)
+            db.session.flush()
+            links.append((link.id, ds.id))
+        db.session.commit()
+        community_id = community.id
+    (a, ds_a), (b, ds_b), (c, _), (d, _), (foreign, _) = links
+
+    url = '/community/bulk-community/proposals/bulk'
+    client = app.test_client()
+    logout(client)
+    login(client, 'bulk-outsider@example.com', '1234')
+    assert client.post(url, json={'approve': [a]}).status_code == 403
+    logout(client)
+
+    login(client, 'bulk-curator@example.com', '1234')
+    assert client.post(url, json={'approve': [a], 'reject': [a]}).status_code == 400
+    assert client.post(url, json={'approve': 'all'}).status_code == 400
+
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith('UPDATE COMMUNITY_DATASET'):
+            statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        response = client.post(url, json={'approve': [a, b, foreign, 999999], 'reject': [c]})
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    assert response.status_code == 200
+    assert response.get_json() == {'approved': [a, b], 'rejected': [c], 'skipped': sorted([foreign, 999999])}
+    assert len(statements) == 2  # un UPDATE por estado
+
+    with app.app_context():
+        statuses = dict(db.session.query(CommunityDataset.id, CommunityDataset.status).all())
+        assert statuses[a] == statuses[b] == CommunityDatasetStatus.APPROVED
+        assert statuses[c] == CommunityDatasetStatus.REJECTED
+        assert statuses[d] == statuses[foreign] == CommunityDatasetStatus.PENDING
+        # Una única notificación para la comunidad con todos los datasets aprobados
+        jobs = Job.query.filter(Job.key.like(f'community-approvals:{community_id}:%')).all()
+        assert [job.payload['args'] for job in jobs] == [[community_id, [ds_a, ds_b]]]
+
+    # Repetir la petición no vuelve a notificar: los enlaces ya están aprobados
+    response = client.post(url, json={'approve': [a, b]})
+    assert response.get_json() == {'approved': [], 'rejected': [], 'skipped': [a, b]}
+
+    # Rechazar y volver a aprobar mientras la primera notificación sigue en curso vuelve a notificar
+    with app.app_context():
+        Job.query.filter(Job.key.like(f'community-approvals:{community_id}:%')).update(
+            {'status': Job.RUNNING, 'started_at': datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
+    client.post(url, json={'reject': [a]})
+    client.post(url, json={'approve': [a]})
+    with app.app_context():
+        jobs = Job.query.filter(Job.key.like(f'community-approvals:{community_id}:%')).all()
+        assert sorted(job.payload['args'] for job in jobs) == [[community_id, [ds_a]], [community_id, [ds_a, ds_b]]]
+    logout(client)
+
+
+def test_curator_checks_load_memberships_once_and_follow_changes(test_client):
+    app = test_client.application
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.test_request_context():
+        owner = User(email='perm-owner@example.com', password='1234')
+        helper = User(email='perm-helper@example.com', password='1234')
+        db.session.add_all([owner, helper])
+        db.session.flush()
+        communities = [Community(name=f'Perm {i}', slug=f'perm-{i}', created_by_id=owner.id) for i in range(3)]
+        db.session.add_all(communities)
+        db.session.flush()
+        db.session.add_all([CommunityCurator(community_id=c.id, user_id=owner.id) for c in communities])
+        db.session.commit()
+        # Recargados tras el commit para no contar los refrescos de atributos expirados
+        communities = Community.query.filter(Community.slug.like('perm-%')).order_by(Community.slug).all()
+        db.session.refresh(owner)
+        db.session.refresh(helper)
+
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            for _ in range(3):
+                assert all(community_service.is_curator(c, owner) for c in communities)
+                assert not any(community_service.is_curator(c, helper) for c in communities)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        assert len(statements) == 2  # una consulta por usuario
+
+        assert community_service.add_curator(communities[0], helper)
+        assert not community_service.add_curator(communities[0], helper)
+        assert community_service.is_curator(communities[0], helper)
+        assert community_service.remove_curator(communities[0], helper)
+        assert not community_service.remove_curator(communities[0], helper)
+        assert not community_service.is_curator(communities[0], helper)
+
+    # Otra petición lee la caché compartida sin consultar la base de datos
+    with app.test_request_context():
+        owner = User.query.filter_by(email='perm-owner@example.com').one()
+        community = Community.query.filter_by(slug='perm-1').one()
+        statements.clear()
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            assert community_service.is_curator(community, owner)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        assert statements == []
+
+    # Los endpoints que modifican datos leen de la base de datos y no de la caché compartida
+    client = app.test_client()
+    login(client, 'perm-owner@example.com', '1234')
+    with app.app_context():
+        helper_id = User.query.filter_by(email='perm-helper@example.com').one().id
+    url = '/community/perm-1/curators/{}'
+    assert client.post(url.format('remove'), data={}).status_code == 400
+    assert client.post(url.format('add'), data={'user_id': helper_id}).status_code == 200
+    assert client.post(url.format('remove'), data={'user_id': helper_id}).status_code == 200
+    assert client.post(url.format('add'), data={'user_id': helper_id}).status_code == 200
+    logout(client)
+
+    with app.test_request_context():
+        helper = db.session.get(User, helper_id)
+        community = Community.query.filter_by(slug='perm-1').one()
+        assert community_service.is_curator(community, helper)
+        # Otro proceso retira al curador: esta caché no se entera
+        db.session.execute(delete(CommunityCurator).where(CommunityCurator.user_id == helper_id))
+        db.session.commit()
+        assert community_service.is_curator(community, helper)
+
+    login(client, 'perm-helper@example.com', '1234')
+    assert client.post(url.format('add'), data={'user_id': helper_id}).status_code == 403
+    logout(client)
@@ -2,6 +2,8 @@ import pytest
 
 from app import create_app, db
 from app.modules.auth.models import User
+from app.modules.community.permissions import invalidate_curators
+from app.modules.dataset.doi_resolver import doi_resolver
 
 
 @pytest.fixture(scope="session")
@@ -24,6 +26,8 @@ def test_client(test_app):
 
             db.drop_all()
             db.create_all()
+            doi_resolver.clear()
+            invalidate_curators()
             """
             The test suite always includes the following user in order to avoid repetition
             of its creation
@@ -46,6 +50,9 @@ def clean_database():
     db.session.remove()
     db.drop_all()
     db.create_all()
+    # Las tablas se recrean sin pasar por el ORM: las cachés de DOIs y de curadores no se enteran
+    doi_resolver.clear()
+    invalidate_curators()
     yield
     db.session.remove()
     db.drop_all()
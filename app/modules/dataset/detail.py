@@ -0,0 +1,39 @@
+"""View model of the dataset detail page.
+
+``view_dataset.html`` used to pull what it shows from the ORM while rendering: files through the
+file models, the sibling versions through the concept, each version's dataset and metadata, the
+uploader's profile and the downloads, one lazy load at a time. ``DatasetDetailService.assemble``
+loads all of it up front with a fixed number of batched queries (see
+``DataSetRepository.get_detail``) and returns a plain dict with the values the template needs, so
+the page costs the same number of queries whatever the number of files, versions or comments.
+"""
+
+from app.modules.dataset.repositories import DataSetRepository
+from app.modules.dataset.services import SizeService
+
+
+class DatasetDetailService:
+    def __init__(self):
+        self.repository = DataSetRepository()
+
+    def assemble(self, dataset_id: int):
+        """Returns ``{"dataset", "files", "files_count", "total_size", "downloads", "versions",
+        "latest_version_id", "is_latest_version"}`` or None if the dataset does not exist."""
+        dataset = self.repository.get_detail(dataset_id)
+        if dataset is None:
+            return None
+
+        files = [file for file_model in dataset.file_models for file in file_model.files]
+        version = dataset.version
+        versions = list(version.concept.versions) if version and version.concept else []
+        latest = max(versions, key=lambda v: (v.version_major, v.version_minor), default=None)
+        return {
+            "dataset": dataset,
+            "files": files,
+            "files_count": len(files),
+            "total_size": SizeService().get_human_readable_size(sum(file.size for file in files)),
+            "downloads": self.repository.count_downloads(dataset.id),
+            "versions": sorted(versions, key=lambda v: (v.version_major, v.version_minor), reverse=True),
+            "latest_version_id": latest.id if latest else None,
+            "is_latest_version": latest is not None and latest.dataset_id == dataset.id,
+        }
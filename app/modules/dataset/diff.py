@@ -0,0 +1,159 @@
+"""Streaming row-level diff between two CSV files (e.g. the file of two dataset versions).
+
+Rows are compared on the columns both files share, so adding or dropping a column is reported as
+a schema change instead of turning every row into a modification. Without a key column the diff
+is a multiset comparison of whole rows (only additions and removals are possible); with a key
+column rows are paired by key and a different row hash means the row was modified.
+
+Memory stays bounded for big files: each side is streamed once and every row is reduced to a
+fixed-size record (key digest, row digest, row number) written to one of several partition files
+chosen by the key digest. Partitions are then compared one at a time, so only the records of a
+single partition of the old file are ever held in memory.
+"""
+
+import hashlib
+import heapq
+import math
+import os
+import shutil
+import struct
+import tempfile
+
+from app.modules.hubfile import columnar, compression
+
+DIGEST_SIZE = 16
+SAMPLE_SIZE = 20
+PARTITION_BYTES = 64 * 1024 * 1024
+MAX_PARTITIONS = 256
+
+_RECORD = struct.Struct(f"<{DIGEST_SIZE}s{DIGEST_SIZE}sQ")
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=DIGEST_SIZE).digest()
+
+
+def compare_schemas(old_header, new_header) -> dict:
+    old_set, new_set = set(old_header), set(new_header)
+    common_old = [c for c in old_header if c in new_set]
+    common_new = [c for c in new_header if c in old_set]
+    return {
+        "added_columns": [c for c in new_header if c not in old_set],
+        "removed_columns": [c for c in old_header if c not in new_set],
+        "reordered": common_old != common_new,
+    }
+
+
+class _Sample:
+    """Keeps the ``size`` items with the lowest order seen so far."""
+
+    def __init__(self, size=SAMPLE_SIZE):
+        self.size = size
+        self._heap = []
+
+    def add(self, order, item):
+        entry = (-order, item)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self):
+        return [item for _, item in sorted(self._heap, reverse=True)]
+
+
+def _partition_count(*paths) -> int:
+    largest = max(compression.payload_size(p) for p in paths)
+    return max(1, min(MAX_PARTITIONS, math.ceil(largest / PARTITION_BYTES)))
+
+
+def _write_partitions(path, delimiter, columns, key_column, directory, prefix, n_partitions) -> int:
+    """Streams ``path`` into ``n_partitions`` record files and returns its number of data rows."""
+    rows = columnar.iter_csv_rows(path, delimiter)
+    header = next(rows, [])
+    projection = [header.index(c) for c in columns]
+    key_index = header.index(key_column) if key_column else None
+
+    files = [open(os.path.join(directory, f"{prefix}-{i}"), "wb") for i in range(n_partitions)]
+    n_rows = 0
+    try:
+        for n_rows, row in enumerate(rows, start=1):
+            row_hash = _digest("\x1f".join(row[i] for i in projection))
+            key = row_hash if key_index is None else _digest(row[key_index].strip())
+            files[key[0] % n_partitions].write(_RECORD.pack(key, row_hash, n_rows))
+    finally:
+        for f in files:
+            f.close()
+    return n_rows
+
+
+def _read_partition(path):
+    with open(path, "rb") as f:
+        while chunk := f.read(_RECORD.size * 4096):
+            yield from _RECORD.iter_unpack(chunk)
+
+
+def diff_csv_files(old_path, new_path, key_column=None, work_dir=None) -> dict:
+    """Compares two CSV files and returns a JSON-serialisable summary.
+
+    Row numbers in the samples are 1-based and do not count the header. Duplicate keys are
+    paired in order of appearance.
+    """
+    old_delimiter = columnar.sniff_delimiter(old_path)
+    new_delimiter = columnar.sniff_delimiter(new_path)
+    old_header = next(columnar.iter_csv_rows(old_path, old_delimiter), [])
+    new_header = next(columnar.iter_csv_rows(new_path, new_delimiter), [])
+
+    if key_column and (key_column not in old_header or key_column not in new_header):
+        raise ValueError(f"Key column '{key_column}' must exist in both files")
+
+    schema = compare_schemas(old_header, new_header)
+    columns = [c for c in new_header if c in set(old_header)]
+    n_partitions = _partition_count(old_path, new_path)
+
+    counts = {"added": 0, "removed": 0, "modified": 0, "unchanged": 0}
+    samples = {name: _Sample() for name in ("added", "removed", "modified")}
+
+    directory = tempfile.mkdtemp(prefix="dataset-diff-", dir=work_dir)
+    try:
+        old_rows = _write_partitions(old_path, old_delimiter, columns, key_column, directory, "old", n_partitions)
+        new_rows = _write_partitions(new_path, new_delimiter, columns, key_column, directory, "new", n_partitions)
+
+        for i in range(n_partitions):
+            pending = {}
+            for key, row_hash, row_number in _read_partition(os.path.join(directory, f"old-{i}")):
+                pending.setdefault(key, []).append((row_hash, row_number))
+            for bucket in pending.values():
+                # Emparejamos duplicados por orden de aparición sacando del final de la lista
+                bucket.reverse()
+
+            for key, row_hash, row_number in _read_partition(os.path.join(directory, f"new-{i}")):
+                bucket = pending.get(key)
+                if not bucket:
+                    counts["added"] += 1
+                    samples["added"].add(row_number, row_number)
+                    continue
+                old_hash, old_number = bucket.pop()
+                if not bucket:
+                    del pending[key]
+                if old_hash == row_hash:
+                    counts["unchanged"] += 1
+                else:
+                    counts["modified"] += 1
+                    samples["modified"].add(row_number, [old_number, row_number])
+
+            for bucket in pending.values():
+                for _, old_number in bucket:
+                    counts["removed"] += 1
+                    samples["removed"].add(old_number, old_number)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "key_column": key_column or None,
+        "schema": schema,
+        "old_rows": old_rows,
+        "new_rows": new_rows,
+        **counts,
+        "samples": {name: sample.items() for name, sample in samples.items()},
+    }
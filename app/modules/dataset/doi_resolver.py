@@ -0,0 +1,168 @@
+"""Read-through cache for DOI resolution.
+
+Landing pages resolve a DOI on every hit: ``/dataset/doi/<doi>/`` looks for a ``DOIMapping`` from
+an old DOI and then for the dataset with that ``version_doi``; ``/doi/<doi>`` looks for the
+dataset whose metadata has that ``dataset_doi`` and for the Fakenodo deposition with that DOI.
+The resolver keeps the outcome (ids and redirect targets, never ORM objects) in an in-process LRU,
+so popular DOIs are served without those lookups.
+
+Entries are dropped when a commit touches any of the DOI columns involved (see
+``_collect_dois``), so a worker never serves a resolution that it has itself changed. Other worker
+processes learn about the change when their entry expires after ``DOI_CACHE_TTL`` seconds.
+Resolutions that found nothing (or only part of a record) are kept for ``DOI_CACHE_NEGATIVE_TTL``
+seconds only: a DOI minted by another process (e.g. a publication job) must not 404 for minutes.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.modules.dataset.models import BaseDataset, DOIMapping, DSMetaData
+from app.modules.fakenodo.models import Fakenodo
+
+LANDING = "landing"
+RECORD = "record"
+
+# Columnas con DOIs de las que depende alguna resolución
+WATCHED_COLUMNS = {
+    BaseDataset: ("version_doi",),
+    DSMetaData: ("dataset_doi",),
+    DOIMapping: ("dataset_doi_old",),
+    Fakenodo: ("doi",),
+}
+
+
+class DOIResolver:
+    def __init__(self, maxsize=None, ttl=None, negative_ttl=None):
+        self.maxsize = maxsize or int(os.getenv("DOI_CACHE_SIZE", "4096"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("DOI_CACHE_TTL", "300"))
+        self.negative_ttl = (
+            negative_ttl if negative_ttl is not None else float(os.getenv("DOI_CACHE_NEGATIVE_TTL", "5"))
+        )
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve_landing(self, doi: str):
+        """``("redirect", new_doi)``, ``("dataset", dataset_id)`` or ``(None, None)`` for ``/dataset/doi/<doi>/``."""
+        return self._get((LANDING, doi), lambda: self._load_landing(doi), lambda value: value[0] is None)
+
+    def resolve_record(self, doi: str) -> dict:
+        """``{"dataset_id", "deposition_id"}`` (either may be None) for ``/doi/<doi>``."""
+        record = self._get(
+            (RECORD, doi), lambda: self._load_record(doi), lambda value: any(v is None for _, v in value)
+        )
+        return dict(record)
+
+    def invalidate(self, *dois):
+        with self._lock:
+            for doi in dois:
+                self._entries.pop((LANDING, doi), None)
+                self._entries.pop((RECORD, doi), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+    def _get(self, key, load, is_miss):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = load()
+        # Un fallo se cachea poco tiempo: el DOI puede aparecer en otro proceso sin invalidar esta caché
+        ttl = self.negative_ttl if is_miss(value) else self.ttl
+        if ttl <= 0:
+            return value
+        with self._lock:
+            self._entries[key] = (now + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def _load_landing(self, doi):
+        new_doi = db.session.query(DOIMapping.dataset_doi_new).filter(DOIMapping.dataset_doi_old == doi).first()
+        if new_doi and new_doi[0]:
+            return ("redirect", new_doi[0])
+        dataset_id = db.session.query(BaseDataset.id).filter(BaseDataset.version_doi == doi).first()
+        return ("dataset", dataset_id[0]) if dataset_id else (None, None)
+
+    def _load_record(self, doi):
+        dataset_id = (
+            db.session.query(BaseDataset.id)
+            .join(DSMetaData, BaseDataset.ds_meta_data_id == DSMetaData.id)
+            .filter(DSMetaData.dataset_doi == doi)
+            .first()
+        )
+        deposition_id = db.session.query(Fakenodo.id).filter(Fakenodo.doi == doi).first()
+        return (
+            ("dataset_id", dataset_id[0] if dataset_id else None),
+            ("deposition_id", deposition_id[0] if deposition_id else None),
+        )
+
+
+doi_resolver = DOIResolver()
+
+
+def _collect_dois(instance, deleted=False):
+    """Old and new values of the watched DOI columns of ``instance`` that this flush changes."""
+    columns = next((cols for model, cols in WATCHED_COLUMNS.items() if isinstance(instance, model)), ())
+    if not columns:
+        return set()
+    state = inspect(instance)
+    dois = set()
+    for column in columns:
+        if deleted:
+            values = [getattr(instance, column)]
+        else:
+            history = state.attrs[column].history
+            values = list(history.added) + list(history.deleted)
+        dois.update(value for value in values if value)
+    return dois
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+# active_history carga el valor anterior aunque el atributo esté expirado, para poder invalidar el DOI viejo
+for _model, _columns in WATCHED_COLUMNS.items():
+    for _column in _columns:
+        event.listen(getattr(_model, _column), "set", _keep_old_value, active_history=True, retval=True, propagate=True)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_doi_changes(session, flush_context):
+    pending = session.info.setdefault("doi_invalidations", set())
+    for instance in list(session.new) + list(session.dirty):
+        pending |= _collect_dois(instance)
+    for instance in session.deleted:
+        pending |= _collect_dois(instance, deleted=True)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    dois = session.info.pop("doi_invalidations", None)
+    if dois:
+        doi_resolver.invalidate(*dois)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session, previous_transaction):
+    session.info.pop("doi_invalidations", None)
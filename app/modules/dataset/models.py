@@ -36,6 +36,8 @@ class Author(db.Model):
     orcid = db.Column(db.String(120))
     # Optional link to a user account (allows reusing the same author for uploads)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    # Mantenido por los eventos de Followauthor (ver followAuthor/models.py)
+    followers_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     # Note: file-level authorship is represented from FMMetaData via FMMetaData.author_id
 
     def to_dict(self):
@@ -59,7 +61,7 @@ class DSMetaData(db.Model):
     description = db.Column(db.Text, nullable=False)
     publication_type = db.Column(SQLAlchemyEnum(PublicationType), nullable=False)
     publication_doi = db.Column(db.String(120))
-    dataset_doi = db.Column(db.String(120))
+    dataset_doi = db.Column(db.String(120), index=True)
     tags = db.Column(db.String(120))
     ds_metrics_id = db.Column(db.Integer, db.ForeignKey("ds_metrics.id"))
     ds_metrics = db.relationship("DSMetrics", uselist=False, backref="ds_meta_data", cascade="all, delete")
@@ -72,12 +74,19 @@ class BaseDataset(db.Model):
     __tablename__ = "data_set"
 
     id = db.Column(db.Integer, primary_key=True)
-    version_doi = db.Column(db.String(120))
+    version_doi = db.Column(db.String(120), index=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
 
     ds_meta_data_id = db.Column(db.Integer, db.ForeignKey("ds_meta_data.id"), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     type = db.Column(db.String(50), nullable=False, server_default="csv", index=True)
+    # Validación estructural de los CSV: None (datasets antiguos), "validating", "valid" o "invalid"
+    validation_status = db.Column(db.String(20), nullable=True)
+    validation_report = db.Column(db.JSON, nullable=True)
+    # Último paso completado de la publicación en Fakenodo (ver DatasetPublicationService)
+    publication_state = db.Column(db.String(20), nullable=True)
+    # Mantenido por los eventos de Comments (ver comments/models.py)
+    comments_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     downloads = db.relationship("Download", backref="data_set", lazy="dynamic", cascade="all, delete-orphan")
     version = db.relationship("DatasetVersion", backref="data_set", lazy="dynamic", cascade="all, delete-orphan")
@@ -288,8 +297,9 @@ class TabularDataset(BaseDataset):
             db.session.add(new_fm)
             db.session.flush()
 
-            # Copiar archivos físicos + crear Hubfile para cada archivo
+            # Enlazar archivos físicos desde el almacén de blobs + crear Hubfile para cada archivo
             import shutil, os
+            from app.modules.hubfile import blobstore
             from app.modules.hubfile.models import Hubfile
             
             user_folder = f"user_{self.user_id}/dataset_{self.id}"
@@ -319,15 +329,22 @@ class TabularDataset(BaseDataset):
                 if not src:
                     src = os.path.join(old_path, getattr(f, "name", ""))
 
-                # Only copy if the source exists
+                # Only link/copy if the source exists
                 if src and os.path.exists(src):
-                    dest_file = os.path.join(new_path, os.path.basename(src))
-                    shutil.copy(src, dest_file)
+                    dest_file = os.path.join(new_path, f.name)
+                    checksum = f.checksum
+                    try:
+                        # Ficheros anteriores al almacén de blobs se incorporan a él la primera vez
+                        if not blobstore.has_blob(checksum):
+                            checksum = blobstore.ingest(src, checksum=checksum)
+                        blobstore.link_to(checksum, dest_file)
+                    except OSError:
+                        shutil.copy(src, dest_file)
                     
                     # Create a new Hubfile entry for the cloned file
                     new_hubfile = Hubfile(
                         name=f.name,
-                        checksum=f.checksum,
+                        checksum=checksum,
                         size=f.size,
                         file_model_id=new_fm.id
                     )
@@ -370,7 +387,7 @@ class DSViewRecord(db.Model):
 
 class DOIMapping(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    dataset_doi_old = db.Column(db.String(120))
+    dataset_doi_old = db.Column(db.String(120), index=True)
     dataset_doi_new = db.Column(db.String(120))
 
 class DatasetConcept(db.Model):
@@ -434,6 +451,66 @@ class DatasetVersion(db.Model):
         return f"{self.version_major}.{self.version_minor}"
 
 
+class DatasetDiff(db.Model):
+    """Cached row-level diff between two CSV files, identified by their checksums."""
+
+    __tablename__ = "dataset_diff"
+
+    id = db.Column(db.Integer, primary_key=True)
+    old_checksum = db.Column(db.String(120), nullable=False)
+    new_checksum = db.Column(db.String(120), nullable=False)
+    # "" cuando el diff se hace sin columna clave (comparación de filas completas)
+    key_column = db.Column(db.String(255), nullable=False, default="")
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    summary = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("old_checksum", "new_checksum", "key_column", name="uq_dataset_diff_pair"),
+    )
+
+    def to_dict(self):
+        return {
+            "old_checksum": self.old_checksum,
+            "new_checksum": self.new_checksum,
+            "key_column": self.key_column or None,
+            "status": self.status,
+            "summary": self.summary,
+            "error": self.error,
+        }
+
+
+class UploadSession(db.Model):
+    """Resumable upload of a CSV into the user's temp folder, received as numbered chunks."""
+
+    __tablename__ = "upload_session"
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=True)
+    received_bytes = db.Column(db.BigInteger, nullable=False, default=0)
+    next_chunk = db.Column(db.Integer, nullable=False, default=0)
+    # open -> complete (fichero final en la carpeta temporal) -> consumed (usado por un dataset)
+    status = db.Column(db.String(20), nullable=False, default="open")
+    checksum = db.Column(db.String(120), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "chunk_size": self.chunk_size,
+            "total_size": self.total_size,
+            "received_bytes": self.received_bytes,
+            "next_chunk": self.next_chunk,
+            "status": self.status,
+            "checksum": self.checksum,
+        }
+
 
 DataSet = TabularDataset  # Alias para compatibilidad hacia atrás
 
@@ -1,11 +1,27 @@
 import logging
 from datetime import datetime, timezone, timedelta
-from typing import Optional
+from typing import List, Optional
 
 from flask_login import current_user
 from sqlalchemy import desc, func
-
-from app.modules.dataset.models import Author, DataSet, DOIMapping, DSDownloadRecord, DSMetaData, DSViewRecord, BaseDataset, Download
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.modules.dataset.models import (
+    Author,
+    BaseDataset,
+    DataSet,
+    DatasetConcept,
+    DatasetDiff,
+    DatasetVersion,
+    DOIMapping,
+    Download,
+    DSDownloadRecord,
+    DSMetaData,
+    DSViewRecord,
+    UploadSession,
+)
+from app.modules.auth.models import User
 from core.repositories.BaseRepository import BaseRepository
 
 from app import db
@@ -27,6 +43,11 @@ class AuthorRepository(BaseRepository):
     def __init__(self):
         super().__init__(Author)
 
+    def paginate(self, page: int, per_page: int):
+        return self.model.query.order_by(self.model.name, self.model.id).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+
 
 class DSDownloadRecordRepository(BaseRepository):
     def __init__(self):
@@ -77,6 +98,19 @@ class DataSetRepository(BaseRepository):
         # to be excluded from listings.
         super().__init__(BaseDataset)
 
+    def title_options(self, user_id: int) -> list:
+        """``(id, title, version_major, version_minor)`` of the user's datasets, for pickers."""
+        return (
+            self.session.query(
+                BaseDataset.id, DSMetaData.title, DatasetVersion.version_major, DatasetVersion.version_minor
+            )
+            .join(DSMetaData, DSMetaData.id == BaseDataset.ds_meta_data_id)
+            .outerjoin(DatasetVersion, DatasetVersion.dataset_id == BaseDataset.id)
+            .filter(BaseDataset.user_id == user_id)
+            .order_by(BaseDataset.created_at.desc())
+            .all()
+        )
+
     def get_synchronized(self, current_user_id: int) -> DataSet:
         return (
             self.model.query.join(DSMetaData)
@@ -143,6 +177,29 @@ class DataSetRepository(BaseRepository):
     def get_by_id(self, dataset_id: int) -> Optional[DataSet]:
         return DataSet.query.get(dataset_id)
 
+    def get_detail(self, dataset_id: int) -> Optional[DataSet]:
+        """The dataset with everything its detail page shows, in a fixed number of queries.
+
+        Metadata, author, uploader profile and version/concept come joined with the dataset; the sibling
+        versions (with their dataset metadata), the file models and their files come in one IN query each.
+        """
+        from app.modules.fileModel.models import FileModel
+
+        siblings = joinedload(DataSet.version).joinedload(DatasetVersion.concept).selectinload(DatasetConcept.versions)
+        return (
+            DataSet.query.filter(DataSet.id == dataset_id)
+            .options(
+                joinedload(DataSet.ds_meta_data).joinedload(DSMetaData.author),
+                joinedload(DataSet.user).joinedload(User.profile),
+                siblings.joinedload(DatasetVersion.data_set).joinedload(BaseDataset.ds_meta_data),
+                selectinload(DataSet.file_models).selectinload(FileModel.files),
+            )
+            .first()
+        )
+
+    def count_downloads(self, dataset_id: int) -> int:
+        return self.session.query(func.count(Download.id)).filter(Download.dataset_id == dataset_id).scalar()
+
     def update_download_count(self, dataset, new_count):
         if not dataset:
             return None
@@ -167,5 +224,43 @@ class DOIMappingRepository(BaseRepository):
     def get_new_doi(self, old_doi: str) -> str:
         return self.model.query.filter_by(dataset_doi_old=old_doi).first()
 
+
+class DatasetDiffRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(DatasetDiff)
+
+    def get_by_pair(self, old_checksum: str, new_checksum: str, key_column: str = "") -> Optional[DatasetDiff]:
+        return self.model.query.filter_by(
+            old_checksum=old_checksum, new_checksum=new_checksum, key_column=key_column or ""
+        ).first()
+
+    def get_or_create_pending(self, old_checksum: str, new_checksum: str, key_column: str = "") -> DatasetDiff:
+        diff = self.get_by_pair(old_checksum, new_checksum, key_column)
+        if diff is None:
+            diff = self.model(old_checksum=old_checksum, new_checksum=new_checksum, key_column=key_column or "")
+            db.session.add(diff)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Otro proceso ha registrado el mismo par a la vez
+                db.session.rollback()
+                diff = self.get_by_pair(old_checksum, new_checksum, key_column)
+        return diff
+
+
+class UploadSessionRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(UploadSession)
+
+    def get_for_user(self, upload_id: str, user_id: int, lock: bool = False) -> Optional[UploadSession]:
+        query = self.model.query.filter_by(id=upload_id, user_id=user_id)
+        if lock:
+            # SELECT ... FOR UPDATE: serializa las peticiones concurrentes sobre la misma subida
+            query = query.with_for_update()
+        return query.first()
+
+    def get_stale(self, cutoff: datetime) -> List[UploadSession]:
+        return self.model.query.filter(self.model.updated_at < cutoff).all()
+
 #He utilizado parcialmente la inteligencia artificial (IA) como herramienta de apoyo durante el desarrollo y modificación de este archivo de código.
 #La IA me ha ayudado a entender, optimizar y automatizar ciertas tareas, pero la implementación final y las decisiones clave han sido realizadas por mí.
\ No newline at end of file
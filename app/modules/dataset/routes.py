@@ -1,4 +1,3 @@
-import json
 import logging
 import os
 import shutil
@@ -15,18 +14,27 @@ from werkzeug.utils import secure_filename
 
 from app import db
 from app.modules.dataset import dataset_bp
+from app.modules.dataset.detail import DatasetDetailService
+from app.modules.dataset.doi_resolver import doi_resolver
 from app.modules.dataset.forms import DataSetForm, VersionUploadForm
 from app.modules.dataset.models import DSDownloadRecord
 from app.modules.dataset.services import (
     AuthorService,
+    CSVValidationService,
     DataSetService,
+    DatasetDiffService,
+    DatasetPublicationService,
     DOIMappingService,
     DSDownloadRecordService,
     DSMetaDataService,
     DSViewRecordService,
-    calculate_checksum_and_size,
+    UploadSessionError,
+    UploadSessionService,
+    save_and_hash,
 )
 from app.modules.fakenodo.services import FakenodoService
+from app.modules.hubfile import compression
+from app.modules.hubfile.services import HubfileTabularService
 from app.utils import notifications
 from app.utils.notifications import notify_followers_of_author
 
@@ -41,6 +49,55 @@ dsmetadata_service = DSMetaDataService()
 fakenodo_service = FakenodoService()
 doi_mapping_service = DOIMappingService()
 ds_view_record_service = DSViewRecordService()
+dataset_detail_service = DatasetDetailService()
+dataset_diff_service = DatasetDiffService()
+upload_session_service = UploadSessionService()
+hubfile_tabular_service = HubfileTabularService()
+csv_validation_service = CSVValidationService()
+publication_service = DatasetPublicationService()
+
+
+def _validate_temp_csv(filename, upload_id=None):
+    """Validates a CSV of the user's temp folder before creating a dataset from it.
+
+    Returns ``(report, error_response)``. The report is None when the file is big enough to be
+    validated in the background once the dataset exists. An invalid file is deleted, together with
+    the upload session it came from.
+    """
+    paths = {filename: os.path.join(current_user.temp_folder(), filename)}
+    if csv_validation_service.should_run_async(paths):
+        return None, None
+    # Por debajo del umbral se valida en este proceso: arrancar un pool costaría más que validar
+    report = csv_validation_service.validate_files(paths, workers=1)
+    if report["valid"]:
+        return report, None
+    for path in paths.values():
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    if upload_id:
+        upload_session_service.abort(upload_id, current_user)
+    return report, (jsonify({"message": "The CSV file is not valid", "validation": report}), 400)
+
+
+def _claim_upload(upload_id):
+    """Claims the upload session of the request, if any. Returns an error response when it cannot."""
+    if not upload_id:
+        return None
+    try:
+        upload_session_service.claim(upload_id, current_user)
+    except UploadSessionError as exc:
+        return jsonify({"message": str(exc)}), exc.status_code
+    return None
+
+
+def _release_upload(upload_id):
+    if upload_id:
+        try:
+            upload_session_service.release(upload_id, current_user)
+        except UploadSessionError:
+            logger.exception("Could not release upload session %s", upload_id)
 
 
 @dataset_bp.route("/dataset/upload", methods=["GET", "POST"])
@@ -73,32 +130,39 @@ def upload_csv():
         return render_template("dataset/upload_tabular.html", form=form)
 
     # POST: procesamos la solicitud cuando el usuario envía el formulario con un archivo CSV.
-    # 1) Obtenemos el archivo CSV de la solicitud.
-    csv_file = request.files.get("csv_file")
-    if csv_file is None or csv_file.filename == "":
-        return jsonify({"message": "No CSV file uploaded"}), 400
+    # 1) El CSV llega en la propia petición o ya subido por trozos (sesión de subida reanudable).
+    upload_id = request.form.get("upload_id")
+    if upload_id:
+        try:
+            filename, file_digest = upload_session_service.get_completed(upload_id, current_user)
+        except UploadSessionError as exc:
+            return jsonify({"message": str(exc)}), exc.status_code
+    else:
+        csv_file = request.files.get("csv_file")
+        if csv_file is None or csv_file.filename == "":
+            return jsonify({"message": "No CSV file uploaded"}), 400
 
-    filename = secure_filename(csv_file.filename)
-    if not filename.lower().endswith(".csv"):
-        return jsonify({"message": "Please upload a .csv file"}), 400
+        filename = secure_filename(csv_file.filename)
+        if not filename.lower().endswith(".csv"):
+            return jsonify({"message": "Please upload a .csv file"}), 400
+
+        # 2) Guardamos el archivo en una carpeta temporal del usuario.
+        temp_folder = current_user.temp_folder()
+        os.makedirs(temp_folder, exist_ok=True)
 
-    # 2) Guardamos el archivo en una carpeta temporal del usuario.
-    temp_folder = current_user.temp_folder()
-    os.makedirs(temp_folder, exist_ok=True)
-
-    dest_path = os.path.join(temp_folder, filename)
-    if os.path.exists(dest_path):
-        base, ext = os.path.splitext(filename)
-        i = 1
-        while os.path.exists(os.path.join(temp_folder, f"{base} ({i}){ext}")):
-            i += 1
-        filename = f"{base} ({i}){ext}"
         dest_path = os.path.join(temp_folder, filename)
+        if os.path.exists(dest_path):
+            base, ext = os.path.splitext(filename)
+            i = 1
+            while os.path.exists(os.path.join(temp_folder, f"{base} ({i}){ext}")):
+                i += 1
+            filename = f"{base} ({i}){ext}"
+            dest_path = os.path.join(temp_folder, filename)
 
-    try:
-        csv_file.save(dest_path)
-    except Exception as exc:
-        return jsonify({"message": f"Could not save uploaded file: {exc}"}), 500
+        try:
+            file_digest = save_and_hash(csv_file, dest_path)
+        except Exception as exc:
+            return jsonify({"message": f"Could not save uploaded file: {exc}"}), 500
 
     # 3) Rellenamos los campos del formulario con los datos del POST
     form.title.data = request.form.get("title")
@@ -125,56 +189,48 @@ def upload_csv():
         logger.debug("upload_csv validation failed: %s", form.errors)
         return jsonify({"message": form.errors}), 400
 
+    # 5.1) Validación estructural del CSV: en línea si es pequeño, en segundo plano si es grande
+    validation, error_response = _validate_temp_csv(filename, upload_id)
+    if error_response:
+        return error_response
+
+    # 5.2) Con la petición ya validada reclamamos la subida por trozos, para que no se use dos veces
+    claim_error = _claim_upload(upload_id)
+    if claim_error:
+        return claim_error
+
     # 6) Creamos el dataset en la base de datos y movemos el archivo al directorio final.
+    dataset = None
     try:
         logger.info("Creating dataset...")
-        dataset = dataset_service.create_from_form(form=form, current_user=current_user)
+        dataset = dataset_service.create_from_form(
+            form=form,
+            current_user=current_user,
+            file_digests={filename: file_digest},
+            validation_status="valid" if validation else "validating",
+            validation_report=validation,
+        )
         logger.info(f"Created dataset with ID: {dataset.id} and title: {dataset.ds_meta_data.title}")
-        dataset_service.move_file_models(dataset)
+        # Si se valida en segundo plano, el fichero entra en el almacén de blobs tras validarse
+        dataset_service.move_file_models(dataset, ingest=validation is not None)
     except Exception as exc:
         logger.exception(f"Error creating dataset: {exc}")
+        if dataset is None:
+            _release_upload(upload_id)
         return jsonify({"message": str(exc)}), 500
-    
-    # send dataset as deposition to Fakenodo
-    data = {}
-    try:
-        fakenodo_response_json = fakenodo_service.create_new_deposition(dataset)
-        response_data = json.dumps(fakenodo_response_json)
-        data = json.loads(response_data)
-    except Exception as exc:
-        data = {}
-        fakenodo_response_json = {}
-        logger.exception(f"Exception while create dataset data in Fakenodo {exc}")
 
-    if data.get("conceptrecid"):
-        deposition_id = data.get("id")
+    # 6.1) Un CSV grande se valida en segundo plano y se publica cuando resulte válido
+    if validation is None:
+        csv_validation_service.schedule_dataset_validation(dataset, publish=True)
+        return jsonify({
+            "message": "Dataset created, its CSV file is being validated and will then be published",
+            "dataset_id": dataset.id,
+            "validation_url": url_for("dataset.get_dataset_validation", dataset_id=dataset.id),
+            "publication_url": url_for("dataset.get_dataset_publication", dataset_id=dataset.id),
+        }), 202
 
-        # update dataset with deposition id in Fakenodo
-        dataset_service.update_dsmetadata(dataset.ds_meta_data_id, deposition_id=deposition_id)
-
-        try:
-            # iterate for each file model (one file model = one request to Fakenodo)
-            for file_model in dataset.file_models:
-                fakenodo_service.upload_file(dataset, deposition_id, file_model)
-
-            # publish deposition
-            fakenodo_service.publish_deposition(deposition_id)
-
-            # update DOI; also set publication_doi if it's empty
-            deposition_doi = fakenodo_service.get_doi(deposition_id)
-            current_pub_doi = getattr(dataset.ds_meta_data, "publication_doi", None)
-            if not current_pub_doi:
-                # Set publication_doi to resolvable RubikHub URL
-                domain = os.getenv("DOMAIN", "localhost")
-                publication_url = f"http://{domain}/doi/{deposition_doi}"
-                dataset_service.update_dsmetadata(dataset.ds_meta_data_id, dataset_doi=deposition_doi, publication_doi=publication_url)
-                dataset_service.update_version_doi(dataset.id)
-            else:
-                dataset_service.update_dsmetadata(dataset.ds_meta_data_id, dataset_doi=deposition_doi)
-                dataset_service.update_version_doi(dataset.id)
-        except Exception as e:
-            msg = f"it has not been possible upload feature models in Fakenodo and update the DOI: {e}"
-            return jsonify({"message": msg}), 200
+    # 7) La publicación en Fakenodo (depósito, ficheros, publicación y DOI) se hace en segundo plano
+    publication_service.start(dataset)
 
     # Finalmente, redirigimos al usuario a la lista de datasets.
     return redirect(url_for("dataset.list_dataset"))
@@ -194,37 +250,46 @@ def list_dataset():
 @login_required
 def upload():
     # Save uploaded CSV to user's temp folder (Backward-compatible endpoint).
-    file = request.files.get("csv_file")
-    temp_folder = current_user.temp_folder()
+    # A completed resumable upload session can be referenced instead of sending the file again.
+    upload_id = request.form.get("upload_id")
+    if upload_id:
+        try:
+            new_filename, file_digest = upload_session_service.get_completed(upload_id, current_user)
+        except UploadSessionError as exc:
+            return jsonify({"message": str(exc)}), exc.status_code
+    else:
+        file = request.files.get("csv_file")
+        temp_folder = current_user.temp_folder()
 
-    if file is None or not file.filename or not file.filename.lower().endswith(".csv"):
-        return jsonify({"message": "No valid file"}), 400
+        if file is None or not file.filename or not file.filename.lower().endswith(".csv"):
+            return jsonify({"message": "No valid file"}), 400
 
-    os.makedirs(temp_folder, exist_ok=True)
+        os.makedirs(temp_folder, exist_ok=True)
 
-    # ensure unique filename in temp folder
-    file_path = os.path.join(temp_folder, file.filename)
-    if os.path.exists(file_path):
-        base_name, extension = os.path.splitext(file.filename)
-        i = 1
-        while os.path.exists(os.path.join(temp_folder, f"{base_name} ({i}){extension}")):
-            i += 1
-        new_filename = f"{base_name} ({i}){extension}"
-        file_path = os.path.join(temp_folder, new_filename)
-    else:
-        new_filename = file.filename
+        # ensure unique filename in temp folder
+        file_path = os.path.join(temp_folder, file.filename)
+        if os.path.exists(file_path):
+            base_name, extension = os.path.splitext(file.filename)
+            i = 1
+            while os.path.exists(os.path.join(temp_folder, f"{base_name} ({i}){extension}")):
+                i += 1
+            new_filename = f"{base_name} ({i}){extension}"
+            file_path = os.path.join(temp_folder, new_filename)
+        else:
+            new_filename = file.filename
 
-    try:
-        file.save(file_path)
-    except Exception as e:
-        logger.exception("Error saving uploaded file: %s", e)
-        return jsonify({"message": str(e)}), 500
+        try:
+            file_digest = save_and_hash(file, file_path)
+        except Exception as e:
+            logger.exception("Error saving uploaded file: %s", e)
+            return jsonify({"message": str(e)}), 500
 
     # If the POST contains dataset fields (tabular multi-step flow), create the dataset now.
     # We check for presence of a title or explicit dataset_type to detect the multi-step form.
     dataset_type = request.form.get("dataset_type")
     title = request.form.get("title")
     if dataset_type == "tabular" or title:
+        dataset = None
         try:
             # Build a DataSetForm without CSRF for this programmatic flow
             form = DataSetForm(meta={"csrf": False})
@@ -251,18 +316,93 @@ def upload():
                 # return errors so the client can show them (keep compatible with JSON/redirect flows)
                 return jsonify({"message": form.errors}), 400
 
+            validation, error_response = _validate_temp_csv(new_filename, upload_id)
+            if error_response:
+                return error_response
+
+            claim_error = _claim_upload(upload_id)
+            if claim_error:
+                return claim_error
+
             # Create dataset and move files
             logger.info("Creating dataset from /dataset/file/upload...")
-            dataset = dataset_service.create_from_form(form=form, current_user=current_user)
-            dataset_service.move_file_models(dataset)
+            dataset = dataset_service.create_from_form(
+                form=form,
+                current_user=current_user,
+                file_digests={new_filename: file_digest},
+                validation_status="valid" if validation else "validating",
+                validation_report=validation,
+            )
+            dataset_service.move_file_models(dataset, ingest=validation is not None)
+            if validation is None:
+                csv_validation_service.schedule_dataset_validation(dataset)
         except Exception as exc:
             logger.exception("Error creating dataset from uploaded file: %s", exc)
+            if dataset is None:
+                _release_upload(upload_id)
             return jsonify({"message": str(exc)}), 500
 
     # Redirect to dataset list in the browser
     return redirect(url_for("dataset.list_dataset"))
 
 
+@dataset_bp.route("/dataset/upload/sessions", methods=["POST"])
+@login_required
+def start_upload_session():
+    """Starts a resumable upload. JSON body: ``filename`` and optionally ``total_size`` and ``chunk_size``."""
+    data = request.get_json(silent=True) or {}
+    try:
+        session = upload_session_service.start(
+            current_user, data.get("filename"), total_size=data.get("total_size"), chunk_size=data.get("chunk_size")
+        )
+    except (UploadSessionError, ValueError, TypeError) as exc:
+        return jsonify({"message": str(exc)}), getattr(exc, "status_code", 400)
+    return jsonify(session.to_dict()), 201
+
+
+@dataset_bp.route("/dataset/upload/sessions/<upload_id>", methods=["GET"])
+@login_required
+def get_upload_session(upload_id):
+    try:
+        session = upload_session_service.get_session(upload_id, current_user)
+    except UploadSessionError as exc:
+        return jsonify({"message": str(exc)}), exc.status_code
+    return jsonify(session.to_dict()), 200
+
+
+@dataset_bp.route("/dataset/upload/sessions/<upload_id>/chunks/<int:index>", methods=["PUT"])
+@login_required
+def put_upload_chunk(upload_id, index):
+    """Raw chunk body; ``X-Chunk-Checksum`` carries its sha256 hex digest."""
+    try:
+        session = upload_session_service.put_chunk(
+            upload_id, current_user, index, request.stream, request.headers.get("X-Chunk-Checksum")
+        )
+    except UploadSessionError as exc:
+        return jsonify({"message": str(exc)}), exc.status_code
+    return jsonify(session.to_dict()), 200
+
+
+@dataset_bp.route("/dataset/upload/sessions/<upload_id>/complete", methods=["POST"])
+@login_required
+def complete_upload_session(upload_id):
+    try:
+        session = upload_session_service.complete(upload_id, current_user)
+    except UploadSessionError as exc:
+        return jsonify({"message": str(exc)}), exc.status_code
+    return jsonify(session.to_dict()), 200
+
+
+@dataset_bp.route("/dataset/upload/sessions/<upload_id>", methods=["DELETE"])
+@login_required
+def abort_upload_session(upload_id):
+    try:
+        upload_session_service.abort(upload_id, current_user)
+    except UploadSessionError as exc:
+        return jsonify({"message": str(exc)}), exc.status_code
+    return jsonify({"message": "Upload session aborted"}), 200
+
+
 @dataset_bp.route("/dataset/file/delete", methods=["POST"])
 def delete():
     data = request.get_json()
@@ -295,10 +435,10 @@ def download_dataset(dataset_id):
 
                 relative_path = os.path.relpath(full_path, file_path)
 
-                zipf.write(
-                    full_path,
-                    arcname=os.path.join(os.path.basename(zip_path[:-4]), relative_path),
-                )
+                # Los ficheros pueden estar comprimidos con zstd: el zip lleva siempre el contenido original
+                arcname = os.path.join(os.path.basename(zip_path[:-4]), relative_path)
+                with zipf.open(arcname, "w", force_zip64=True) as entry:
+                    compression.copy_payload(full_path, entry)
 
     user_cookie = request.cookies.get("download_cookie")
     if not user_cookie:
@@ -340,24 +480,26 @@ def download_dataset(dataset_id):
 @dataset_bp.route("/dataset/doi/<path:doi>/", methods=["GET"])
 def subdomain_index(doi):
 
-    # Check if the DOI is an old DOI
-    new_doi = doi_mapping_service.get_new_doi(doi)
-    if new_doi:
+    # El resolvedor cachea si el DOI es antiguo (redirección) o a qué dataset apunta
+    kind, target = doi_resolver.resolve_landing(doi)
+    if kind == "redirect":
         # Redirect to the same path with the new DOI
-        return redirect(url_for("dataset.subdomain_index", doi=new_doi), code=302)
+        return redirect(url_for("dataset.subdomain_index", doi=target), code=302)
 
-    # Try to search the dataset by the provided DOI (which should already be the new one)
-    dataset = dataset_service.filter_by_doi(doi)
+    # Todo lo que pinta la ficha se carga de una vez (número fijo de consultas)
+    detail = dataset_detail_service.assemble(target) if kind == "dataset" else None
 
-    if not dataset:
+    if not detail:
         abort(404)
-    
+    dataset = detail["dataset"]
+
     domain = os.getenv("DOMAIN", "localhost")
     version_url = f"http://{domain}/dataset/doi/{doi}"
 
     user_cookie = ds_view_record_service.create_cookie(dataset=dataset)
-    downloads = DataSetService().get_number_of_downloads(dataset.id)
-    resp = make_response(render_template("dataset/view_dataset.html", dataset=dataset, downloads=downloads, version_url=version_url))
+    resp = make_response(
+        render_template("dataset/view_dataset.html", dataset=dataset, detail=detail, version_url=version_url)
+    )
     resp.set_cookie("view_cookie", user_cookie)
 
     return resp
@@ -377,14 +519,12 @@ def resolve_doi(doi):
     - Look up DSMetaData by dataset_doi to find the dataset for context.
     - Look up Fakenodo record by DOI to display repository data stored in DB.
     """
+    resolved = doi_resolver.resolve_record(doi)
     # Dataset context
-    dsmd = dsmetadata_service.filter_by_doi(doi)
-    dataset = None
-    if dsmd and getattr(dsmd, "id", None):
-        dataset = dataset_service.repository.model.query.filter_by(ds_meta_data_id=dsmd.id).first()
+    dataset = dataset_service.get_by_id(resolved["dataset_id"]) if resolved["dataset_id"] else None
 
     # Fakenodo record by DOI
-    record = fakenodo_service.get_by_doi(doi)
+    record = fakenodo_service.get_deposition(resolved["deposition_id"]) if resolved["deposition_id"] else None
 
     return render_template("dataset/fakenodo_record.html", dataset=dataset, record=record)
 
@@ -397,8 +537,67 @@ def get_unsynchronized_dataset(dataset_id):
     if not dataset:
         abort(404)
 
-    downloads = DataSetService().get_number_of_downloads(dataset.id)
-    return render_template("dataset/view_dataset.html", dataset=dataset, downloads=downloads)
+    detail = dataset_detail_service.assemble(dataset.id)
+    return render_template("dataset/view_dataset.html", dataset=detail["dataset"], detail=detail)
+
+
+@dataset_bp.route("/dataset/<int:dataset_id>/diff/<int:other_dataset_id>", methods=["GET"])
+def diff_datasets(dataset_id, other_dataset_id):
+    """Row-level diff between the CSV files of two datasets (e.g. two versions).
+
+    ``?key=`` sets a key column and ``?retry=1`` recomputes diffs that failed.
+    """
+    old_dataset = dataset_service.get_or_404(dataset_id)
+    new_dataset = dataset_service.get_or_404(other_dataset_id)
+
+    for ds in (old_dataset, new_dataset):
+        # Los datasets no publicados solo los puede ver su propietario
+        if not ds.ds_meta_data.dataset_doi and (not current_user.is_authenticated or ds.user_id != current_user.id):
+            abort(404)
+
+    key_column = request.args.get("key", "").strip()
+    retry = request.args.get("retry", "").lower() in ("1", "true", "yes")
+    file_pairs = dataset_diff_service.get_file_pairs(old_dataset, new_dataset)
+    if key_column:
+        missing_in = dataset_diff_service.missing_key_column(file_pairs, key_column)
+        if missing_in is not None:
+            return jsonify({"message": f"Key column '{key_column}' not found in {missing_in}"}), 400
+
+    files = []
+    for old_file, new_file in file_pairs:
+        diff = dataset_diff_service.diff_hubfiles(old_file, new_file, key_column=key_column, retry=retry)
+        files.append({"old_file": old_file.name, "new_file": new_file.name, **diff.to_dict()})
+
+    pending = any(f["status"] == "pending" for f in files)
+    return jsonify({"success": True, "pending": pending, "files": files}), 202 if pending else 200
+
+
+@dataset_bp.route("/dataset/<int:dataset_id>/validation", methods=["GET"])
+@login_required
+def get_dataset_validation(dataset_id):
+    dataset = dataset_service.get_or_404(dataset_id)
+    if dataset.user_id != current_user.id:
+        abort(404)
+    return jsonify({
+        "dataset_id": dataset.id,
+        "status": dataset.validation_status,
+        "report": dataset.validation_report,
+    }), 200
+
+
+@dataset_bp.route("/dataset/<int:dataset_id>/publication", methods=["GET"])
+@login_required
+def get_dataset_publication(dataset_id):
+    dataset = dataset_service.get_or_404(dataset_id)
+    if dataset.user_id != current_user.id:
+        abort(404)
+    job = publication_service.get_job(dataset)
+    return jsonify({
+        "dataset_id": dataset.id,
+        "state": dataset.publication_state,
+        "dataset_doi": dataset.ds_meta_data.dataset_doi,
+        "job": job.to_dict() if job else None,
+    }), 200
 
 
 @dataset_bp.route("/dataset/<int:dataset_id>/sync", methods=["POST"])
@@ -433,6 +632,14 @@ def sync_dataset(dataset_id):
         flash("No tienes permiso para publicar este dataset.", "danger")
         return redirect(url_for("dataset.list_dataset"))
 
+    # Los CSV tienen que haber superado la validación antes de publicar
+    if ds_any.validation_status == "validating":
+        flash("El CSV de este dataset todavía se está validando.", "info")
+        return redirect(url_for("dataset.list_dataset"))
+    if ds_any.validation_status == "invalid":
+        flash("El CSV de este dataset no es válido y no se puede publicar.", "danger")
+        return redirect(url_for("dataset.list_dataset"))
+
     # Check if it's already synchronized
     existing_doi = getattr(getattr(ds_any, "ds_meta_data", None), "dataset_doi", None)
     if existing_doi:
@@ -440,51 +647,24 @@ def sync_dataset(dataset_id):
         flash("Este dataset ya está publicado en el repositorio remoto.", "info")
         return redirect(url_for("dataset.list_dataset"))
 
-    # At this point we have the dataset object to publish
+    # At this point we have the dataset object to publish: the pipeline runs as a background job
+    # and resumes from the last completed step if a previous attempt was interrupted
     dataset = ds_any
-    print("aqui")
-
     try:
-        # Create deposition
-        resp = fakenodo_service.create_new_deposition(dataset)
-        deposition_id = resp.get("id") if resp else None
-        if not deposition_id:
-            flash("No se pudo crear la deposition en el repositorio remoto.", "danger")
-            return redirect(url_for("dataset.get_unsynchronized_dataset", dataset_id=dataset.id))
-
-        # Save deposition id
-        dataset_service.update_dsmetadata(dataset.ds_meta_data_id, deposition_id=deposition_id)
-
-        # Upload files: feature_models and file_models (if present)
-        for fm in getattr(dataset, "feature_models", []) + getattr(dataset, "file_models", []):
-            try:
-                fakenodo_service.upload_file(dataset, deposition_id, fm)
-            except Exception as exc:
-                # Log and continue with other files
-                logger.exception("Error subiendo fichero para dataset %s fm=%s: %s", dataset.id, getattr(fm, "id", "?"), exc)
-
-        # Publish deposition
-        fakenodo_service.publish_deposition(deposition_id)
-        doi = fakenodo_service.get_doi(deposition_id)
-
-        # Update dataset DOI (this marks it as synchronized); also set publication_doi if empty
-        current_pub_doi = getattr(dataset.ds_meta_data, "publication_doi", None)
-        if not current_pub_doi:
-            domain = os.getenv("DOMAIN", "localhost")
-            publication_url = f"http://{domain}/dataset/doi/{doi}"
-            dataset_service.update_dsmetadata(dataset.ds_meta_data_id, dataset_doi=doi, publication_doi=publication_url)
-            dataset_service.update_version_doi(dataset.id)
-        else:
-            dataset_service.update_dsmetadata(dataset.ds_meta_data_id, dataset_doi=doi)
-            dataset_service.update_version_doi(dataset.id)
-
-        flash(f"Dataset publicado correctamente. DOI: {doi}", "success")
-        return redirect(url_for("dataset.list_dataset"))
+        job = publication_service.start(dataset)
     except Exception as exc:
         logger.exception("Error sincronizando dataset %s: %s", dataset_id, exc)
         flash(f"Error sincronizando dataset: {exc}", "danger")
         return redirect(url_for("dataset.get_unsynchronized_dataset", dataset_id=dataset_id))
 
+    if dataset.ds_meta_data.dataset_doi:
+        flash(f"Dataset publicado correctamente. DOI: {dataset.ds_meta_data.dataset_doi}", "success")
+    elif job is not None and job.status == "failed":
+        flash(f"Error sincronizando dataset: {job.error}", "danger")
+    else:
+        flash("La publicación del dataset está en curso.", "info")
+    return redirect(url_for("dataset.list_dataset"))
+
 
 @dataset_bp.route("/dataset/view/<int:dataset_id>/newversion", methods=["GET", "POST"])
 @login_required
@@ -549,7 +729,7 @@ def upload_new_version(dataset_id):
             filename = f"{base} ({i}){ext}"
             dest_path = os.path.join(temp_folder, filename)
         
-        csv_file.save(dest_path)
+        file_digest = save_and_hash(csv_file, dest_path)
     
     dataset_service.update_dsmetadata(
         dataset.ds_meta_data_id,
@@ -605,13 +785,15 @@ def upload_new_version(dataset_id):
                 hubfile = fm.files[0]
                 hubfile.name = filename
                 new_path = os.path.join(new_dataset_dir, filename)
-                checksum, size = calculate_checksum_and_size(new_path)
-                hubfile.checksum = checksum
-                hubfile.size = size
+                hubfile.checksum, hubfile.size = file_digest
+                dataset_service.store_blob(hubfile, new_path)
                 db.session.add(hubfile)
         
         db.session.commit()
 
+        # Calculamos en segundo plano qué filas han cambiado respecto a la versión anterior
+        dataset_diff_service.schedule_dataset_diff(dataset, new_dataset)
+
         try:
             dep_id = getattr(dataset.ds_meta_data, "deposition_id", None)
             if dep_id:
@@ -634,6 +816,7 @@ def upload_new_version(dataset_id):
                 else:
                     dataset_service.update_dsmetadata(new_dataset.ds_meta_data_id, dataset_doi=new_doi)
                     dataset_service.update_version_doi(version.id)
+                hubfile_tabular_service.schedule_dataset_cache_build(new_dataset)
         except Exception as exc:
             logger.exception("Error publishing new version to FakeNODO: %s", exc)
             flash("Se creó la nueva versión, pero falló la publicación en el repositorio.", "warning")
@@ -660,6 +843,7 @@ def upload_new_version(dataset_id):
                 else:
                     dataset_service.update_dsmetadata(new_dataset.ds_meta_data_id, dataset_doi=new_doi)
                     dataset_service.update_version_doi(version.id)
+                hubfile_tabular_service.schedule_dataset_cache_build(new_dataset)
         except Exception as exc:
             logger.exception("Error publishing new version to FakeNODO: %s", exc)
             flash("Se creó la nueva versión, pero falló la publicación en el repositorio.", "warning")
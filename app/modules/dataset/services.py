@@ -1,42 +1,60 @@
+import csv
 import hashlib
 import logging
 import os
 import shutil
+import threading
 import uuid
+from datetime import datetime, timedelta
 from typing import Optional
 
 from flask import request
+from werkzeug.utils import secure_filename
 
 from app import db
+from app.modules.auth.models import User
 from app.modules.auth.services import AuthenticationService
+from app.modules.dataset.diff import diff_csv_files
 from app.modules.dataset.models import DataSet, DatasetVersion, DSMetaData, DSViewRecord
 from app.modules.dataset.repositories import (
     AuthorRepository,
+    DatasetDiffRepository,
     DataSetRepository,
     DOIMappingRepository,
     DownloadRepository,
     DSDownloadRecordRepository,
     DSMetaDataRepository,
     DSViewRecordRepository,
+    UploadSessionRepository,
 )
+from app.modules.dataset.validation import validate_csv
+from app.modules.fakenodo.services import FakenodoService
+from app.modules.feed.services import FeedService
 from app.modules.fileModel.repositories import FileModelRepository, FMMetaDataRepository
+from app.modules.hubfile import blobstore, columnar
+from app.modules.hubfile.models import Hubfile
 from app.modules.hubfile.repositories import (
     HubfileDownloadRecordRepository,
     HubfileRepository,
     HubfileViewRecordRepository,
 )
+from app.modules.hubfile.services import HubfileService, HubfileTabularService
 from app.utils import notifications
+from core.jobs import enqueue
+from core.jobs.models import Job
 from core.services.BaseService import BaseService
 
 logger = logging.getLogger(__name__)
 
 
 def calculate_checksum_and_size(file_path):
-    file_size = os.path.getsize(file_path)
-    with open(file_path, "rb") as file:
-        content = file.read()
-        hash_md5 = hashlib.md5(content, usedforsecurity=False).hexdigest()
-        return hash_md5, file_size
+    # sha256: es también la clave del fichero en el almacén de blobs
+    return blobstore.hash_file(file_path)
+
+
+def save_and_hash(file_storage, dest_path):
+    """Saves an uploaded file and returns its ``(checksum, size)``, computed while it is being written."""
+    return blobstore.write_and_hash(file_storage.stream, dest_path)
 
 
 class DataSetService(BaseService):
@@ -77,7 +95,12 @@ class DataSetService(BaseService):
     def update_download_count(self, dataset_id):
         self.download_repository.create_download_record(dataset_id=dataset_id)
 
-    def move_file_models(self, dataset: DataSet):
+    def move_file_models(self, dataset: DataSet, ingest: bool = True):
+        """Moves the dataset's CSVs from the temp folder to its directory.
+
+        With ``ingest`` they also enter the blob store (and get compressed); files validated in the
+        background are ingested by the validation job instead, once it has read them as plain files.
+        """
         current_user = AuthenticationService().get_authenticated_user()
         source_dir = current_user.temp_folder()
 
@@ -117,8 +140,21 @@ class DataSetService(BaseService):
                 except Exception:
                     pass
                 shutil.move(src_path, new_dest)
+                final_path = new_dest
             else:
                 shutil.move(src_path, dest_dir)
+                final_path = dest_path
+
+            if ingest:
+                for hubfile in file_model.files:
+                    self.store_blob(hubfile, final_path)
+
+    def store_blob(self, hubfile: Hubfile, path: str):
+        """Moves the content of ``path`` into the blob store, leaving a hard link in its place."""
+        try:
+            hubfile.checksum = blobstore.ingest(path, checksum=hubfile.checksum)
+        except OSError:
+            logger.exception("Could not store %s in the blob store", path)
 
     def get_synchronized(self, current_user_id: int) -> DataSet:
         return self.repository.get_synchronized(current_user_id)
@@ -150,7 +186,16 @@ class DataSetService(BaseService):
     def total_dataset_views(self) -> int:
         return self.dsviewrecord_repostory.total_dataset_views()
 
-    def create_from_form(self, form, current_user) -> DataSet:
+    def create_from_form(
+        self, form, current_user, file_digests=None, validation_status=None, validation_report=None
+    ) -> DataSet:
+        """Creates the dataset described by ``form`` from the CSVs in the user's temp folder.
+
+        ``file_digests`` maps CSV filenames to the ``(checksum, size)`` computed while saving them;
+        files missing from it are hashed from disk. ``validation_status``/``validation_report``
+        record the structural validation of the CSVs (see ``CSVValidationService``).
+        """
+        file_digests = file_digests or {}
         main_author = {
             "name": f"{current_user.profile.surname}, {current_user.profile.name}",
             "affiliation": current_user.profile.affiliation,
@@ -202,7 +247,12 @@ class DataSetService(BaseService):
             # 3) Crear el TabularDataset asociado
             from app.modules.dataset.models import TabularDataset
 
-            dataset = TabularDataset(user_id=current_user.id, ds_meta_data_id=dsmetadata.id)
+            dataset = TabularDataset(
+                user_id=current_user.id,
+                ds_meta_data_id=dsmetadata.id,
+                validation_status=validation_status,
+                validation_report=validation_report,
+            )
             self.repository.session.add(dataset)
             self.repository.session.flush()  # Para tener dataset.id
 
@@ -275,8 +325,11 @@ class DataSetService(BaseService):
                 )
 
                 # 4.4 Crear Hubfile asociado al FileModel
-                file_path = os.path.join(current_user.temp_folder(), csv_filename)
-                checksum, size = calculate_checksum_and_size(file_path)
+                if csv_filename in file_digests:
+                    checksum, size = file_digests[csv_filename]
+                else:
+                    file_path = os.path.join(current_user.temp_folder(), csv_filename)
+                    checksum, size = calculate_checksum_and_size(file_path)
 
                 file = self.hubfilerepository.create(
                     commit=False,
@@ -370,6 +423,9 @@ class DataSetService(BaseService):
             return author.id
         return None
 
+    def get_title_options(self, user_id: int) -> list:
+        return self.repository.title_options(user_id)
+
     def get_top_downloaded_last_week(self, limit: int = 3):
         return self.repository.top_downloaded_last_week(limit)
         
@@ -413,10 +469,510 @@ class DataSetService(BaseService):
         return version
 
 
+class DatasetDiffService(BaseService):
+    """Row-level diffs between the CSV files of two datasets, cached per pair of file checksums."""
+
+    def __init__(self):
+        super().__init__(DatasetDiffRepository())
+        self.hubfile_service = HubfileService()
+
+    def get_file_pairs(self, old_dataset: DataSet, new_dataset: DataSet):
+        # Emparejamos los ficheros por orden de file model (un CSV por dataset en la práctica)
+        return list(zip(old_dataset.files(), new_dataset.files()))
+
+    def compute(self, old_path: str, new_path: str, old_checksum: str, new_checksum: str, key_column: str = ""):
+        diff = self.repository.get_or_create_pending(old_checksum, new_checksum, key_column)
+        if diff.status == "ready":
+            return diff
+        try:
+            diff.summary = diff_csv_files(old_path, new_path, key_column=key_column or None)
+            diff.status = "ready"
+            diff.error = None
+        except (ValueError, UnicodeDecodeError, csv.Error) as exc:
+            # Error del contenido: el resultado "failed" se cachea hasta que se pida un reintento
+            logger.warning("Diff %s -> %s failed: %s", old_checksum, new_checksum, exc)
+            diff.status = "failed"
+            diff.error = str(exc)
+        except OSError as exc:
+            # Error transitorio (fichero no disponible): el diff sigue pendiente y el trabajo se reintenta
+            logger.warning("Diff %s -> %s could not read its files: %s", old_checksum, new_checksum, exc)
+            diff.error = str(exc)
+            self.repository.session.commit()
+            raise
+        self.repository.session.commit()
+        return diff
+
+    def missing_key_column(self, file_pairs, key_column: str) -> Optional[str]:
+        """Name of the first file whose header lacks ``key_column`` (None when every file has it)."""
+        for pair in file_pairs:
+            for hubfile in pair:
+                header = next(columnar.iter_csv_rows(self.hubfile_service.get_path_by_hubfile(hubfile)), [])
+                if key_column not in header:
+                    return hubfile.name
+        return None
+
+    def diff_hubfiles(
+        self, old_hubfile: Hubfile, new_hubfile: Hubfile, key_column: str = "", background=True, retry=False
+    ):
+        """Returns the cached diff of two files; on a miss it is computed (in the background by default).
+
+        Failed diffs are cached too; ``retry`` discards a failed result and computes it again.
+        """
+        key_column = key_column or ""
+        diff = self.repository.get_by_pair(old_hubfile.checksum, new_hubfile.checksum, key_column)
+        if diff is not None and diff.status == "failed" and retry:
+            diff.status = "pending"
+            diff.error = None
+            self.repository.session.commit()
+        if diff is not None and diff.status in ("ready", "failed"):
+            return diff
+
+        args = (
+            self.hubfile_service.get_path_by_hubfile(old_hubfile),
+            self.hubfile_service.get_path_by_hubfile(new_hubfile),
+            old_hubfile.checksum,
+            new_hubfile.checksum,
+            key_column,
+        )
+        if not background:
+            return self.compute(*args)
+
+        diff = self.repository.get_or_create_pending(old_hubfile.checksum, new_hubfile.checksum, key_column)
+        enqueue(_compute_diff_task, *args, key=f"diff:{old_hubfile.checksum}:{new_hubfile.checksum}:{key_column}")
+        return diff
+
+    def schedule_dataset_diff(self, old_dataset: DataSet, new_dataset: DataSet):
+        """Precomputes the diffs of a new version against the dataset it was created from."""
+        for old_hubfile, new_hubfile in self.get_file_pairs(old_dataset, new_dataset):
+            if old_hubfile.checksum != new_hubfile.checksum:
+                self.diff_hubfiles(old_hubfile, new_hubfile)
+
+
+def _compute_diff_task(old_path, new_path, old_checksum, new_checksum, key_column):
+    diff = DatasetDiffService().compute(old_path, new_path, old_checksum, new_checksum, key_column)
+    return {"diff_id": diff.id, "status": diff.status}
+
+
+class CSVValidationService:
+    """Structural validation of the CSVs of new datasets (see ``validation.py``).
+
+    Files below ``CSV_VALIDATION_ASYNC_BYTES`` are validated before the dataset is created, in the
+    request process and without a worker pool; bigger ones are validated in the background (in
+    parallel) while the dataset stays in the "validating" state.
+    """
+
+    ASYNC_THRESHOLD = 64 * 1024 * 1024
+
+    def __init__(self):
+        self.hubfile_service = HubfileService()
+
+    def async_threshold(self) -> int:
+        return int(os.getenv("CSV_VALIDATION_ASYNC_BYTES", self.ASYNC_THRESHOLD))
+
+    def should_run_async(self, paths: dict) -> bool:
+        return sum(os.path.getsize(path) for path in paths.values()) >= self.async_threshold()
+
+    def validate_files(self, paths: dict, workers=None) -> dict:
+        """Validates ``{filename: path}`` and returns ``{"valid": bool, "files": {filename: report}}``."""
+        reports = {name: validate_csv(path, workers=workers) for name, path in paths.items()}
+        return {"valid": all(report["valid"] for report in reports.values()), "files": reports}
+
+    def schedule_dataset_validation(self, dataset: DataSet, publish: bool = False):
+        """Validates the dataset's CSVs in the background; with ``publish`` a valid dataset is then published."""
+        paths = {hubfile.name: self.hubfile_service.get_path_by_hubfile(hubfile) for hubfile in dataset.files()}
+        dataset.validation_status = "validating"
+        dataset.validation_report = None
+        db.session.commit()
+        return enqueue(
+            validate_dataset_files, dataset.id, paths, publish, key=f"validation:{dataset.id}", user_id=dataset.user_id
+        )
+
+
+def validate_dataset_files(dataset_id: int, paths: dict, publish: bool = False):
+    """Background task: validates the CSVs of a dataset and stores the outcome on it."""
+    try:
+        report = CSVValidationService().validate_files(paths)
+    except Exception as exc:
+        logger.exception("CSV validation of dataset %s failed", dataset_id)
+        report = {"valid": False, "error": str(exc), "files": {}}
+
+    dataset = DataSetRepository().get_by_id(dataset_id)
+    if dataset is None:
+        return report
+    # Los ficheros se validan antes de entrar en el almacén de blobs (sin comprimir, por trozos en paralelo)
+    dataset_service = DataSetService()
+    hubfile_service = HubfileService()
+    for hubfile in dataset.files():
+        path = hubfile_service.get_dataset_path_by_hubfile(hubfile)
+        if os.path.exists(path):
+            dataset_service.store_blob(hubfile, path)
+    dataset.validation_status = "valid" if report["valid"] else "invalid"
+    dataset.validation_report = report
+    db.session.commit()
+    if publish and report["valid"]:
+        DatasetPublicationService().start(dataset)
+    return report
+
+
+class DatasetPublicationService:
+    """Publishes datasets to Fakenodo as a resumable state machine run by a background job.
+
+    ``publication_state`` holds the last completed step: pending -> draft -> files_uploaded ->
+    published -> doi_recorded. A retried job resumes from that step, and every step first checks
+    what Fakenodo already has, so running it twice never duplicates depositions or files. If the
+    deposition is missing, the dataset goes back to "pending" and a new one is created.
+    """
+
+    PENDING = "pending"
+    DRAFT = "draft"
+    FILES_UPLOADED = "files_uploaded"
+    PUBLISHED = "published"
+    DOI_RECORDED = "doi_recorded"
+
+    def __init__(self):
+        self.fakenodo_service = FakenodoService()
+
+    def start(self, dataset: DataSet) -> Optional[Job]:
+        """Queues the publication of ``dataset`` (None if it is already published)."""
+        if dataset.publication_state == self.DOI_RECORDED:
+            return None
+        if dataset.publication_state is None:
+            dataset.publication_state = self.PENDING
+            db.session.commit()
+        return enqueue(publish_dataset, dataset.id, key=f"publication:{dataset.id}", user_id=dataset.user_id)
+
+    def get_job(self, dataset: DataSet) -> Optional[Job]:
+        return Job.query.filter_by(key=f"publication:{dataset.id}").order_by(Job.created_at.desc()).first()
+
+    def advance(self, dataset: DataSet) -> str:
+        """Runs the remaining steps and returns the final state."""
+        steps = {
+            None: self._create_deposition,
+            self.PENDING: self._create_deposition,
+            self.DRAFT: self._upload_files,
+            self.FILES_UPLOADED: self._publish,
+            self.PUBLISHED: self._record_doi,
+        }
+        while dataset.publication_state in steps:
+            steps[dataset.publication_state](dataset)
+        return dataset.publication_state
+
+    def _deposition(self, dataset: DataSet):
+        deposition_id = dataset.ds_meta_data.deposition_id
+        return self.fakenodo_service.get_deposition_obj(deposition_id) if deposition_id else None
+
+    def _create_deposition(self, dataset: DataSet):
+        if self._deposition(dataset) is None:
+            response = self.fakenodo_service.create_new_deposition(dataset)
+            dataset.ds_meta_data.deposition_id = response["id"]
+        dataset.publication_state = self.DRAFT
+        db.session.commit()
+
+    def _restart_if_missing(self, dataset: DataSet, deposition) -> bool:
+        """Sends the dataset back to "pending" when its deposition is unset or gone from Fakenodo."""
+        if deposition is not None:
+            return False
+        logger.warning(
+            "Deposition %s of dataset %s not found, creating it again", dataset.ds_meta_data.deposition_id, dataset.id
+        )
+        dataset.publication_state = self.PENDING
+        db.session.commit()
+        return True
+
+    def _upload_files(self, dataset: DataSet):
+        deposition = self._deposition(dataset)
+        if self._restart_if_missing(dataset, deposition):
+            return
+        uploaded = self.fakenodo_service.get_file_names(deposition.id)
+        for file_model in dataset.file_models:
+            name = file_model.files[0].name if file_model.files else file_model.fm_meta_data.csv_filename
+            if name not in uploaded:
+                self.fakenodo_service.upload_file(dataset, deposition.id, file_model)
+        dataset.publication_state = self.FILES_UPLOADED
+        db.session.commit()
+
+    def _publish(self, dataset: DataSet):
+        deposition = self._deposition(dataset)
+        if self._restart_if_missing(dataset, deposition):
+            return
+        if deposition.status != "published":
+            self.fakenodo_service.publish_deposition(dataset.ds_meta_data.deposition_id)
+        dataset.publication_state = self.PUBLISHED
+        db.session.commit()
+
+    def _record_doi(self, dataset: DataSet):
+        doi = self.fakenodo_service.get_doi(dataset.ds_meta_data.deposition_id)
+        if not doi:
+            raise RuntimeError(f"Deposition {dataset.ds_meta_data.deposition_id} has no DOI")
+        dataset.ds_meta_data.dataset_doi = doi
+        if not dataset.ds_meta_data.publication_doi:
+            domain = os.getenv("DOMAIN", "localhost")
+            dataset.ds_meta_data.publication_doi = f"http://{domain}/dataset/doi/{doi}"
+        dataset.version_doi = doi
+        dataset.publication_state = self.DOI_RECORDED
+        db.session.commit()
+
+
+def publish_dataset(dataset_id: int):
+    """Background task: advances the publication of a dataset as far as it can go."""
+    dataset = DataSetRepository().get_by_id(dataset_id)
+    if dataset is None:
+        return None
+    state = DatasetPublicationService().advance(dataset)
+    # Publicado: preparamos la caché columnar de los CSV
+    HubfileTabularService().schedule_dataset_cache_build(dataset)
+    # y lo copiamos a los timelines de los seguidores (idempotente si el job se repite)
+    try:
+        FeedService().schedule_fan_out(dataset_id)
+    except Exception:
+        logger.exception("Could not schedule the timeline fan-out of dataset %s", dataset_id)
+    return {"dataset_id": dataset_id, "state": state, "doi": dataset.ds_meta_data.dataset_doi}
+
+
+class UploadSessionError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Hash sha256 en curso de cada subida abierta: (hasher, bytes ya hasheados). Si el proceso cambia o se
+# reinicia entre trozos, se pierde y el checksum final se recalcula leyendo el fichero.
+_upload_hashers = {}
+_upload_lock = threading.Lock()
+
+
+class UploadSessionService(BaseService):
+    """Resumable uploads: numbered chunks appended in order to a ``.part`` file in the user's temp folder.
+
+    Sessions not touched for ``UPLOAD_SESSION_TTL`` seconds expire; ``expire_stale`` (the
+    ``uploads:expire`` command) removes them together with their files.
+    """
+
+    DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+    MAX_CHUNK_SIZE = 64 * 1024 * 1024
+    COPY_BUFFER = 1024 * 1024
+    DEFAULT_TTL = 24 * 60 * 60
+
+    def __init__(self):
+        super().__init__(UploadSessionRepository())
+
+    def ttl(self) -> int:
+        return int(os.getenv("UPLOAD_SESSION_TTL", self.DEFAULT_TTL))
+
+    def part_path(self, session, user) -> str:
+        return os.path.join(user.temp_folder(), f".upload-{session.id}.part")
+
+    def get_session(self, upload_id: str, user, lock=False):
+        session = self.repository.get_for_user(upload_id, user.id, lock=lock)
+        if session is None:
+            raise UploadSessionError("Upload session not found", 404)
+        return session
+
+    def _get_active(self, upload_id: str, user, lock=False):
+        session = self.get_session(upload_id, user, lock=lock)
+        if session.status != "consumed" and session.updated_at < datetime.utcnow() - timedelta(seconds=self.ttl()):
+            raise UploadSessionError("Upload session expired", 410)
+        return session
+
+    def start(self, user, filename: str, total_size=None, chunk_size=None):
+        filename = secure_filename(filename or "")
+        if not filename.lower().endswith(".csv"):
+            raise UploadSessionError("Please upload a .csv file")
+        chunk_size = int(chunk_size or self.DEFAULT_CHUNK_SIZE)
+        if not 0 < chunk_size <= self.MAX_CHUNK_SIZE:
+            raise UploadSessionError(f"chunk_size must be between 1 and {self.MAX_CHUNK_SIZE} bytes")
+        if total_size is not None and int(total_size) < 0:
+            raise UploadSessionError("total_size cannot be negative")
+
+        session = self.repository.create(
+            id=uuid.uuid4().hex,
+            user_id=user.id,
+            filename=filename,
+            chunk_size=chunk_size,
+            total_size=int(total_size) if total_size is not None else None,
+            received_bytes=0,
+            next_chunk=0,
+            status="open",
+        )
+        os.makedirs(user.temp_folder(), exist_ok=True)
+        open(self.part_path(session, user), "wb").close()
+        with _upload_lock:
+            _upload_hashers[session.id] = (hashlib.sha256(), 0)
+        return session
+
+    def put_chunk(self, upload_id: str, user, index: int, stream, chunk_checksum: str):
+        """Appends chunk ``index`` read from ``stream``. Chunks already received are acknowledged again.
+
+        The session row stays locked from the checks until the commit, so two requests for the same
+        chunk cannot both write to the ``.part`` file.
+        """
+        try:
+            return self._append_chunk(self._get_active(upload_id, user, lock=True), user, index, stream, chunk_checksum)
+        except Exception:
+            # Liberamos el bloqueo de la fila
+            self.repository.session.rollback()
+            raise
+
+    def _append_chunk(self, session, user, index: int, stream, chunk_checksum: str):
+        if session.status != "open":
+            raise UploadSessionError("Upload session is already finalized", 409)
+        if index < session.next_chunk:
+            self.repository.session.commit()
+            return session
+        if index > session.next_chunk:
+            raise UploadSessionError(f"Expected chunk {session.next_chunk}", 409)
+        if not chunk_checksum:
+            raise UploadSessionError("Missing X-Chunk-Checksum header")
+
+        start = session.received_bytes
+        chunk_hash = hashlib.sha256()
+        with _upload_lock:
+            hasher, hashed = _upload_hashers.get(session.id, (None, -1))
+        running = hasher.copy() if hasher is not None and hashed == start else None
+
+        written = 0
+        with open(self.part_path(session, user), "r+b") as f:
+            # Descartamos cualquier resto de un trozo anterior que no llegó a confirmarse
+            f.seek(start)
+            f.truncate()
+            while block := stream.read(self.COPY_BUFFER):
+                written += len(block)
+                if written > session.chunk_size:
+                    f.truncate(start)
+                    raise UploadSessionError(f"Chunk larger than chunk_size ({session.chunk_size} bytes)")
+                chunk_hash.update(block)
+                if running is not None:
+                    running.update(block)
+                f.write(block)
+
+            if chunk_hash.hexdigest() != chunk_checksum.strip().lower():
+                f.truncate(start)
+                raise UploadSessionError("Chunk checksum mismatch")
+            if session.total_size is not None and start + written > session.total_size:
+                f.truncate(start)
+                raise UploadSessionError("Upload exceeds the declared total_size")
+
+        session.received_bytes = start + written
+        session.next_chunk = index + 1
+        self.repository.session.commit()
+        with _upload_lock:
+            if running is not None:
+                _upload_hashers[session.id] = (running, session.received_bytes)
+            else:
+                _upload_hashers.pop(session.id, None)
+        return session
+
+    def complete(self, upload_id: str, user):
+        """Moves the received bytes to their final name in the temp folder and records the checksum."""
+        session = self._get_active(upload_id, user, lock=True)
+        if session.status != "open":
+            self.repository.session.commit()
+            return session
+        if session.total_size is not None and session.received_bytes != session.total_size:
+            self.repository.session.rollback()
+            raise UploadSessionError(
+                f"Upload incomplete: {session.received_bytes} of {session.total_size} bytes received", 409
+            )
+
+        part_path = self.part_path(session, user)
+        with _upload_lock:
+            hasher, hashed = _upload_hashers.pop(session.id, (None, -1))
+        if hasher is not None and hashed == session.received_bytes:
+            checksum = hasher.hexdigest()
+        else:
+            checksum, _ = calculate_checksum_and_size(part_path)
+
+        dest_path = _unique_path(user.temp_folder(), session.filename)
+        os.replace(part_path, dest_path)
+        session.filename = os.path.basename(dest_path)
+        session.checksum = checksum
+        session.status = "complete"
+        self.repository.session.commit()
+        return session
+
+    def abort(self, upload_id: str, user):
+        session = self.get_session(upload_id, user)
+        if session.status == "open":
+            try:
+                os.remove(self.part_path(session, user))
+            except FileNotFoundError:
+                pass
+        with _upload_lock:
+            _upload_hashers.pop(session.id, None)
+        self.repository.session.delete(session)
+        self.repository.session.commit()
+
+    def get_completed(self, upload_id: str, user):
+        """Filename and ``(checksum, size)`` of a completed upload, without claiming it yet."""
+        session = self._get_active(upload_id, user)
+        if session.status != "complete":
+            raise UploadSessionError("Upload session is not complete", 409)
+        return session.filename, (session.checksum, session.received_bytes)
+
+    def claim(self, upload_id: str, user):
+        """Hands a completed upload over to dataset creation. Returns ``(filename, (checksum, size))``.
+
+        Call it once the request has been validated: a claimed session cannot be used again unless
+        it is released.
+        """
+        session = self._get_active(upload_id, user, lock=True)
+        if session.status != "complete":
+            self.repository.session.rollback()
+            raise UploadSessionError("Upload session is not complete", 409)
+        session.status = "consumed"
+        self.repository.session.commit()
+        return session.filename, (session.checksum, session.received_bytes)
+
+    def release(self, upload_id: str, user):
+        """Gives a claimed upload back when the dataset could not be created from it."""
+        session = self.get_session(upload_id, user)
+        if session.status == "consumed":
+            session.status = "complete"
+            self.repository.session.commit()
+
+    def temp_folder_for(self, user_id: int) -> str:
+        return AuthenticationService().temp_folder_by_user(db.session.get(User, user_id))
+
+    def expire_stale(self) -> int:
+        """Deletes sessions older than the TTL and the files they left in the temp folder."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl())
+        expired = 0
+        for session in self.repository.get_stale(cutoff):
+            folder = self.temp_folder_for(session.user_id)
+            # Un fichero "complete" no reclamado sigue en la carpeta temporal; uno "consumed" ya se movió
+            leftovers = {"open": f".upload-{session.id}.part", "complete": session.filename}.get(session.status)
+            if leftovers:
+                try:
+                    os.remove(os.path.join(folder, leftovers))
+                except FileNotFoundError:
+                    pass
+            with _upload_lock:
+                _upload_hashers.pop(session.id, None)
+            self.repository.session.delete(session)
+            expired += 1
+        self.repository.session.commit()
+        if expired:
+            logger.info("Expired %d upload sessions", expired)
+        return expired
+
+
+def _unique_path(folder: str, filename: str) -> str:
+    dest_path = os.path.join(folder, filename)
+    base, ext = os.path.splitext(filename)
+    i = 1
+    while os.path.exists(dest_path):
+        dest_path = os.path.join(folder, f"{base} ({i}){ext}")
+        i += 1
+    return dest_path
+
+
 class AuthorService(BaseService):
     def __init__(self):
         super().__init__(AuthorRepository())
 
+    def paginate(self, page: int = 1, per_page: int = 20):
+        return self.repository.paginate(page, per_page)
+
 
 class DSDownloadRecordService(BaseService):
     def __init__(self):
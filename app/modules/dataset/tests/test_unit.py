@@ -1,25 +1,51 @@
+import hashlib
+import io
 import os
 import shutil
 import time
 from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 from unittest import mock
 
 import pytest
+from werkzeug.datastructures import FileStorage
 
 from app import db
 from app.modules.auth.models import User
+from app.modules.dataset import diff as dataset_diff
+from app.modules.dataset import validation as csv_validation
+from app.modules.dataset.diff import diff_csv_files
+from app.modules.dataset.doi_resolver import DOIResolver, doi_resolver
 from app.modules.dataset.models import (
     Author,
     DataSet,
     DatasetConcept,
+    DatasetDiff,
     DatasetVersion,
+    DOIMapping,
     Download,
     DSMetaData,
     PublicationType,
     TabularDataset,
+    UploadSession,
 )
-from app.modules.dataset.services import DataSetService
+from app.modules.dataset import services as dataset_services
+from app.modules.dataset.services import (
+    CSVValidationService,
+    DatasetPublicationService,
+    DataSetService,
+    DatasetDiffService,
+    UploadSessionError,
+    UploadSessionService,
+    calculate_checksum_and_size,
+    save_and_hash,
+)
+from app.modules.fakenodo.models import Fakenodo
+from app.modules.fakenodo.services import FakenodoService
+from app.modules.feed.models import TimelineEntry
 from app.modules.fileModel.models import FileModel, FMMetaData, FMMetrics
+from app.modules.followAuthor.models import Followauthor
+from app.modules.hubfile import blobstore, compression
 from app.modules.hubfile.models import Hubfile
 from app.modules.profile.models import UserProfile
 
@@ -385,6 +411,21 @@ def test_clone_copies_files(ds_with_file, test_client):
         assert os.path.exists(os.path.join(clone_folder, "original.csv"))
 
 
+def test_clone_links_files_through_blob_store(ds_with_file, test_client):
+    with test_client.application.app_context():
+        original = ds_with_file
+        clone = original.clone()
+        db.session.commit()
+
+        original_file = os.path.join(f"uploads/user_{original.user_id}/dataset_{original.id}", "original.csv")
+        clone_file = os.path.join(f"uploads/user_{clone.user_id}/dataset_{clone.id}", "original.csv")
+        checksum = clone.files()[0].checksum
+
+        # Mismo inode: la nueva versión no duplica bytes
+        assert os.path.samefile(original_file, clone_file)
+        assert os.path.samefile(clone_file, blobstore.blob_path(checksum))
+
+
 def test_clone_creates_new_file_models(ds_with_file, test_client):
     with test_client.application.app_context():
         original = ds_with_file
@@ -1122,6 +1163,41 @@ def test_create_from_form_creates_hubfiles(clean_database, test_client, setup_te
     assert hubfile.size > 0
 
 
+def test_create_from_form_uses_precomputed_digest(clean_database, test_client, setup_temp_folder_with_file):
+    """Si la subida ya calculó checksum y tamaño, create_from_form no vuelve a leer el fichero."""
+    user = User(email="digest_test@example.com", password="1234")
+    db.session.add(user)
+    db.session.flush()
+
+    profile = UserProfile(user_id=user.id, name="Digest", surname="Test")
+    db.session.add(profile)
+    db.session.commit()
+
+    mock_user = MockUser(user_id=user.id, temp_folder_path=setup_temp_folder_with_file)
+    mock_user.profile = profile
+    form = MockDataSetForm(title="Digest Test", description="Test", file_models_data=[{"csv_filename": "test.csv"}])
+
+    with mock.patch("app.utils.notifications.notify_followers_of_author"), mock.patch(
+        "app.modules.dataset.services.calculate_checksum_and_size"
+    ) as calculate:
+        dataset = DataSetService().create_from_form(form, mock_user, file_digests={"test.csv": ("ab" * 32, 26)})
+
+    calculate.assert_not_called()
+    hubfile = dataset.file_models[0].files[0]
+    assert (hubfile.checksum, hubfile.size) == ("ab" * 32, 26)
+
+
+def test_save_and_hash_matches_file_on_disk(tmp_path):
+    content = b"id,value\n" + b"1,100\n" * 50000
+    dest = tmp_path / "upload.csv"
+
+    checksum, size = save_and_hash(FileStorage(stream=io.BytesIO(content), filename="upload.csv"), str(dest))
+
+    assert dest.read_bytes() == content
+    assert (checksum, size) == (hashlib.sha256(content).hexdigest(), len(content))
+    assert calculate_checksum_and_size(str(dest)) == (checksum, size)
+
+
 def test_create_from_form_reuses_author_by_orcid(clean_database, test_client, setup_temp_folder_with_file):
     """Verifica que create_from_form reutiliza autor existente por ORCID."""
     user = User(email="orcid_reuse@example.com", password="1234")
@@ -1490,5 +1566,450 @@ def test_move_file_models_preserves_content(dataset_with_file_model, test_client
         shutil.rmtree(temp_folder, ignore_errors=True)
 
 
+def test_diff_csv_files_without_key(tmp_path):
+    old = tmp_path / "old.csv"
+    new = tmp_path / "new.csv"
+    old.write_text("a,b\n1,x\n2,y\n2,y\n3,z\n", encoding="utf-8")
+    new.write_text("a,b\n2,y\n3,z\n4,w\n", encoding="utf-8")
+
+    result = diff_csv_files(str(old), str(new))
+
+    assert (result["old_rows"], result["new_rows"]) == (4, 3)
+    assert (result["added"], result["removed"], result["modified"], result["unchanged"]) == (1, 2, 0, 2)
+    assert result["samples"]["added"] == [3]
+    assert result["samples"]["removed"] == [1, 3]
+
+
+def test_diff_csv_files_with_key_and_schema_change(tmp_path, monkeypatch):
+    # Forzamos varias particiones para ejercitar el camino de memoria acotada
+    monkeypatch.setattr(dataset_diff, "PARTITION_BYTES", 16)
+    old = tmp_path / "old.csv"
+    new = tmp_path / "new.csv"
+    old.write_text("id,name,price,stock\n1,bolt,5,10\n2,nut,7,3\n3,gear,300,1\n", encoding="utf-8")
+    new.write_text("id;price;name;colour\n1;5;bolt;red\n2;8;nut;blue\n4;9;cog;red\n", encoding="utf-8")
+
+    result = diff_csv_files(str(old), str(new), key_column="id")
+
+    assert result["schema"] == {"added_columns": ["colour"], "removed_columns": ["stock"], "reordered": True}
+    assert (result["added"], result["removed"], result["modified"], result["unchanged"]) == (1, 1, 1, 1)
+    assert result["samples"]["modified"] == [[2, 2]]
+    assert result["samples"]["removed"] == [3]
+
+    with pytest.raises(ValueError):
+        diff_csv_files(str(old), str(new), key_column="colour")
+
+
+def test_dataset_diff_service_caches_by_checksum_pair(clean_database, test_client, tmp_path, monkeypatch):
+    old = tmp_path / "old.csv"
+    new = tmp_path / "new.csv"
+    old.write_text("a\n1\n2\n", encoding="utf-8")
+    new.write_text("a\n1\n3\n", encoding="utf-8")
+
+    service = DatasetDiffService()
+    diff = service.compute(str(old), str(new), "sum-old", "sum-new")
+    assert diff.status == "ready"
+    assert diff.summary["added"] == 1 and diff.summary["removed"] == 1
+
+    calls = []
+    monkeypatch.setattr("app.modules.dataset.services.diff_csv_files", lambda *a, **kw: calls.append(a))
+    cached = service.compute(str(old), str(new), "sum-old", "sum-new")
+    assert cached.id == diff.id
+    assert calls == []
+    assert DatasetDiff.query.count() == 1
+
+
+def test_dataset_diff_service_retries_transient_and_failed_diffs(clean_database, test_client, tmp_path, monkeypatch):
+    old = tmp_path / "old.csv"
+    new = tmp_path / "new.csv"
+    old.write_text("a\n1\n", encoding="utf-8")
+    service = DatasetDiffService()
+
+    # Fichero aún no disponible: el diff sigue pendiente y el error se propaga para reintentar el trabajo
+    with pytest.raises(OSError):
+        service.compute(str(old), str(new), "sum-old", "sum-new")
+    diff = DatasetDiff.query.one()
+    assert diff.status == "pending" and diff.error
+
+    new.write_text("a\n1\n2\n", encoding="utf-8")
+    monkeypatch.setattr("app.modules.dataset.services.diff_csv_files", mock.Mock(side_effect=ValueError("bad csv")))
+    assert service.compute(str(old), str(new), "sum-old", "sum-new").status == "failed"
+
+    monkeypatch.undo()
+    paths = {"sum-old": str(old), "sum-new": str(new)}
+    monkeypatch.setattr(service.hubfile_service, "get_path_by_hubfile", lambda hubfile: paths[hubfile.checksum])
+    old_file = SimpleNamespace(name="old.csv", checksum="sum-old")
+    new_file = SimpleNamespace(name="new.csv", checksum="sum-new")
+    assert service.diff_hubfiles(old_file, new_file, background=False).status == "failed"
+    retried = service.diff_hubfiles(old_file, new_file, background=False, retry=True)
+    assert retried.status == "ready" and retried.summary["added"] == 1
+
+    assert service.missing_key_column([(old_file, new_file)], "a") is None
+    assert service.missing_key_column([(old_file, new_file)], "id") == "old.csv"
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_upload_session_appends_chunks_and_resumes(clean_database, test_client, tmp_path):
+    user = User(email="chunks@example.com", password="1234")
+    db.session.add(user)
+    db.session.commit()
+    uploader = MockUser(user_id=user.id, temp_folder_path=str(tmp_path))
+    service = UploadSessionService()
+    parts = [b"id,value\n1,10\n", b"2,20\n3,30\n", b"4,40\n"]
+    content = b"".join(parts)
+
+    session = service.start(uploader, "big data.csv", total_size=len(content), chunk_size=16)
+    service.put_chunk(session.id, uploader, 0, io.BytesIO(parts[0]), _sha256(parts[0]))
+
+    with pytest.raises(UploadSessionError) as bad_checksum:
+        service.put_chunk(session.id, uploader, 1, io.BytesIO(parts[1]), _sha256(b"corrupted"))
+    assert bad_checksum.value.status_code == 400
+    with pytest.raises(UploadSessionError) as out_of_order:
+        service.put_chunk(session.id, uploader, 2, io.BytesIO(parts[2]), _sha256(parts[2]))
+    assert out_of_order.value.status_code == 409
+
+    # Reenviar un trozo ya recibido no lo duplica
+    service.put_chunk(session.id, uploader, 0, io.BytesIO(parts[0]), _sha256(parts[0]))
+    service.put_chunk(session.id, uploader, 1, io.BytesIO(parts[1]), _sha256(parts[1]))
+    session = service.get_session(session.id, uploader)
+    assert (session.received_bytes, session.next_chunk) == (len(parts[0]) + len(parts[1]), 2)
+
+    service.put_chunk(session.id, uploader, 2, io.BytesIO(parts[2]), _sha256(parts[2]))
+    session = service.complete(session.id, uploader)
+
+    assert session.status == "complete"
+    assert session.checksum == _sha256(content)
+    assert (tmp_path / "big_data.csv").read_bytes() == content
+    assert service.claim(session.id, uploader) == ("big_data.csv", (_sha256(content), len(content)))
+
+
+def test_upload_session_rehashes_when_running_hash_is_lost(clean_database, test_client, tmp_path):
+    user = User(email="rehash@example.com", password="1234")
+    db.session.add(user)
+    db.session.commit()
+    uploader = MockUser(user_id=user.id, temp_folder_path=str(tmp_path))
+    service = UploadSessionService()
+
+    session = service.start(uploader, "data.csv")
+    service.put_chunk(session.id, uploader, 0, io.BytesIO(b"a,b\n"), _sha256(b"a,b\n"))
+    # Simula que el siguiente trozo lo atiende otro proceso sin el hash en memoria
+    dataset_services._upload_hashers.clear()
+    service.put_chunk(session.id, uploader, 1, io.BytesIO(b"1,2\n"), _sha256(b"1,2\n"))
+
+    session = service.complete(session.id, uploader)
+    assert session.checksum == _sha256(b"a,b\n1,2\n")
+
+
+def test_upload_session_is_claimed_once_and_released_on_failure(clean_database, test_client, tmp_path):
+    user = User(email="claim@example.com", password="1234")
+    db.session.add(user)
+    db.session.commit()
+    uploader = MockUser(user_id=user.id, temp_folder_path=str(tmp_path))
+    service = UploadSessionService()
+
+    session = service.start(uploader, "data.csv")
+    service.put_chunk(session.id, uploader, 0, io.BytesIO(b"a,b\n"), _sha256(b"a,b\n"))
+    service.complete(session.id, uploader)
+
+    # Consultar la subida antes de validar la petición no la consume
+    expected = ("data.csv", (_sha256(b"a,b\n"), 4))
+    assert service.get_completed(session.id, uploader) == expected
+    assert service.claim(session.id, uploader) == expected
+    with pytest.raises(UploadSessionError) as claimed_twice:
+        service.claim(session.id, uploader)
+    assert claimed_twice.value.status_code == 409
+
+    service.release(session.id, uploader)
+    assert service.claim(session.id, uploader) == expected
+
+
+def test_upload_sessions_expire_with_their_files(clean_database, test_client, tmp_path, monkeypatch):
+    user = User(email="expire@example.com", password="1234")
+    db.session.add(user)
+    db.session.commit()
+    uploader = MockUser(user_id=user.id, temp_folder_path=str(tmp_path))
+    service = UploadSessionService()
+    monkeypatch.setattr(service, "temp_folder_for", lambda user_id: str(tmp_path))
+
+    abandoned = service.start(uploader, "abandoned.csv")
+    service.put_chunk(abandoned.id, uploader, 0, io.BytesIO(b"a\n"), _sha256(b"a\n"))
+    unclaimed = service.start(uploader, "unclaimed.csv")
+    service.complete(unclaimed.id, uploader)
+    recent = service.start(uploader, "recent.csv")
+    for stale in (abandoned, unclaimed):
+        stale.updated_at = datetime.utcnow() - timedelta(seconds=service.ttl() + 60)
+    db.session.commit()
+
+    with pytest.raises(UploadSessionError) as expired:
+        service.put_chunk(abandoned.id, uploader, 1, io.BytesIO(b"b\n"), _sha256(b"b\n"))
+    assert expired.value.status_code == 410
+
+    assert service.expire_stale() == 2
+    assert sorted(os.listdir(tmp_path)) == [f".upload-{recent.id}.part"]
+    assert [s.id for s in UploadSession.query.all()] == [recent.id]
+
+
+def _write_validation_csv(path, bad_row=None):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("id,text,n\n")
+        for i in range(3000):
+            if i == bad_row:
+                f.write(f"{i},missing\n")
+            elif i % 100 == 7:
+                # Saltos de línea y comillas escapadas dentro de un campo entrecomillado
+                f.write(f'{i},"multi\nline ""quoted""",{i}\n')
+            else:
+                f.write(f"{i},plain,{i}\n")
+
+
+def test_validate_csv_splits_outside_quoted_fields(tmp_path):
+    path = str(tmp_path / "data.csv")
+    _write_validation_csv(path, bad_row=2500)
+
+    sequential = csv_validation.validate_csv(path, workers=1)
+    parallel = csv_validation.validate_csv(path, workers=3, chunk_bytes=4096)
+
+    assert sequential["chunks"] == 1
+    assert parallel["chunks"] > 3
+    for report in (sequential, parallel):
+        assert report["rows"] == 3000
+        assert report["delimiter"] == ","
+        assert report["columns"] == ["id", "text", "n"]
+        assert not report["valid"]
+        assert report["errors"] == [
+            {"row": 2501, "byte_offset": report["errors"][0]["byte_offset"], "error": "expected 3 fields, found 2"}
+        ]
+
+    data = open(path, "rb").read()
+    for point in csv_validation.find_split_points(path, data.index(b"\n") + 1, len(data), 4096):
+        assert data[point - 1:point] == b"\n"
+        assert data[:point].count(b'"') % 2 == 0
+
+
+def test_validate_csv_reports_encoding_and_quoting_errors(tmp_path):
+    path = tmp_path / "broken.csv"
+    path.write_bytes(b'a;b\n1;2\n3;\xff\n"open;4\n')
+
+    report = csv_validation.validate_csv(str(path))
+    assert report["delimiter"] == ";"
+    assert report["error_count"] == 2
+    assert [e["error"] for e in report["errors"]] == [
+        "invalid UTF-8 byte sequence",
+        "malformed quoting: unexpected end of data",
+    ]
+    assert [e["row"] for e in report["errors"]] == [2, 3]
+
+    empty = tmp_path / "empty.csv"
+    empty.write_bytes(b"")
+    assert csv_validation.validate_csv(str(empty))["errors"][0]["error"] == "the file is empty"
+
+
+def test_big_csv_is_validated_in_background(dataset_with_file_model, test_client, tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    monkeypatch.setenv("CSV_VALIDATION_ASYNC_BYTES", "1")
+    monkeypatch.setenv("UPLOADS_COMPRESSION", "zstd")
+    scheduled = []
+    monkeypatch.setattr(
+        "app.modules.dataset.services.enqueue", lambda fn, *args, **kwargs: scheduled.append((fn, args))
+    )
+    dataset = dataset_with_file_model["dataset"]
+    service = CSVValidationService()
+    hubfile = dataset.files()[0]
+    path = service.hubfile_service.get_path_by_hubfile(hubfile)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_validation_csv(path)
+
+    assert service.should_run_async({hubfile.name: path})
+    service.schedule_dataset_validation(dataset)
+    assert dataset.validation_status == "validating"
+
+    fn, args = scheduled[0]
+    assert not compression.is_zstd(args[1][hubfile.name])
+    report = fn(*args)
+    assert report["valid"]
+    assert dataset.validation_status == "valid"
+    assert dataset.validation_report["files"][hubfile.name]["rows"] == 3000
+    # Tras validarlo como fichero plano, el CSV entra (comprimido) en el almacén de blobs
+    assert blobstore.has_blob(hubfile.checksum)
+    assert compression.is_zstd(path) and os.path.samefile(path, blobstore.blob_path(hubfile.checksum))
+
+
+def test_publication_pipeline_resumes_without_duplicating_work(dataset_with_file_model, test_client, monkeypatch):
+    dataset = dataset_with_file_model["dataset"]
+    publish = FakenodoService.publish_deposition
+    calls = []
+
+    def flaky_publish(self, deposition_id):
+        calls.append(deposition_id)
+        if len(calls) == 1:
+            raise ConnectionError("fakenodo unavailable")
+        return publish(self, deposition_id)
+
+    monkeypatch.setattr(FakenodoService, "publish_deposition", flaky_publish)
+    monkeypatch.setitem(test_client.application.config, "JOBS_RETRY_BACKOFF", 0)
+    follower = User(email="publication_follower@example.com", password="1234")
+    author = Author(name="Move", user_id=dataset.user_id)
+    db.session.add_all([follower, author])
+    db.session.flush()
+    db.session.add(Followauthor(follower_id=follower.id, author_id=author.id))
+    db.session.commit()
+
+    job = DatasetPublicationService().start(dataset)
+
+    # El primer intento falla al publicar; el reintento continúa desde "files_uploaded"
+    assert job.status == "finished"
+    assert job.attempts == 2
+    assert dataset.publication_state == DatasetPublicationService.DOI_RECORDED
+    assert dataset.ds_meta_data.dataset_doi.startswith("10.5281/fakenodo.")
+    assert dataset.version_doi == dataset.ds_meta_data.dataset_doi
+    assert dataset.ds_meta_data.publication_doi.endswith(f"/dataset/doi/{dataset.ds_meta_data.dataset_doi}")
+
+    deposition = FakenodoService().get_deposition(dataset.ds_meta_data.deposition_id)
+    assert Fakenodo.query.count() == 1
+    assert [f["file_name"] for f in deposition["metadata"]["files"]] == ["move_test.csv"]
+    assert len(calls) == 2
+    # El dataset entra en el timeline de los seguidores al publicarse
+    assert TimelineEntry.query.filter_by(user_id=follower.id, dataset_id=dataset.id).count() == 1
+
+    # Ya publicado: no se vuelve a encolar nada
+    assert DatasetPublicationService().start(dataset) is None
+
+
+def test_publication_pipeline_recreates_a_missing_deposition(dataset_with_file_model, test_client):
+    dataset = dataset_with_file_model["dataset"]
+    # Estado "draft" pero sin depósito en Fakenodo (borrado o nunca guardado)
+    dataset.publication_state = DatasetPublicationService.DRAFT
+    dataset.ds_meta_data.deposition_id = None
+    db.session.commit()
+
+    state = DatasetPublicationService().advance(dataset)
+
+    assert state == DatasetPublicationService.DOI_RECORDED
+    assert dataset.ds_meta_data.deposition_id is not None
+    deposition = FakenodoService().get_deposition(dataset.ds_meta_data.deposition_id)
+    assert deposition["status"] == "published"
+    assert [f["file_name"] for f in deposition["metadata"]["files"]] == ["move_test.csv"]
+
+
+def test_doi_resolver_caches_landing_and_invalidates_on_commit(clean_database, test_client):
+    # Cliente sin "with": no deja el contexto de la última petición apilado
+    client = test_client.application.test_client()
+    user, meta, ds = create_dataset("doi_cache@example.com")
+    ds.version_doi = "10.5281/cache.1"
+    meta.dataset_doi = "10.5281/cache.1"
+    db.session.commit()
+
+    assert doi_resolver.resolve_landing("10.5281/cache.1") == ("dataset", ds.id)
+    assert doi_resolver.resolve_landing("10.5281/cache.1") == ("dataset", ds.id)
+    assert doi_resolver.info()["hits"] == 1
+
+    # El registro de /doi/<doi> también se resuelve una sola vez
+    assert doi_resolver.resolve_record("10.5281/cache.1") == {"dataset_id": ds.id, "deposition_id": None}
+    misses = doi_resolver.info()["misses"]
+    resp = client.get("/doi/10.5281/cache.1")
+    assert resp.status_code == 200
+    assert doi_resolver.info()["misses"] == misses
+
+    # Un DOI nuevo para el dataset invalida el viejo (aunque el atributo estuviera expirado)
+    meta.dataset_doi = "10.5281/cache.2"
+    db.session.commit()
+    DataSetService().update_version_doi(ds.id)
+    assert doi_resolver.resolve_landing("10.5281/cache.1") == (None, None)
+    assert doi_resolver.resolve_landing("10.5281/cache.2") == ("dataset", ds.id)
+
+    # Crear un DOIMapping convierte el DOI viejo en una redirección
+    db.session.add(DOIMapping(dataset_doi_old="10.5281/cache.1", dataset_doi_new="10.5281/cache.2"))
+    db.session.commit()
+    resp = client.get("/dataset/doi/10.5281/cache.1/")
+    assert resp.status_code == 302
+    assert resp.headers["Location"].endswith("/dataset/doi/10.5281/cache.2/")
+
+    # Un cambio que se deshace no invalida nada
+    ds.version_doi = "10.5281/cache.3"
+    db.session.flush()
+    db.session.rollback()
+    hits = doi_resolver.info()["hits"]
+    assert doi_resolver.resolve_landing("10.5281/cache.2") == ("dataset", ds.id)
+    assert doi_resolver.info()["hits"] == hits + 1
+
+
+def test_doi_resolver_keeps_misses_only_briefly(clean_database, test_client):
+    resolver = DOIResolver(ttl=300, negative_ttl=0)
+    user, meta, ds = create_dataset("doi_miss@example.com")
+    assert resolver.resolve_landing("10.5281/late.1") == (None, None)
+
+    # Otro proceso publica el DOI (sin pasar por la invalidación de esta caché)
+    ds.version_doi = "10.5281/late.1"
+    db.session.commit()
+    assert resolver.resolve_landing("10.5281/late.1") == ("dataset", ds.id)
+    assert resolver.info()["size"] == 1
+
+
+def test_dataset_page_queries_do_not_grow_with_files_versions_or_comments(clean_database, test_client):
+    from sqlalchemy import event
+
+    from app.modules.comments.models import Comments
+
+    client = test_client.application.test_client()
+    user, meta, ds = create_dataset("detail@example.com", "Detail DS")
+    author = Author(name="Ana Rubik")
+    concept = DatasetConcept(conceptual_doi="10.concept.detail", name="Detail")
+    db.session.add_all([UserProfile(user_id=user.id, name="Ana", surname="Rubik"), author, concept])
+    db.session.flush()
+    meta.author_id = author.id
+    meta.tags = "cubos, rubik"
+    meta.dataset_doi = ds.version_doi = "10.5281/detail.1"
+    db.session.add(DatasetVersion(concept_id=concept.id, dataset_id=ds.id, version_major=1, version_minor=0))
+    db.session.commit()
+    ids = {"dataset": ds.id, "user": user.id, "author": author.id, "concept": concept.id}
+
+    def grow(n, start):
+        for i in range(start, start + n):
+            fm = FileModel(data_set_id=ids["dataset"])
+            db.session.add(fm)
+            db.session.flush()
+            db.session.add(Hubfile(name=f"detail_{i}.csv", checksum=f"detail{i}", size=100, file_model_id=fm.id))
+            sibling_meta = DSMetaData(title=f"Detail v{i}", description="d", publication_type=PublicationType.NONE)
+            db.session.add(sibling_meta)
+            db.session.flush()
+            sibling = TabularDataset(user_id=ids["user"], ds_meta_data_id=sibling_meta.id)
+            db.session.add(sibling)
+            db.session.flush()
+            db.session.add(DatasetVersion(
+                concept_id=ids["concept"], dataset_id=sibling.id, version_major=1, version_minor=i + 1
+            ))
+            db.session.add(Comments(author_id=ids["author"], dataset_id=ids["dataset"], content=f"Nota {i}"))
+        db.session.commit()
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    def render():
+        statements.clear()
+        event.listen(db.engine, "before_cursor_execute", count)
+        try:
+            resp = client.get("/dataset/doi/10.5281/detail.1/")
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+        assert resp.status_code == 200
+        return resp.data.decode(), len(statements)
+
+    grow(1, 0)
+    render()  # resuelve el DOI y registra la visita de la cookie
+    html, few = render()
+    assert "detail_0.csv" in html and "Detail v0" in html
+
+    grow(6, 1)
+    html, many = render()
+    assert all(f"detail_{i}.csv" in html for i in range(7))
+    assert "Nota 6" in html
+    assert many == few
+    assert few <= 10
+
+
 #He utilizado parcialmente la inteligencia artificial (IA) como herramienta de apoyo durante el desarrollo y modificación de este archivo de código.
 #La IA me ha ayudado a entender, optimizar y automatizar ciertas tareas, pero la implementación final y las decisiones clave han sido realizadas por mí.
\ No newline at end of file
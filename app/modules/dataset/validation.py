@@ -0,0 +1,172 @@
+"""Structural validation of uploaded CSV files.
+
+Checks that a CSV is UTF-8, that its quoting is well formed and that every record has as many
+fields as the header. Big files are split at record boundaries and the chunks are validated in
+parallel in a process pool; the per-chunk reports are then merged into a single one.
+
+A newline is a record boundary only when it is outside a quoted field, i.e. when the number of
+quote characters seen since the previous boundary is even (escaped quotes ``""`` count twice and
+keep the parity). Finding the split points is therefore a plain byte scan, much cheaper than
+parsing, and every chunk can be parsed on its own.
+"""
+
+import csv
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from app.modules.hubfile import compression
+from core.payloads.csv_chunks import MAX_ERRORS, validate_chunk
+
+CHUNK_BYTES = 32 * 1024 * 1024
+SCAN_BYTES = 4 * 1024 * 1024
+SNIFF_BYTES = 64 * 1024
+DELIMITERS = ",;\t|"
+
+
+def max_workers() -> int:
+    return int(os.getenv("CSV_VALIDATION_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def sniff_delimiter(sample: str) -> str:
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        return ","
+
+
+def find_split_points(path, start, end, chunk_bytes) -> list:
+    """Offsets in ``(start, end)`` where a record begins, roughly ``chunk_bytes`` apart.
+
+    ``start`` must be a record boundary.
+    """
+    points = []
+    target = start + chunk_bytes
+    quotes = 0
+    position = start
+    with compression.open_payload(path, offset=start) as f:
+        while position < end and target < end:
+            block = f.read(min(SCAN_BYTES, end - position))
+            if not block:
+                break
+            block_end = position + len(block)
+            cursor = 0
+            search = max(target - position, 0)
+            while target < block_end:
+                newline = block.find(b"\n", search)
+                if newline < 0:
+                    break
+                quotes += block.count(b'"', cursor, newline)
+                cursor = newline
+                search = newline + 1
+                boundary = position + newline + 1
+                if quotes % 2 == 0 and boundary < end:
+                    points.append(boundary)
+                    target = boundary + chunk_bytes
+                    search = max(search, target - position)
+            quotes += block.count(b'"', cursor)
+            position = block_end
+    return points
+
+
+def _read_header(path, delimiter):
+    """Returns ``(header, data_offset, error)`` for the first non-empty record of the file."""
+    position = 0
+    error = None
+    with compression.open_payload(path) as f:
+
+        def lines():
+            nonlocal position, error
+            for raw in f:
+                position += len(raw)
+                try:
+                    yield raw.decode("utf-8")
+                except UnicodeDecodeError:
+                    error = "header is not valid UTF-8"
+                    yield raw.decode("utf-8", errors="replace")
+
+        reader = csv.reader(lines(), delimiter=delimiter, strict=True)
+        try:
+            for header in reader:
+                if header:
+                    return header, position, error
+        except csv.Error as exc:
+            return None, position, f"malformed header: {exc}"
+    return None, position, "the file has no header"
+
+
+def merge_reports(chunks) -> dict:
+    """Merges per-chunk reports (in file order), turning chunk-relative row numbers into absolute ones."""
+    rows = 0
+    error_count = 0
+    errors = []
+    for chunk in chunks:
+        for error in chunk["errors"]:
+            if len(errors) < MAX_ERRORS:
+                errors.append({**error, "row": rows + error["row"]})
+        rows += chunk["rows"]
+        error_count += chunk["error_count"]
+    return {"rows": rows, "error_count": error_count, "errors": errors}
+
+
+def validate_csv(path, workers=None, chunk_bytes=CHUNK_BYTES) -> dict:
+    """Validates the CSV at ``path`` and returns a JSON-serialisable report.
+
+    Row numbers are 1-based and do not count the header; ``errors`` holds at most ``MAX_ERRORS``
+    entries while ``error_count`` counts all of them.
+    """
+    size = compression.payload_size(path)
+    report = {
+        "valid": False,
+        "size": size,
+        "delimiter": None,
+        "columns": [],
+        "rows": 0,
+        "chunks": 0,
+        "error_count": 0,
+        "errors": [],
+        "warnings": [],
+    }
+    if size == 0:
+        report.update(error_count=1, errors=[{"row": 0, "byte_offset": 0, "error": "the file is empty"}])
+        return report
+
+    with compression.open_payload(path) as f:
+        sample = f.read(SNIFF_BYTES).decode("utf-8", errors="replace")
+    delimiter = sniff_delimiter(sample)
+    header, data_offset, header_error = _read_header(path, delimiter)
+    report["delimiter"] = delimiter
+    if header is None or header_error:
+        report.update(error_count=1, errors=[{"row": 0, "byte_offset": 0, "error": header_error}])
+        return report
+
+    report["columns"] = header
+    if len(header) == 1:
+        report["warnings"].append("the header has a single column, check the delimiter")
+    if any(not name.strip() for name in header):
+        report["warnings"].append("some columns have an empty name")
+    if len(set(header)) != len(header):
+        report["warnings"].append("some column names are repeated")
+
+    # Los zstd antiguos (un único frame, sin tabla de saltos) no admiten saltos: se validan en un único trozo
+    bounds = [data_offset]
+    if compression.is_seekable(path):
+        bounds += find_split_points(path, data_offset, size, chunk_bytes)
+    bounds.append(size)
+    ranges = [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+    workers = min(workers or max_workers(), len(ranges))
+    if workers > 1:
+        # "spawn": el proceso web tiene hilos (trabajos, pool de conexiones) y hacer fork de él no es seguro.
+        # Los procesos solo importan core.payloads, no la app
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(validate_chunk, path, delimiter, len(header), s, e) for s, e in ranges]
+            chunks = [future.result() for future in futures]
+    else:
+        chunks = [
+            validate_chunk(path, delimiter, len(header), s, e, opener=compression.open_payload) for s, e in ranges
+        ]
+
+    report.update(merge_reports(chunks), chunks=len(ranges))
+    report["valid"] = report["error_count"] == 0
+    return report
@@ -0,0 +1,152 @@
+"""Latency and fault injection for Fakenodo.
+
+Fakenodo answers instantly, which hides how the app behaves against a slow or flaky Zenodo. A
+fault profile makes every Fakenodo operation wait and fail like the real service would. The
+profile is a JSON object taken from the ``FAKENODO_FAULTS`` setting (or set at runtime with
+``set_profile``), with one entry per operation plus a ``default`` one::
+
+    {
+      "seed": 42,
+      "default": {"latency_ms": {"distribution": "lognormal", "median": 120, "sigma": 0.6}},
+      "publish": {"latency_ms": {"distribution": "uniform", "min": 500, "max": 3000},
+                  "error_rate": 0.05, "timeout_rate": 0.01, "timeout_ms": 30000}
+    }
+
+Operations: ``create``, ``upload``, ``publish``, ``read``, ``update``, ``delete`` and ``versions``.
+Latency distributions: ``fixed`` (``ms``), ``uniform`` (``min``/``max``), ``normal``
+(``mean``/``stddev``) and ``lognormal`` (``median``/``sigma``), all capped by ``max`` when given.
+A request that times out waits ``timeout_ms`` and raises ``FakenodoTimeout``; a failed one raises
+``FakenodoUnavailable`` after its latency. With no profile nothing is injected.
+"""
+
+import json
+import logging
+import math
+import random
+import threading
+import time
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ("create", "upload", "publish", "read", "update", "delete", "versions")
+DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+
+class FakenodoError(Exception):
+    status_code = 502
+
+
+class FakenodoUnavailable(FakenodoError):
+    status_code = 503
+
+
+class FakenodoTimeout(FakenodoError, TimeoutError):
+    status_code = 504
+
+
+_lock = threading.Lock()
+_override = None
+_parsed = (None, None)
+_random = random.Random()
+
+
+def parse_profile(raw) -> dict:
+    """Validates a profile (JSON text or dict) and returns it as a dict. Raises ValueError if invalid."""
+    if not raw:
+        return {}
+    profile = json.loads(raw) if isinstance(raw, str) else raw
+    if not isinstance(profile, dict):
+        raise ValueError("the fault profile must be a JSON object")
+    for operation, spec in profile.items():
+        if operation == "seed":
+            continue
+        if operation != "default" and operation not in OPERATIONS:
+            raise ValueError(f"unknown operation '{operation}'")
+        if not isinstance(spec, dict):
+            raise ValueError(f"the profile of '{operation}' must be an object")
+        for rate in ("error_rate", "timeout_rate"):
+            if not 0 <= float(spec.get(rate, 0)) <= 1:
+                raise ValueError(f"{operation}.{rate} must be between 0 and 1")
+        latency = spec.get("latency_ms")
+        if isinstance(latency, dict) and latency.get("distribution", "fixed") not in DISTRIBUTIONS:
+            raise ValueError(f"unknown latency distribution '{latency.get('distribution')}'")
+    return profile
+
+
+def set_profile(profile):
+    """Replaces the configured profile at runtime (``None`` goes back to ``FAKENODO_FAULTS``)."""
+    global _override
+    parsed = None if profile is None else parse_profile(profile)
+    with _lock:
+        _override = parsed
+        if parsed and "seed" in parsed:
+            _random.seed(parsed["seed"])
+    return parsed
+
+
+def get_profile() -> dict:
+    global _parsed
+    if _override is not None:
+        return _override
+    raw = current_app.config.get("FAKENODO_FAULTS") if has_app_context() else None
+    if not raw:
+        return {}
+    with _lock:
+        if _parsed[0] != raw:
+            try:
+                profile = parse_profile(raw)
+            except (TypeError, ValueError):
+                logger.exception("Ignoring invalid FAKENODO_FAULTS profile")
+                profile = {}
+            if "seed" in profile:
+                _random.seed(profile["seed"])
+            _parsed = (raw, profile)
+        return _parsed[1]
+
+
+def operation_profile(operation: str) -> dict:
+    profile = get_profile()
+    return {**profile.get("default", {}), **profile.get(operation, {})}
+
+
+def sample_latency(spec, rng=_random) -> float:
+    """Latency in milliseconds drawn from ``spec`` (a number means a fixed latency)."""
+    if not spec:
+        return 0.0
+    if isinstance(spec, (int, float)):
+        return max(float(spec), 0.0)
+    distribution = spec.get("distribution", "fixed")
+    with _lock:
+        if distribution == "uniform":
+            value = rng.uniform(spec.get("min", 0), spec.get("max", 0))
+        elif distribution == "normal":
+            value = rng.gauss(spec.get("mean", 0), spec.get("stddev", 0))
+        elif distribution == "lognormal":
+            value = rng.lognormvariate(math.log(max(spec.get("median", 1), 1e-6)), spec.get("sigma", 0))
+        else:
+            value = spec.get("ms", 0)
+    if "max" in spec and distribution != "uniform":
+        value = min(value, spec["max"])
+    return max(float(value), 0.0)
+
+
+def inject(operation: str):
+    """Applies the profile of ``operation``: sleeps its latency and may raise a timeout or an error."""
+    spec = operation_profile(operation)
+    if not spec:
+        return
+    with _lock:
+        draw = _random.random()
+    timeout_rate = float(spec.get("timeout_rate", 0))
+    if draw < timeout_rate:
+        timeout_ms = float(spec.get("timeout_ms", 30000))
+        time.sleep(timeout_ms / 1000)
+        raise FakenodoTimeout(f"Fakenodo {operation} timed out after {timeout_ms:.0f} ms")
+
+    latency = sample_latency(spec.get("latency_ms"))
+    if latency:
+        time.sleep(latency / 1000)
+    if draw < timeout_rate + float(spec.get("error_rate", 0)):
+        raise FakenodoUnavailable(f"Fakenodo {operation} failed (injected error)")
@@ -8,3 +8,46 @@ class Fakenodo(db.Model):
     meta_data = db.Column(db.JSON, nullable=False)
     status = db.Column(db.String(100), nullable=False, default="draft")
     doi = db.Column(db.String(250), unique=True, nullable=True)
+    # Ficheros y versiones van en sus propias tablas: se añaden con un INSERT sin reescribir meta_data
+    files = db.relationship(
+        "FakenodoFile", backref="deposition", lazy=True, cascade="all, delete-orphan", order_by="FakenodoFile.id"
+    )
+    versions = db.relationship(
+        "FakenodoVersion", backref="deposition", lazy=True, cascade="all, delete-orphan", order_by="FakenodoVersion.id"
+    )
+
+    def metadata_dict(self) -> dict:
+        """``meta_data`` with the ``files`` and ``versions`` lists assembled from their tables."""
+        meta_data = dict(self.meta_data or {})
+        meta_data["files"] = [f.to_dict() for f in self.files]
+        meta_data["versions"] = [v.to_dict() for v in self.versions]
+        return meta_data
+
+
+class FakenodoFile(db.Model):
+    __tablename__ = "fakenodo_file"
+    id = db.Column(db.Integer, primary_key=True)
+    deposition_id = db.Column(db.Integer, db.ForeignKey("fakenodo.id", ondelete="CASCADE"), nullable=False, index=True)
+    file_name = db.Column(db.String(255), nullable=False)
+    file_path = db.Column(db.String(1024), nullable=False, default="")
+    file_type = db.Column(db.String(100), nullable=False, default="text/csv")
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {"file_name": self.file_name, "file_path": self.file_path, "file_type": self.file_type}
+
+
+class FakenodoVersion(db.Model):
+    __tablename__ = "fakenodo_version"
+    id = db.Column(db.Integer, primary_key=True)
+    deposition_id = db.Column(db.Integer, db.ForeignKey("fakenodo.id", ondelete="CASCADE"), nullable=False, index=True)
+    version = db.Column(db.String(50), nullable=False)
+    doi = db.Column(db.String(250), nullable=True)
+    changes = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        entry = {"version": self.version, "doi": self.doi, "created_at": self.created_at.isoformat() + "Z"}
+        if self.changes is not None:
+            entry["changes"] = self.changes
+        return entry
@@ -4,12 +4,21 @@ from flask_login import current_user
 from app import db
 from app.modules.dataset.models import DSMetaData
 from app.modules.dataset.services import DataSetService
-from app.modules.fakenodo import fakenodo_bp
+from app.modules.fakenodo import fakenodo_bp, faults
 from app.modules.fakenodo.services import FakenodoService
 
 service = FakenodoService()
 
 
+@fakenodo_bp.app_errorhandler(faults.FakenodoError)
+def handle_fakenodo_error(error):
+    # Para toda la app: también llaman a Fakenodo las páginas de datasets (p. ej. /doi/<doi>)
+    current_app.logger.warning("Fakenodo error on %s: %s", request.path, error)
+    if request.blueprint == 'fakenodo' or request.accept_mimetypes.best == 'application/json':
+        return jsonify({'message': str(error)}), error.status_code
+    return render_template('500.html'), error.status_code
+
+
 @fakenodo_bp.route('/fakenodo', methods=['GET'], endpoint='index')
 def fakenodo_index():
     return render_template('fakenodo/index.html')
@@ -19,6 +28,23 @@ def list_depositions():
     return jsonify({'depositions': service.list_depositions()}), 200
 
 
+@fakenodo_bp.route('/fakenodo/deposit/depositions', methods=['POST'], endpoint='create_deposition')
+def create_deposition():
+    payload = request.get_json(silent=True) or {}
+    metadata = payload.get('metadata') if isinstance(payload.get('metadata'), dict) else {}
+    return jsonify(service.create_deposition(metadata=metadata)), 201
+
+
+@fakenodo_bp.route(
+    '/fakenodo/deposit/depositions/<int:deposition_id>/actions/publish', methods=['POST'], endpoint='publish_deposition'
+)
+def publish_deposition(deposition_id):
+    result = service.publish_depositions([deposition_id])[0]
+    if not result['success']:
+        return jsonify({'message': result['error']}), 404
+    return jsonify({'id': deposition_id, 'doi': result['doi'], 'version': result['version'], 'submitted': True}), 202
+
+
 @fakenodo_bp.route('/fakenodo/deposit/depositions/<int:deposition_id>', methods=['GET'], endpoint='get_deposition')
 def get_deposition(deposition_id):
     rec = service.get_deposition(deposition_id)
@@ -31,10 +57,53 @@ def upload_file(deposition_id):
     name = request.form.get('name') or (uploaded.filename if uploaded else None)
     if not name:
         return jsonify({'message': 'Nombre de fichero no proporcionado'}), 400
-    file_record = service.upload_file(deposition_id, name, uploaded.read() if uploaded else None)
+    file_type = (uploaded.mimetype if uploaded else None) or 'text/csv'
+    file_record = service.add_file(deposition_id, name, file_type=file_type)
     return (jsonify(file_record), 201) if file_record else (jsonify({'message': 'Depósito no encontrado'}), 404)
 
 
+def _batch_items(key):
+    payload = request.get_json(silent=True) or {}
+    items = payload.get(key)
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({'message': f"'{key}' debe ser una lista no vacía"}), 400)
+    if len(items) > service.MAX_BATCH:
+        return None, (jsonify({'message': f'Como máximo {service.MAX_BATCH} elementos por lote'}), 400)
+    return items, None
+
+
+def _batch_response(results):
+    succeeded = sum(1 for r in results if r.get('success'))
+    return jsonify({'results': results, 'succeeded': succeeded, 'failed': len(results) - succeeded}), 200
+
+
+@fakenodo_bp.route('/fakenodo/deposit/depositions/batch', methods=['POST'], endpoint='create_depositions_batch')
+def create_depositions_batch():
+    items, error = _batch_items('depositions')
+    if error:
+        return error
+    depositions = [item.get('metadata', item) if isinstance(item, dict) else item for item in items]
+    return _batch_response(service.create_depositions(depositions))
+
+
+@fakenodo_bp.route('/fakenodo/deposit/files/batch', methods=['POST'], endpoint='upload_files_batch')
+def upload_files_batch():
+    items, error = _batch_items('files')
+    if error:
+        return error
+    return _batch_response(service.add_files(items))
+
+
+@fakenodo_bp.route(
+    '/fakenodo/deposit/depositions/publish/batch', methods=['POST'], endpoint='publish_depositions_batch'
+)
+def publish_depositions_batch():
+    items, error = _batch_items('ids')
+    if error:
+        return error
+    return _batch_response(service.publish_depositions(items))
+
+
 @fakenodo_bp.route('/fakenodo/deposit/depositions/<int:deposition_id>/metadata', methods=['PATCH'], endpoint='update_deposition_metadata')
 def update_deposition_metadata(deposition_id):
     payload = request.get_json(silent=True) or {}
@@ -61,6 +130,22 @@ def list_versions(deposition_id):
     return jsonify({'versions': service.list_versions(deposition_id) or []}), 200
 
 
+@fakenodo_bp.route('/fakenodo/faults', methods=['GET', 'PUT', 'DELETE'], endpoint='fault_profile')
+def fault_profile():
+    if request.method != 'GET':
+        # Cambiar el perfil en caliente solo se permite si se ha habilitado expresamente
+        if not current_app.config.get('FAKENODO_FAULTS_API'):
+            return jsonify({'message': 'La API de fallos de Fakenodo está deshabilitada'}), 403
+        if request.method == 'DELETE':
+            faults.set_profile(None)
+        else:
+            try:
+                faults.set_profile(request.get_json(silent=True) or {})
+            except (TypeError, ValueError) as exc:
+                return jsonify({'message': str(exc)}), 400
+    return jsonify({'profile': faults.get_profile()}), 200
+
+
 @fakenodo_bp.route('/fakenodo/test', methods=['GET'], endpoint='test_endpoint')
 def test_endpoint():
     return service.test_full_connection()
@@ -106,7 +191,8 @@ def publish_dataset_deposition(dataset_id: int):
     if not deposition_id:
         return redirect(url_for('dataset.get_unsynchronized_dataset', dataset_id=dataset_id))
     for fm in getattr(ds, 'feature_models', []) + getattr(ds, 'file_models', []):
-        service.upload_file(deposition_id, getattr(fm, 'filename', None) or getattr(fm, 'name', f'fm_{getattr(fm, "id", "?")}.bin'), None)
+        name = getattr(fm, 'filename', None) or getattr(fm, 'name', f'fm_{getattr(fm, "id", "?")}.bin')
+        service.add_file(deposition_id, name)
     version = service.publish_deposition(deposition_id)
     if version:
         doi = service.get_doi(deposition_id)
@@ -6,16 +6,36 @@ from datetime import datetime
 from typing import Dict, List, Optional
 
 from flask import Response, jsonify
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
 from sqlalchemy.orm.attributes import flag_modified
 
 from app import db
 from app.modules.dataset.models import DatasetVersion
-from app.modules.fakenodo.models import Fakenodo
+from app.modules.fakenodo import faults
+from app.modules.fakenodo.models import Fakenodo, FakenodoFile, FakenodoVersion
 from core.services.BaseService import BaseService
 
 
+PUBLISH_CHANGES = {"metadata_changed": False, "file_changed": True, "comment": "Published deposition"}
+
+
+def _unique_ids(ids) -> list:
+    """Drops repeated integer ids, keeping the first occurrence and the order."""
+    seen, unique = set(), []
+    for item in ids:
+        if isinstance(item, int):
+            if item in seen:
+                continue
+            seen.add(item)
+        unique.append(item)
+    return unique
+
+
 class FakenodoService(BaseService):
 
+    MAX_BATCH = 10000
+
     def __init__(self):
         super().__init__(None)
 
@@ -23,11 +43,35 @@ class FakenodoService(BaseService):
         return Fakenodo.query.get(deposition_id)
 
     def list_depositions(self) -> List[Dict]:
-        return [{"id": d.id, "metadata": d.meta_data or {}, "status": d.status, "doi": d.doi} for d in Fakenodo.query.all()]
+        faults.inject("read")
+        depositions = Fakenodo.query.options(selectinload(Fakenodo.files), selectinload(Fakenodo.versions)).all()
+        return [{"id": d.id, "metadata": d.metadata_dict(), "status": d.status, "doi": d.doi} for d in depositions]
 
     def get_deposition(self, deposition_id: int) -> Optional[Dict]:
+        faults.inject("read")
         d = self.get_deposition_obj(deposition_id)
-        return {"id": d.id, "metadata": d.meta_data or {}, "status": d.status, "doi": d.doi} if d else None
+        return {"id": d.id, "metadata": d.metadata_dict(), "status": d.status, "doi": d.doi} if d else None
+
+    def add_file(
+        self, deposition_id: int, file_name: str, file_path: str = None, file_type: str = "text/csv"
+    ) -> Optional[Dict]:
+        """Appends a file to the deposition with a single INSERT (None if the deposition does not exist)."""
+        faults.inject("upload")
+        if not db.session.query(Fakenodo.query.filter_by(id=deposition_id).exists()).scalar():
+            return None
+        record = FakenodoFile(
+            deposition_id=deposition_id,
+            file_name=file_name or "unknown.csv",
+            file_path=file_path or "",
+            file_type=file_type,
+        )
+        db.session.add(record)
+        db.session.commit()
+        return record.to_dict()
+
+    def get_file_names(self, deposition_id: int) -> set:
+        faults.inject("read")
+        return {name for (name,) in db.session.query(FakenodoFile.file_name).filter_by(deposition_id=deposition_id)}
 
     def upload_file(self, dataset, deposition_id: int, fits_model) -> dict:
         file_name, file_path = None, None
@@ -37,45 +81,34 @@ class FakenodoService(BaseService):
         if not file_name and hasattr(fits_model, "fm_meta_data") and getattr(fits_model.fm_meta_data, "csv_filename", None):
             file_name = fits_model.fm_meta_data.csv_filename
             file_path = getattr(getattr(dataset, "working_path", None), "path", None)
-        dep = self.get_deposition_obj(deposition_id)
-        meta_data = dep.meta_data or {}
-        files = meta_data.get("files", [])
-        files.append({"file_name": file_name or "unknown.csv", "file_path": file_path or "", "file_type": "text/csv"})
-        meta_data["files"] = files
-        dep.meta_data = meta_data
-        flag_modified(dep, "meta_data")
-        db.session.commit()
-        return {"status": "completed", "meta_data": meta_data}
+        record = self.add_file(deposition_id, file_name, file_path)
+        return {"status": "completed", "file": record}
 
     def publish_deposition(self, deposition_id: int) -> dict:
-        dep = self.get_deposition_obj(deposition_id)
-        dep.status = "published"
-        dep.doi = f"10.5281/fakenodo.{random.randint(1000000, 9999999)}"
-        db.session.commit()
-        label = (dep.meta_data or {}).get("dataset_version") or "1.0"
-        self.add_version(deposition_id, label, dep.doi, {"metadata_changed": False, "file_changed": True, "comment": "Published deposition"})
-        return {"state": "done", "submitted": True, "doi": dep.doi}
+        result = self.publish_depositions([deposition_id])[0]
+        if not result["success"]:
+            raise ValueError(result["error"])
+        return {"state": "done", "submitted": True, "doi": result["doi"]}
 
     def add_version(self, deposition_id: int, version_label: str, doi: str = None, changes: dict = None) -> dict:
+        faults.inject("versions")
         dep = self.get_deposition_obj(deposition_id)
+        changes = changes if isinstance(changes, dict) else None
+        db.session.add(FakenodoVersion(deposition_id=deposition_id, version=version_label, doi=doi, changes=changes))
+        # meta_data solo se reescribe si cambian sus campos escalares, no por cada versión añadida
+        updates = {"dataset_version": version_label}
+        fields = changes.get("fields") if changes and isinstance(changes.get("fields"), dict) else {}
+        for key in ("title", "description", "tags"):
+            if key in fields and fields[key] is not None:
+                updates[key] = fields[key]
         meta_data = dep.meta_data or {}
-        versions = meta_data.get("versions", [])
-        entry = {"version": version_label, "doi": doi, "created_at": datetime.utcnow().isoformat() + "Z"}
-        if isinstance(changes, dict):
-            entry["changes"] = changes
-            fields = changes.get("fields") if isinstance(changes.get("fields"), dict) else {}
-            for key in ("title", "description", "tags"):
-                if key in fields and fields[key] is not None:
-                    meta_data[key] = fields[key]
-        versions.append(entry)
-        meta_data["versions"] = versions
-        meta_data["dataset_version"] = version_label
-        dep.meta_data = meta_data
-        flag_modified(dep, "meta_data")
+        if any(meta_data.get(key) != value for key, value in updates.items()):
+            dep.meta_data = {**meta_data, **updates}
         db.session.commit()
-        return meta_data
+        return dep.metadata_dict()
 
     def list_versions(self, deposition_id: int) -> List[Dict]:
+        faults.inject("versions")
         dep = self.get_deposition_obj(deposition_id)
         meta = dep.meta_data or {}
         dataset_id = meta.get("dataset_id")
@@ -86,9 +119,10 @@ class FakenodoService(BaseService):
                 created = getattr(dv, 'created_at', None)
                 out.append({"version": label, "doi": dep.doi, "created_at": created.isoformat() + 'Z' if created else None, "changes": None})
 
-        return out or (meta.get("versions", []) if isinstance(meta.get("versions"), list) else [])
+        return out or [v.to_dict() for v in dep.versions]
 
     def create_new_deposition(self, dataset) -> dict:
+        faults.inject("create")
         ds_meta = getattr(dataset, "ds_meta_data", None)
         title, description, tags = getattr(ds_meta, "title", None), getattr(ds_meta, "description", None), getattr(ds_meta, "tags", None)
         current_version_label = None
@@ -102,17 +136,20 @@ class FakenodoService(BaseService):
         return {"id": dep.id, "metadata": {}, "links": {"bucket": f"/api/files/{dep.id}"}}
 
     def get_doi(self, deposition_id: int) -> str:
+        faults.inject("read")
         dep = self.get_deposition_obj(deposition_id)
         return dep.doi or "" if dep else ""
 
     def get_by_doi(self, doi: str) -> Optional[Dict]:
+        faults.inject("read")
         dep = Fakenodo.query.filter_by(doi=doi).first()
-        return {"id": dep.id, "metadata": dep.meta_data or {}, "status": dep.status, "doi": dep.doi} if dep else None
+        return {"id": dep.id, "metadata": dep.metadata_dict(), "status": dep.status, "doi": dep.doi} if dep else None
 
     def append_version(self, deposition_id: int, version_major: int, version_minor: int, doi: Optional[str] = None) -> dict:
         return self.add_version(deposition_id, f"{version_major}.{version_minor}", doi)
 
     def set_dataset_version(self, deposition_id: int, version_major: int, version_minor: int, append_to_versions: bool = True) -> dict:
+        faults.inject("update")
         label = f"{version_major}.{version_minor}"
         dep = self.get_deposition_obj(deposition_id)
         if not dep:
@@ -123,17 +160,27 @@ class FakenodoService(BaseService):
         flag_modified(dep, "meta_data")
         db.session.commit()
         if append_to_versions:
-            self.add_version(deposition_id, label, dep.doi)
-        return meta_data
+            return self.add_version(deposition_id, label, dep.doi)
+        return dep.metadata_dict()
 
     def create_deposition(self, metadata: Optional[Dict] = None) -> Dict:
+        faults.inject("create")
         dep = Fakenodo(meta_data=metadata or {}, status="draft")
         db.session.add(dep)
         db.session.commit()
-        return {"id": dep.id, "metadata": dep.meta_data or {}, "status": dep.status, "doi": dep.doi, "links": {"bucket": f"/api/files/{dep.id}"}}
+        return {
+            "id": dep.id,
+            "metadata": dep.metadata_dict(),
+            "status": dep.status,
+            "doi": dep.doi,
+            "links": {"bucket": f"/api/files/{dep.id}"},
+        }
 
     def update_metadata(self, deposition_id: int, metadata: Dict) -> Optional[Dict]:
+        faults.inject("update")
         dep = self.get_deposition_obj(deposition_id)
+        if not dep:
+            return None
         meta_data = dep.meta_data or {}
         for key in ("title", "description", "tags", "publication_type", "publication_doi"):
             if key in metadata:
@@ -142,9 +189,18 @@ class FakenodoService(BaseService):
         dep.meta_data = meta_data
         flag_modified(dep, "meta_data")
         db.session.commit()
-        return {"id": dep.id, "metadata": meta_data, "status": dep.status, "doi": dep.doi, "dirty": True, "versions": meta_data.get("versions", [])}
+        metadata = dep.metadata_dict()
+        return {
+            "id": dep.id,
+            "metadata": metadata,
+            "status": dep.status,
+            "doi": dep.doi,
+            "dirty": True,
+            "versions": metadata["versions"],
+        }
 
     def delete_deposition(self, deposition_id: int) -> bool:
+        faults.inject("delete")
         dep = self.get_deposition_obj(deposition_id)
         if dep:
             db.session.delete(dep)
@@ -152,6 +208,100 @@ class FakenodoService(BaseService):
             return True
         return False
 
+    # Operaciones por lotes: cada llamada es una única transacción y devuelve un resultado por elemento,
+    # en el mismo orden que la entrada. Los elementos inválidos se informan y no impiden guardar el resto.
+
+    def create_depositions(self, metadatas: List[Dict]) -> List[Dict]:
+        faults.inject("create")
+        results, depositions = [], []
+        for metadata in metadatas:
+            if not isinstance(metadata, dict):
+                results.append({"success": False, "error": "metadata must be an object"})
+                continue
+            dep = Fakenodo(meta_data=metadata, status="draft")
+            depositions.append(dep)
+            results.append(dep)
+        db.session.add_all(depositions)
+        db.session.commit()
+        return [
+            r if isinstance(r, dict) else {"success": True, "id": r.id, "links": {"bucket": f"/api/files/{r.id}"}}
+            for r in results
+        ]
+
+    def add_files(self, files: List[Dict]) -> List[Dict]:
+        """Attaches ``[{"deposition_id", "file_name", "file_path"?, "file_type"?}, ...]`` with one bulk INSERT."""
+        faults.inject("upload")
+        requested = {f.get("deposition_id") for f in files if isinstance(f, dict)}
+        existing = self._existing_ids(requested)
+        results, rows = [], []
+        for entry in files:
+            if not isinstance(entry, dict) or not entry.get("file_name"):
+                results.append({"success": False, "error": "file_name is required"})
+            elif entry.get("deposition_id") not in existing:
+                results.append(
+                    {"success": False, "deposition_id": entry.get("deposition_id"), "error": "Depósito no encontrado"}
+                )
+            else:
+                row = {
+                    "deposition_id": entry["deposition_id"],
+                    "file_name": entry["file_name"],
+                    "file_path": entry.get("file_path") or "",
+                    "file_type": entry.get("file_type") or "text/csv",
+                    "created_at": datetime.utcnow(),
+                }
+                rows.append(row)
+                results.append({"success": True, "deposition_id": row["deposition_id"], "file_name": row["file_name"]})
+        if rows:
+            db.session.execute(insert(FakenodoFile), rows)
+        db.session.commit()
+        return results
+
+    def publish_depositions(self, deposition_ids: List[int]) -> List[Dict]:
+        """Publishes the depositions, minting a DOI and a version entry for each one.
+
+        A repeated id is published (and reported) once, so it never gets two DOIs or versions.
+        """
+        faults.inject("publish")
+        deposition_ids = _unique_ids(deposition_ids)
+        depositions = {d.id: d for d in Fakenodo.query.filter(Fakenodo.id.in_(self._existing_ids(deposition_ids)))}
+        dois = iter(self._new_dois(len(deposition_ids)))
+        results, versions = [], []
+        for deposition_id in deposition_ids:
+            dep = depositions.get(deposition_id)
+            if dep is None:
+                results.append({"success": False, "id": deposition_id, "error": "Depósito no encontrado"})
+                continue
+            dep.status = "published"
+            dep.doi = next(dois)
+            label = (dep.meta_data or {}).get("dataset_version")
+            if not label:
+                label = "1.0"
+                dep.meta_data = {**(dep.meta_data or {}), "dataset_version": label}
+            versions.append({
+                "deposition_id": dep.id, "version": label, "doi": dep.doi,
+                "changes": PUBLISH_CHANGES, "created_at": datetime.utcnow(),
+            })
+            results.append({"success": True, "id": dep.id, "doi": dep.doi, "version": label})
+        if versions:
+            db.session.execute(insert(FakenodoVersion), versions)
+        db.session.commit()
+        return results
+
+    def _existing_ids(self, deposition_ids) -> set:
+        ids = [i for i in deposition_ids if isinstance(i, int)]
+        if not ids:
+            return set()
+        return {i for (i,) in db.session.query(Fakenodo.id).filter(Fakenodo.id.in_(ids))}
+
+    def _new_dois(self, count: int) -> List[str]:
+        """``count`` distinct DOIs not used by any deposition yet."""
+        dois = set()
+        while len(dois) < count:
+            candidates = {f"10.5281/fakenodo.{random.randint(1000000, 9999999)}" for _ in range(count - len(dois))}
+            taken = {doi for (doi,) in db.session.query(Fakenodo.doi).filter(Fakenodo.doi.in_(candidates))}
+            dois |= candidates - taken
+        return list(dois)
+
     def test_full_connection(self) -> Response:
         return jsonify({"success": True, "message": "FakeNodo connection test successful."})
     
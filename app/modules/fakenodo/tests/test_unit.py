@@ -1,7 +1,8 @@
 import pytest
 
 from app import db
-from app.modules.fakenodo.models import Fakenodo
+from app.modules.fakenodo import faults
+from app.modules.fakenodo.models import Fakenodo, FakenodoFile, FakenodoVersion
 from app.modules.fakenodo.services import FakenodoService
 
 service = FakenodoService()
@@ -65,8 +66,7 @@ def test_service_upload_file_appends_meta_files(test_client):
     result = service.upload_file(ds, dep.id, fm)
     assert result.get("status") == "completed"
 
-    db.session.refresh(dep)
-    files = dep.meta_data.get("files", [])
+    files = service.get_deposition(dep.id)["metadata"]["files"]
     assert len(files) == 1
     assert files[0]["file_name"] == "example.csv"
     assert files[0]["file_type"] == "text/csv"
@@ -122,7 +122,7 @@ def test_service_set_dataset_version_only(test_client):
     assert updated.get("dataset_version") == "2.0"
     
     dep_reloaded = db.session.get(Fakenodo, dep.id)
-    versions = (dep_reloaded.meta_data or {}).get("versions", [])
+    versions = service.get_deposition(dep.id)["metadata"]["versions"]
     assert len(versions) >= 1
     assert versions[-1].get("version") == "2.0"
 
@@ -141,7 +141,7 @@ def test_service_set_dataset_version_without_appending(test_client):
     assert updated.get("dataset_version") == "3.1"
     
     dep_reloaded = db.session.get(Fakenodo, dep.id)
-    versions = (dep_reloaded.meta_data or {}).get("versions", [])
+    versions = service.get_deposition(dep.id)["metadata"]["versions"]
     assert versions == []
 
     db.session.delete(dep_reloaded)
@@ -347,5 +347,148 @@ def test_list_versions_endpoint_404_for_missing(test_client):
     resp = test_client.get("/fakenodo/deposit/depositions/999999/versions")
     assert resp.status_code == 404
 
+
+def test_files_and_versions_are_appended_without_rewriting_metadata(test_client):
+    dep = Fakenodo(meta_data={"title": "Append only", "dataset_version": "1.0"})
+    db.session.add(dep)
+    db.session.commit()
+    original_meta = dict(dep.meta_data)
+
+    for i in range(3):
+        service.upload_file(None, dep.id, _make_fm_stub(name=f"part_{i}.csv", path=f"/tmp/part_{i}.csv"))
+    service.add_version(dep.id, "1.0", "10.fake/1.0")
+
+    # Cada subida es una fila nueva; el JSON de la deposición no cambia
+    db.session.refresh(dep)
+    assert dep.meta_data == original_meta
+    assert FakenodoFile.query.filter_by(deposition_id=dep.id).count() == 3
+    assert service.get_file_names(dep.id) == {"part_0.csv", "part_1.csv", "part_2.csv"}
+
+    # La API sigue devolviendo las listas dentro de "metadata"
+    metadata = service.get_deposition(dep.id)["metadata"]
+    assert [f["file_name"] for f in metadata["files"]] == ["part_0.csv", "part_1.csv", "part_2.csv"]
+    assert [v["doi"] for v in metadata["versions"]] == ["10.fake/1.0"]
+
+    resp = test_client.post(f"/fakenodo/deposit/depositions/{dep.id}/files", data={"name": "extra.csv"})
+    assert resp.status_code == 201
+    assert resp.get_json()["file_name"] == "extra.csv"
+    assert test_client.post("/fakenodo/deposit/depositions/999999/files", data={"name": "x.csv"}).status_code == 404
+
+    assert service.delete_deposition(dep.id) is True
+    assert FakenodoFile.query.filter_by(deposition_id=dep.id).count() == 0
+    assert FakenodoVersion.query.filter_by(deposition_id=dep.id).count() == 0
+
+
+def test_batch_create_upload_and_publish(test_client):
+    resp = test_client.post(
+        "/fakenodo/deposit/depositions/batch",
+        json={"depositions": [{"metadata": {"title": f"Batch {i}"}} for i in range(50)] + ["not a dict"]},
+    )
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["succeeded"] == 50 and data["failed"] == 1
+    ids = [r["id"] for r in data["results"][:50]]
+
+    files = [{"deposition_id": dep_id, "file_name": f"{dep_id}.csv"} for dep_id in ids]
+    files.append({"deposition_id": 999999, "file_name": "x.csv"})
+    resp = test_client.post("/fakenodo/deposit/files/batch", json={"files": files})
+    data = resp.get_json()
+    assert data["succeeded"] == 50
+    assert data["results"][-1] == {"success": False, "deposition_id": 999999, "error": "Depósito no encontrado"}
+
+    # Un id repetido se publica una sola vez
+    resp = test_client.post("/fakenodo/deposit/depositions/publish/batch", json={"ids": ids + [ids[0], 999999]})
+    results = resp.get_json()["results"]
+    assert [r["success"] for r in results] == [True] * 50 + [False]
+    assert len({r["doi"] for r in results[:50]}) == 50
+
+    dep = service.get_deposition(ids[0])
+    assert dep["status"] == "published"
+    assert dep["doi"] == results[0]["doi"]
+    assert [f["file_name"] for f in dep["metadata"]["files"]] == [f"{ids[0]}.csv"]
+    assert [v["version"] for v in dep["metadata"]["versions"]] == ["1.0"]
+
+    assert test_client.post("/fakenodo/deposit/depositions/publish/batch", json={"ids": []}).status_code == 400
+
+    for dep_id in ids:
+        service.delete_deposition(dep_id)
+
+
+def test_fault_profile_injects_latency_errors_and_timeouts(test_client, monkeypatch):
+    slept = []
+    monkeypatch.setattr(faults.time, "sleep", slept.append)
+    profile = {
+        "seed": 1,
+        "default": {"latency_ms": 100},
+        "publish": {"error_rate": 1},
+        "delete": {"timeout_rate": 1, "timeout_ms": 5000},
+    }
+    faults.set_profile(profile)
+    try:
+        dep = service.create_deposition(metadata={"title": "Slow"})
+        assert slept == [0.1]
+
+        with pytest.raises(faults.FakenodoUnavailable):
+            service.publish_deposition(dep["id"])
+        resp = test_client.post(f"/fakenodo/deposit/depositions/{dep['id']}/actions/publish")
+        assert resp.status_code == 503
+
+        slept.clear()
+        with pytest.raises(faults.FakenodoTimeout):
+            service.delete_deposition(dep["id"])
+        assert slept == [5.0]
+    finally:
+        faults.set_profile(None)
+
+    assert service.get_deposition(dep["id"])["status"] == "draft"
+    service.delete_deposition(dep["id"])
+
+
+def test_fault_profile_validation_and_distributions(test_client, monkeypatch):
+    with pytest.raises(ValueError):
+        faults.parse_profile({"upload": {"error_rate": 2}})
+    with pytest.raises(ValueError):
+        faults.parse_profile({"nope": {}})
+    with pytest.raises(ValueError):
+        faults.parse_profile({"read": {"latency_ms": {"distribution": "pareto"}}})
+
+    rng = faults.random.Random(7)
+    uniform = [faults.sample_latency({"distribution": "uniform", "min": 10, "max": 20}, rng) for _ in range(200)]
+    assert all(10 <= v <= 20 for v in uniform)
+    profile = {"distribution": "lognormal", "median": 100, "sigma": 0.5}
+    lognormal = sorted(faults.sample_latency(profile, rng) for _ in range(1001))
+    assert 80 < lognormal[500] < 125
+    capped = faults.sample_latency({"distribution": "normal", "mean": 1000, "stddev": 1, "max": 50}, rng)
+    assert capped == 50
+
+    # Cambiar el perfil por HTTP requiere habilitarlo en la configuración
+    assert test_client.put("/fakenodo/faults", json={"read": {"latency_ms": 1}}).status_code == 403
+    monkeypatch.setitem(test_client.application.config, "FAKENODO_FAULTS_API", True)
+    try:
+        assert test_client.put("/fakenodo/faults", json={"read": {"error_rate": 5}}).status_code == 400
+        resp = test_client.put("/fakenodo/faults", json={"read": {"latency_ms": 1}})
+        assert resp.get_json()["profile"] == {"read": {"latency_ms": 1}}
+    finally:
+        assert test_client.delete("/fakenodo/faults").get_json()["profile"] == {}
+
+
+def test_invalid_configured_profile_is_ignored_and_errors_are_handled_app_wide(test_client, monkeypatch):
+    monkeypatch.setitem(test_client.application.config, "FAKENODO_FAULTS", '{"read": {"error_rate": []}}')
+    assert faults.get_profile() == {}
+
+    dep = service.create_deposition(metadata={"title": "Unreachable"})
+    service.publish_deposition(dep["id"])
+    doi = service.get_deposition(dep["id"])["doi"]
+    faults.set_profile({"read": {"error_rate": 1}})
+    try:
+        # Las páginas de datasets que consultan Fakenodo responden 503 en lugar de un 500
+        assert test_client.get(f"/doi/{doi}").status_code == 503
+        resp = test_client.get(f"/fakenodo/deposit/depositions/{dep['id']}")
+        assert resp.status_code == 503 and "message" in resp.get_json()
+    finally:
+        faults.set_profile(None)
+    service.delete_deposition(dep["id"])
+
+
 # He utilizado parcialmente la inteligencia artificial (IA) como herramienta de apoyo durante el desarrollo y modificación de este archivo de código. 
 # La IA me ha ayudado a entender, optimizar y automatizar ciertas tareas, pero la implementación final y las decisiones clave han sido realizadas por mí.
\ No newline at end of file
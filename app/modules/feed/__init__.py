@@ -0,0 +1,3 @@
+from core.blueprints.base_blueprint import BaseBlueprint
+
+feed_bp = BaseBlueprint('feed', __name__, template_folder='templates')
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from app import db
+
+
+class TimelineEntry(db.Model):
+    """A dataset in the feed of a user, written when it is published or approved into a community."""
+
+    __tablename__ = "timeline_entry"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "dataset_id", name="uq_timeline_entry_user_dataset"),
+        # El feed se lee por keyset sobre (created_at, dataset_id) dentro del timeline de cada usuario
+        db.Index("ix_timeline_entry_user_id_created_at", "user_id", "created_at", "dataset_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id", ondelete="CASCADE"), nullable=False)
+    # Comunidad por la que llegó el dataset (None si llegó por seguir a su autor)
+    community_id = db.Column(db.Integer, db.ForeignKey("community.id", ondelete="CASCADE"), nullable=True)
+    # Fecha de creación del dataset: ordena igual que los datasets que el feed mezcla al leer
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'TimelineEntry<{self.id} user={self.user_id} dataset={self.dataset_id}>'
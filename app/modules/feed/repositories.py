@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from sqlalchemy import and_, exists, insert, literal, or_, select, true
+
+from app.modules.feed.models import TimelineEntry
+from core.repositories.BaseRepository import BaseRepository
+
+
+def before_cursor(created_at, dataset_id, cursor):
+    """Keyset condition: rows strictly after ``cursor`` = ``(created_at, dataset_id)`` in descending order."""
+    if cursor is None:
+        return true()
+    cursor_at, cursor_id = cursor
+    return or_(created_at < cursor_at, and_(created_at == cursor_at, dataset_id < cursor_id))
+
+
+class TimelineEntryRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(TimelineEntry)
+
+    def fan_out(self, dataset_id: int, created_at: datetime, follower_ids, community_id: int = None) -> int:
+        """Adds the dataset to the timeline of every user in ``follower_ids`` (a select of user ids).
+
+        A single INSERT ... SELECT that skips the timelines already holding the dataset. ``created_at``
+        is the dataset's, so entries sort like the datasets merged into the feed on read.
+        """
+        followers = follower_ids.subquery()
+        already = exists().where(
+            TimelineEntry.user_id == followers.c.follower_id, TimelineEntry.dataset_id == dataset_id
+        )
+        stmt = insert(TimelineEntry).from_select(
+            ["user_id", "dataset_id", "community_id", "created_at"],
+            select(
+                followers.c.follower_id,
+                literal(dataset_id, type_=TimelineEntry.dataset_id.type),
+                literal(community_id, type_=TimelineEntry.community_id.type),
+                literal(created_at, type_=TimelineEntry.created_at.type),
+            ).where(~already),
+        )
+        count = self.session.execute(stmt).rowcount
+        self.session.commit()
+        return count
+
+    def page(self, user_id: int, cursor=None, limit: int = 20) -> list:
+        """``(created_at, dataset_id, community_id)`` rows of the user's timeline after ``cursor``, newest first."""
+        return self.session.execute(
+            select(TimelineEntry.created_at, TimelineEntry.dataset_id, TimelineEntry.community_id)
+            .where(TimelineEntry.user_id == user_id)
+            .where(before_cursor(TimelineEntry.created_at, TimelineEntry.dataset_id, cursor))
+            .order_by(TimelineEntry.created_at.desc(), TimelineEntry.dataset_id.desc())
+            .limit(limit)
+        ).all()
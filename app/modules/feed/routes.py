@@ -0,0 +1,22 @@
+from flask import jsonify, render_template, request
+from flask_login import current_user, login_required
+
+from app.modules.feed import feed_bp
+from app.modules.feed.services import FEED_PAGE_SIZE, FeedService
+
+feed_service = FeedService()
+
+
+@feed_bp.route("/feed", methods=["GET"])
+@login_required
+def index():
+    try:
+        feed = feed_service.get_feed(
+            current_user, request.args.get("cursor"), request.args.get("limit", FEED_PAGE_SIZE, type=int)
+        )
+    except ValueError:
+        return jsonify({"message": "Invalid cursor"}), 400
+
+    if request.accept_mimetypes.best_match(["text/html", "application/json"]) == "application/json":
+        return jsonify(feed)
+    return render_template("feed/index.html", feed=feed)
@@ -0,0 +1,153 @@
+"""Activity feed: new datasets from the authors and communities a user follows.
+
+Fan-out on write: when a dataset is published (or approved into a community) a background job
+copies it into the ``timeline_entry`` rows of every follower, so reading a feed is a keyset scan
+of one user's rows. Authors and communities with more than ``FEED_FANOUT_THRESHOLD`` followers
+are not fanned out (one publication would write that many rows); their datasets are merged into
+the feed on read instead. Both sources are ordered by the dataset's ``created_at``, so a single
+keyset cursor pages through them.
+"""
+
+from datetime import datetime
+
+from flask import current_app, url_for
+from sqlalchemy import func, null, select, union_all
+
+from app import db
+from app.modules.community.models import Community, CommunityDataset, CommunityDatasetStatus
+from app.modules.dataset.models import Author, BaseDataset, DSMetaData
+from app.modules.feed.repositories import TimelineEntryRepository, before_cursor
+from app.modules.followAuthor.models import Followauthor
+from app.modules.followCommunity.models import Followcommunity
+from core.jobs import enqueue
+from core.services.BaseService import BaseService
+
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 100
+# DatasetPublicationService.DOI_RECORDED (dataset.services importa este módulo)
+PUBLISHED_STATE = "doi_recorded"
+
+
+def fan_out_dataset(dataset_id: int, community_id: int = None):
+    """Background task: writes the dataset into the timelines of the followers."""
+    return {"entries": FeedService().fan_out(dataset_id, community_id)}
+
+
+def encode_cursor(created_at: datetime, dataset_id: int) -> str:
+    return f"{created_at.isoformat()}_{dataset_id}"
+
+
+def decode_cursor(cursor):
+    """``(created_at, dataset_id)`` from a cursor (None for the first page). Raises ValueError if malformed."""
+    if not cursor:
+        return None
+    created_at, _, dataset_id = cursor.rpartition("_")
+    return datetime.fromisoformat(created_at), int(dataset_id)
+
+
+class FeedService(BaseService):
+    def __init__(self):
+        super().__init__(TimelineEntryRepository())
+
+    @staticmethod
+    def fan_out_threshold() -> int:
+        return current_app.config.get("FEED_FANOUT_THRESHOLD", 10000)
+
+    def schedule_fan_out(self, dataset_id: int, community_id: int = None):
+        key = f"timeline:{dataset_id}:{community_id or 0}"
+        return enqueue(fan_out_dataset, dataset_id, community_id, key=key)
+
+    def fan_out(self, dataset_id: int, community_id: int = None) -> int:
+        """Copies the dataset into the timelines of the followers of its author (or of ``community_id``)."""
+        dataset = db.session.get(BaseDataset, dataset_id)
+        if dataset is None:
+            return 0
+        threshold = self.fan_out_threshold()
+        if community_id:
+            community = db.session.get(Community, community_id)
+            if community is None or community.followers_count > threshold:
+                return 0
+            followers = select(Followcommunity.follower_id).where(Followcommunity.community_id == community_id)
+        else:
+            author = Author.query.filter_by(user_id=dataset.user_id).first()
+            if author is None or author.followers_count > threshold:
+                return 0
+            followers = select(Followauthor.follower_id).where(Followauthor.author_id == author.id)
+        followers = followers.where(followers.selected_columns.follower_id != dataset.user_id)
+        return self.repository.fan_out(dataset_id, dataset.created_at, followers, community_id)
+
+    def get_feed(self, user, cursor: str = None, limit: int = FEED_PAGE_SIZE) -> dict:
+        """A page of the user's feed, newest first, and the cursor of the next page (None at the end)."""
+        limit = min(max(limit, 1), FEED_MAX_PAGE_SIZE)
+        position = decode_cursor(cursor)
+        rows = self.repository.page(user.id, position, limit + 1) + self._fan_out_on_read(user.id, position, limit + 1)
+        rows.sort(key=lambda row: (row.created_at, row.dataset_id), reverse=True)
+
+        # Cada fuente trae filas distintas; un dataset en ambas tiene la misma clave en las dos
+        seen, entries = set(), []
+        for row in rows:
+            if row.dataset_id not in seen:
+                seen.add(row.dataset_id)
+                entries.append(row)
+        page = entries[:limit]
+
+        metadata = {
+            dataset_id: (title, doi)
+            for dataset_id, title, doi in db.session.query(BaseDataset.id, DSMetaData.title, DSMetaData.dataset_doi)
+            .join(DSMetaData, DSMetaData.id == BaseDataset.ds_meta_data_id)
+            .filter(BaseDataset.id.in_([row.dataset_id for row in page]))
+        } if page else {}
+        items = []
+        for row in page:
+            title, doi = metadata.get(row.dataset_id, (None, None))
+            items.append({
+                "dataset_id": row.dataset_id,
+                "title": title,
+                "community_id": row.community_id,
+                "created_at": row.created_at.isoformat(),
+                # Solo los datasets con DOI tienen página pública
+                "url": url_for("dataset.subdomain_index", doi=doi) if doi else None,
+            })
+        next_cursor = encode_cursor(page[-1].created_at, page[-1].dataset_id) if len(entries) > limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def _fan_out_on_read(self, user_id: int, position, limit: int) -> list:
+        """Datasets of the followed authors and communities that are over the fan-out threshold."""
+        threshold = self.fan_out_threshold()
+        big_authors = (
+            select(Author.user_id)
+            .join(Followauthor, Followauthor.author_id == Author.id)
+            .where(Followauthor.follower_id == user_id, Author.followers_count > threshold)
+        )
+        big_communities = (
+            select(Community.id)
+            .join(Followcommunity, Followcommunity.community_id == Community.id)
+            .where(Followcommunity.follower_id == user_id, Community.followers_count > threshold)
+        )
+        # Como en la escritura, que copia el dataset al terminar de publicarlo: solo los publicados
+        by_author = select(
+            BaseDataset.created_at, BaseDataset.id.label("dataset_id"), null().label("community_id")
+        ).where(
+            BaseDataset.user_id.in_(big_authors),
+            BaseDataset.user_id != user_id,
+            BaseDataset.publication_state == PUBLISHED_STATE,
+        )
+        by_community = (
+            select(BaseDataset.created_at, BaseDataset.id.label("dataset_id"), CommunityDataset.community_id)
+            .join(CommunityDataset, CommunityDataset.dataset_id == BaseDataset.id)
+            .where(
+                CommunityDataset.community_id.in_(big_communities),
+                CommunityDataset.status == CommunityDatasetStatus.APPROVED,
+            )
+        )
+        queries = [
+            q.where(before_cursor(BaseDataset.created_at, BaseDataset.id, position)) for q in (by_author, by_community)
+        ]
+        feed = union_all(*queries).subquery()
+        # Un dataset del autor y de una comunidad sale una vez, antes de aplicar el límite
+        return db.session.execute(
+            select(feed.c.created_at, feed.c.dataset_id, func.max(feed.c.community_id).label("community_id"))
+            .group_by(feed.c.created_at, feed.c.dataset_id)
+            .order_by(feed.c.created_at.desc(), feed.c.dataset_id.desc())
+            .limit(limit)
+        ).all()
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.modules.auth.models import User
+from app.modules.community.models import Community, CommunityDataset, CommunityDatasetStatus
+from app.modules.community.services import CommunityDatasetService
+from app.modules.conftest import login, logout
+from app.modules.dataset.models import Author, DataSet, DSMetaData, PublicationType
+from app.modules.feed.models import TimelineEntry
+from app.modules.feed.services import FeedService, decode_cursor
+from app.modules.followAuthor.models import Followauthor
+from app.modules.followCommunity.models import Followcommunity
+
+
+def _dataset(user_id, title, created_at=None, publication_state=None):
+    meta = DSMetaData(title=title, description="d", publication_type=PublicationType.RECORDS)
+    db.session.add(meta)
+    db.session.flush()
+    dataset = DataSet(
+        user_id=user_id, ds_meta_data_id=meta.id, created_at=created_at or datetime.utcnow(),
+        publication_state=publication_state,
+    )
+    db.session.add(dataset)
+    db.session.flush()
+    return dataset
+
+
+@pytest.fixture(scope="module")
+def test_client(test_client):
+    with test_client.application.app_context():
+        reader = User(email="reader@example.com", password="test1234")
+        other = User(email="other-reader@example.com", password="test1234")
+        uploader = User(email="uploader@example.com", password="test1234")
+        star = User(email="star@example.com", password="test1234")
+        db.session.add_all([reader, other, uploader, star])
+        db.session.flush()
+        author = Author(name="Uploader", user_id=uploader.id)
+        star_author = Author(name="Star", user_id=star.id)
+        community = Community(slug="feed-community", name="Feed", created_by_id=uploader.id)
+        db.session.add_all([author, star_author, community])
+        db.session.flush()
+        db.session.add_all([
+            Followauthor(follower_id=reader.id, author_id=author.id),
+            Followauthor(follower_id=reader.id, author_id=star_author.id),
+            Followauthor(follower_id=other.id, author_id=star_author.id),
+            Followcommunity(follower_id=reader.id, community_id=community.id),
+        ])
+        db.session.commit()
+
+    yield test_client
+
+
+def test_publication_and_approval_fan_out_to_follower_timelines(test_client, monkeypatch):
+    monkeypatch.setitem(test_client.application.config, "FEED_FANOUT_THRESHOLD", 1)
+    with test_client.application.test_request_context():
+        reader = User.query.filter_by(email="reader@example.com").first()
+        uploader = User.query.filter_by(email="uploader@example.com").first()
+        star = User.query.filter_by(email="star@example.com").first()
+        community = Community.query.filter_by(slug="feed-community").first()
+        service = FeedService()
+
+        # Fechas intercaladas: el cursor tiene que mezclar el timeline y la lectura en un único orden
+        base = datetime.utcnow() - timedelta(days=1)
+        published = [_dataset(uploader.id, f"Cubo {i}", base + timedelta(minutes=2 * i + 1)) for i in range(3)]
+        famous = [
+            _dataset(star.id, f"Estrella {i}", base + timedelta(minutes=2 * i), publication_state="doi_recorded")
+            for i in range(3)
+        ]
+        draft = _dataset(star.id, "Estrella sin publicar", base + timedelta(minutes=10))
+        db.session.commit()
+        published_ids = [d.id for d in published]
+        famous_ids = [d.id for d in famous]
+        draft_id, star_id = draft.id, star.id
+        for dataset_id in published_ids:
+            service.schedule_fan_out(dataset_id)
+        # El autor con más seguidores que el umbral no se copia a los timelines
+        for dataset_id in famous_ids:
+            service.schedule_fan_out(dataset_id)
+
+        # Aprobar en la comunidad un dataset que ya estaba en el timeline no lo duplica
+        link = CommunityDataset(
+            community_id=community.id, dataset_id=published_ids[0], proposed_by_id=uploader.id,
+            status=CommunityDatasetStatus.PENDING,
+        )
+        db.session.add(link)
+        db.session.commit()
+        CommunityDatasetService().set_status(link.id, CommunityDatasetStatus.APPROVED)
+
+        timeline = {e.dataset_id: e.created_at for e in TimelineEntry.query.filter_by(user_id=reader.id)}
+        assert timeline == {d.id: d.created_at for d in published}
+        assert TimelineEntry.query.filter(TimelineEntry.dataset_id.in_(famous_ids)).count() == 0
+        assert TimelineEntry.query.filter_by(user_id=uploader.id).count() == 0
+        expected = published_ids + famous_ids
+
+    client = test_client.application.test_client()
+    login(client, "reader@example.com", "test1234")
+    seen, positions = _read_feed(client)
+
+    # Los datasets publicados del autor famoso llegan por lectura, mezclados en orden y sin repetir
+    assert sorted(seen) == sorted(expected)
+    assert draft_id not in seen
+    assert positions == sorted(positions, reverse=True)
+
+    with test_client.application.app_context():
+        # Un dataset del autor famoso aprobado en una comunidad que también supera el umbral,
+        # y otro que llega además al timeline: cada uno sale una sola vez
+        community = Community.query.filter_by(slug="feed-community").first()
+        other = User.query.filter_by(email="other-reader@example.com").first()
+        db.session.add(Followcommunity(follower_id=other.id, community_id=community.id))
+        for dataset_id in famous_ids[:2]:
+            db.session.add(CommunityDataset(
+                community_id=community.id, dataset_id=dataset_id, proposed_by_id=star_id,
+                status=CommunityDatasetStatus.APPROVED,
+            ))
+        db.session.commit()
+        FeedService().schedule_fan_out(famous_ids[1], community.id)
+        community.followers_count = 5
+        db.session.commit()
+
+    seen, positions = _read_feed(client)
+    assert sorted(seen) == sorted(expected)
+    assert positions == sorted(positions, reverse=True)
+
+    # Sin timeline propio que rellene la página, un duplicado no puede cortar el feed
+    logout(client)
+    client = test_client.application.test_client()
+    login(client, "other-reader@example.com", "test1234")
+    seen, positions = _read_feed(client, limit=1)
+    assert sorted(seen) == sorted(famous_ids + published_ids[:1])
+    assert positions == sorted(positions, reverse=True)
+
+    assert client.get("/feed", query_string={"cursor": "nope"}).status_code == 400
+    assert client.get("/feed").status_code == 200
+
+
+def _read_feed(client, limit=2):
+    """``(dataset ids, (created_at, dataset_id) positions)`` of the whole feed, read page by page."""
+    seen, positions, cursor = [], [], None
+    while True:
+        response = client.get(
+            "/feed", query_string={"limit": limit, **({"cursor": cursor} if cursor else {})},
+            headers={"Accept": "application/json"},
+        )
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page["items"]) <= limit
+        seen += [item["dataset_id"] for item in page["items"]]
+        positions += [(item["created_at"], item["dataset_id"]) for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return seen, positions
+
+
+def test_decode_cursor_round_trip():
+    moment = datetime(2026, 10, 20, 9, 30, 15, 123456)
+    assert decode_cursor(f"{moment.isoformat()}_42") == (moment, 42)
+    assert decode_cursor(None) is None
+    with pytest.raises(ValueError):
+        decode_cursor("2026-10-20")
@@ -1,8 +1,16 @@
+from sqlalchemy import event
+
 from app import db
+from app.modules.dataset.models import Author
 
 
 class Followauthor(db.Model):
     __tablename__ = "followauthor"
+    __table_args__ = (
+        # Un seguimiento por par; el índice único cubre "¿sigue X a Y?" y el segundo la difusión a seguidores
+        db.UniqueConstraint("follower_id", "author_id", name="uq_followauthor_follower_author"),
+        db.Index("ix_followauthor_author_id_follower_id", "author_id", "follower_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -14,3 +22,21 @@ class Followauthor(db.Model):
 
     def __repr__(self):
         return f'Followauthor<{self.id}>'
+
+
+def update_followers_count(connection, author_id, delta):
+    author = Author.__table__
+    connection.execute(
+        author.update().where(author.c.id == author_id).values(followers_count=author.c.followers_count + delta)
+    )
+
+
+# El contador se actualiza en la misma transacción que el seguimiento
+@event.listens_for(Followauthor, "after_insert")
+def _count_follow(mapper, connection, target):
+    update_followers_count(connection, target.author_id, 1)
+
+
+@event.listens_for(Followauthor, "after_delete")
+def _count_unfollow(mapper, connection, target):
+    update_followers_count(connection, target.author_id, -1)
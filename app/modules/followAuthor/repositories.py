@@ -1,7 +1,23 @@
-from app.modules.followAuthor.models import Followauthor
+from app.modules.followAuthor.models import Followauthor, update_followers_count
 from core.repositories.BaseRepository import BaseRepository
 
 
 class FollowauthorRepository(BaseRepository):
     def __init__(self):
         super().__init__(Followauthor)
+
+    def follow(self, follower_id: int, author_id: int) -> bool:
+        """Single INSERT that is ignored if the follow already exists. Returns True if it was created."""
+        created = self.insert_ignore(follower_id=follower_id, author_id=author_id)
+        if created:
+            update_followers_count(self.session.connection(), author_id, 1)
+        self.session.commit()
+        return created
+
+    def unfollow(self, follower_id: int, author_id: int) -> bool:
+        """Single DELETE of the follow. Returns True if there was one."""
+        deleted = self.model.query.filter_by(follower_id=follower_id, author_id=author_id).delete()
+        if deleted:
+            update_followers_count(self.session.connection(), author_id, -deleted)
+        self.session.commit()
+        return deleted > 0
@@ -1,29 +1,32 @@
 from app import db
 from app.modules.followAuthor.models import Followauthor
+from app.modules.followAuthor.repositories import FollowauthorRepository
 
 
 class FollowauthorService:
-    def follow(self, user, author):
-        """Crea una relación de seguimiento entre un usuario y un autor."""
-        existing = Followauthor.query.filter_by(
-            follower_id=user.id, author_id=author.id
-        ).first()
+    def __init__(self):
+        self.repository = FollowauthorRepository()
 
-        if not existing:
-            follow = Followauthor(follower_id=user.id, author_id=author.id)
-            db.session.add(follow)
-            db.session.commit()
-            return follow
-        return existing
+    def follow(self, user, author) -> bool:
+        """Crea una relación de seguimiento entre un usuario y un autor (True si no existía)."""
+        return self.follow_author_id(user, author.id)
 
-    def unfollow(self, user, author):
-        """Elimina la relación de seguimiento si existe."""
-        existing = Followauthor.query.filter_by(
-            follower_id=user.id, author_id=author.id
-        ).first()
+    def unfollow(self, user, author) -> bool:
+        """Elimina la relación de seguimiento si existe (True si existía)."""
+        return self.unfollow_author_id(user, author.id)
 
-        if existing:
-            db.session.delete(existing)
-            db.session.commit()
-            return existing
-        return None
+    def follow_author_id(self, user, author_id: int) -> bool:
+        return self.repository.follow(user.id, author_id)
+
+    def unfollow_author_id(self, user, author_id: int) -> bool:
+        return self.repository.unfollow(user.id, author_id)
+
+    def followed_author_ids(self, user, author_ids) -> set:
+        """Ids (among ``author_ids``) of the authors that ``user`` follows, in a single IN query."""
+        author_ids = list(author_ids)
+        if not author_ids or not getattr(user, "is_authenticated", False):
+            return set()
+        rows = db.session.query(Followauthor.author_id).filter(
+            Followauthor.follower_id == user.id, Followauthor.author_id.in_(author_ids)
+        )
+        return {author_id for author_id, in rows}
@@ -1,6 +1,10 @@
 import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
 from app import db
 from app.modules.auth.models import User
+from app.modules.conftest import login, logout
 from app.modules.dataset.models import DataSet, DSMetaData, Author, PublicationType
 from app.modules.followAuthor.models import Followauthor
 from app.modules.followAuthor.services import FollowauthorService
@@ -102,7 +106,7 @@ def test_unfollow_author_success(test_client):
         # Ejecutar unfollow
         unfollowed = follow_author_service.unfollow(user, author)
 
-        assert unfollowed is not None, "No devolvió el objeto al dejar de seguir"
+        assert unfollowed is True, "No indicó que se dejó de seguir"
         assert Followauthor.query.filter_by(follower_id=user.id, author_id=author.id).first() is None, \
             "El registro de follow no se eliminó"
 
@@ -119,5 +123,80 @@ def test_unfollow_without_follow(test_client):
 
         result = follow_author_service.unfollow(user, author)
 
-        assert result is None, "Debe devolver None si no se seguía al autor"
+        assert result is False, "Debe devolver False si no se seguía al autor"
         assert Followauthor.query.filter_by(follower_id=user.id, author_id=author.id).first() is None
+
+
+def test_follow_unknown_author_returns_404(test_client):
+    # Cliente sin "with": no deja el contexto de la última petición apilado
+    client = test_client.application.test_client()
+    login(client, "test@example.com", "test1234")
+    try:
+        assert client.post("/authors/999999/follow").status_code == 404
+    finally:
+        logout(client)
+
+
+def test_follow_and_unfollow_maintain_followers_count(test_client):
+    with test_client.application.test_request_context():
+        author = Author(name="Contador")
+        followers = [User(email=f"counter{i}@example.com", password="x") for i in range(3)]
+        db.session.add_all([author, *followers])
+        db.session.commit()
+
+        assert all(follow_author_service.follow(user, author) for user in followers)
+        assert follow_author_service.follow(followers[0], author) is False
+        assert follow_author_service.unfollow(followers[1], author) is True
+        assert follow_author_service.unfollow(followers[1], author) is False
+
+        db.session.refresh(author)
+        assert author.followers_count == 2 == author.followers.count()
+
+        # La restricción única impide el duplicado aunque se salte el servicio
+        db.session.add(Followauthor(follower_id=followers[0].id, author_id=author.id))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+
+def test_authors_page_queries_do_not_grow_with_authors(test_client):
+    app = test_client.application
+    with app.app_context():
+        user = User(email="pager@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    login(client, "pager@example.com", "test1234")
+
+    def page_queries():
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            response = client.get("/authors-and-communities")
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        assert response.status_code == 200
+        return response, len(statements)
+
+    _, few = page_queries()
+
+    with app.app_context():
+        authors = [Author(name=f"AAA Pager {i:02d}") for i in range(30)]
+        db.session.add_all(authors)
+        db.session.flush()
+        db.session.add_all([Followauthor(follower_id=user_id, author_id=a.id) for a in authors[:5]])
+        db.session.commit()
+
+    response, many = page_queries()
+    assert many == few
+    html = response.data.decode()
+    assert "AAA Pager 19" in html and "AAA Pager 20" not in html
+    assert html.count("Dejar de seguir") == 5
@@ -1,9 +1,16 @@
+from sqlalchemy import event
+
 from app import db
 from app.modules.community.models import Community
 from app.modules.auth.models import User
 
 class Followcommunity(db.Model):
     __tablename__ = "followcommunity"
+    __table_args__ = (
+        # Un seguimiento por par; el índice único cubre "¿sigue X a Y?" y el segundo la difusión a seguidores
+        db.UniqueConstraint("follower_id", "community_id", name="uq_followcommunity_follower_community"),
+        db.Index("ix_followcommunity_community_id_follower_id", "community_id", "follower_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -15,3 +22,23 @@ class Followcommunity(db.Model):
 
     def __repr__(self):
         return f'Followcommunity<{self.id}>'
+
+
+def update_followers_count(connection, community_id, delta):
+    community = Community.__table__
+    connection.execute(
+        community.update()
+        .where(community.c.id == community_id)
+        .values(followers_count=community.c.followers_count + delta)
+    )
+
+
+# El contador se actualiza en la misma transacción que el seguimiento
+@event.listens_for(Followcommunity, "after_insert")
+def _count_follow(mapper, connection, target):
+    update_followers_count(connection, target.community_id, 1)
+
+
+@event.listens_for(Followcommunity, "after_delete")
+def _count_unfollow(mapper, connection, target):
+    update_followers_count(connection, target.community_id, -1)
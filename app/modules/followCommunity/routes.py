@@ -1,9 +1,11 @@
 from flask import render_template, redirect, url_for, flash
 from flask_login import login_required, current_user
-from app import db
 from app.modules.followCommunity import followCommunity_bp
 from app.modules.followCommunity.models import Followcommunity
 from app.modules.community.models import Community
+from app.modules.followCommunity.services import FollowcommunityService
+
+follow_community_service = FollowcommunityService()
 
 @followCommunity_bp.route("/communities/follows")
 def index():
@@ -13,42 +15,20 @@ def index():
 @followCommunity_bp.route("/communities/<int:community_id>/follow", methods=["POST"])
 @login_required
 def follow(community_id):
-    # Verificar si ya sigue
-    existing = Followcommunity.query.filter_by(
-        community_id=community_id,
-        follower_id=current_user.id
-    ).first()
-
-
-    if not existing:
-        follow = Followcommunity(
-            community_id=community_id,
-            follower_id=current_user.id
-        )
-        db.session.add(follow)
-        db.session.commit()
+    community = Community.query.get_or_404(community_id)
+    if follow_community_service.follow_community_id(current_user, community_id):
         flash("Has seguido la comunidad.", "success")
     else:
         flash("Ya sigues esta comunidad.", "info")
 
-    community = Community.query.get_or_404(community_id)
-
     return redirect(url_for("community.community_detail", slug=community.slug))
 
 
 @followCommunity_bp.route("/communities/<int:community_id>/unfollow", methods=["POST"])
 @login_required
 def unfollow(community_id):
-    existing = Followcommunity.query.filter_by(
-        community_id=community_id,
-        follower_id=current_user.id
-    ).first()
-
-    if existing:
-        db.session.delete(existing)
-        db.session.commit()
-        flash("Has dejado de seguir la comunidad.", "warning")
-
     community = Community.query.get_or_404(community_id)
+    if follow_community_service.unfollow_community_id(current_user, community_id):
+        flash("Has dejado de seguir la comunidad.", "warning")
 
-    return redirect(url_for("community.community_detail", slug=community.slug))
\ No newline at end of file
+    return redirect(url_for("community.community_detail", slug=community.slug))
@@ -9,36 +9,26 @@ class FollowcommunityService(BaseService):
     def __init__(self):
         super().__init__(FollowcommunityRepository())
 
-    def follow(self, user: User, community: Community):
-        """Permite que un usuario siga a una comunidad si aún no la sigue."""
-        # Verificar si ya existe
-        existing = Followcommunity.query.filter_by(
-            follower_id=user.id,
-            community_id=community.id
-        ).first()
+    def follow(self, user: User, community: Community) -> bool:
+        """Permite que un usuario siga a una comunidad si aún no la sigue (True si no la seguía)."""
+        return self.follow_community_id(user, community.id)
 
-        if not existing:
-            follow = Followcommunity(
-                follower_id=user.id,
-                community_id=community.id
-            )
-            db.session.add(follow)
-            db.session.commit()
-            return follow
-        # Si ya sigue, devolver None
-        return None
+    def unfollow(self, user: User, community: Community) -> bool:
+        """Permite que un usuario deje de seguir una comunidad si la sigue (True si la seguía)."""
+        return self.unfollow_community_id(user, community.id)
 
-    def unfollow(self, user: User, community: Community):
-        """Permite que un usuario deje de seguir una comunidad si la sigue."""
-        existing = Followcommunity.query.filter_by(
-            follower_id=user.id,
-            community_id=community.id
-        ).first()
+    def follow_community_id(self, user: User, community_id: int) -> bool:
+        return self.repository.follow(user.id, community_id)
 
-        if existing:
-            db.session.delete(existing)
-            db.session.commit()
-            return existing
+    def unfollow_community_id(self, user: User, community_id: int) -> bool:
+        return self.repository.unfollow(user.id, community_id)
 
-        # Si no estaba siguiendo, devolver None
-        return None
+    def followed_community_ids(self, user: User, community_ids) -> set:
+        """Ids (among ``community_ids``) of the communities that ``user`` follows, in a single IN query."""
+        community_ids = list(community_ids)
+        if not community_ids or not getattr(user, "is_authenticated", False):
+            return set()
+        rows = db.session.query(Followcommunity.community_id).filter(
+            Followcommunity.follower_id == user.id, Followcommunity.community_id.in_(community_ids)
+        )
+        return {community_id for community_id, in rows}
@@ -85,7 +85,7 @@ def test_unfollow_community_success(test_client):
         # Ejecutar unfollow
         unfollowed = follow_community_service.unfollow(user, community)
 
-        assert unfollowed is not None, "No devolvió el objeto al dejar de seguir"
+        assert unfollowed is True, "No indicó que se dejó de seguir"
         assert Followcommunity.query.filter_by(follower_id=user.id, community_id=community.id).first() is None, \
             "El registro de follow no se eliminó"
 
@@ -102,5 +102,5 @@ def test_unfollow_without_follow(test_client):
 
         result = follow_community_service.unfollow(user, community)
 
-        assert result is None, "Debe devolver None si no se seguía a la comunidad"
+        assert result is False, "Debe devolver False si no se seguía a la comunidad"
         assert Followcommunity.query.filter_by(follower_id=user.id, community_id=community.id).first() is None
@@ -0,0 +1,164 @@
+"""Content-addressed store for uploaded files.
+
+Every file is kept once under ``uploads/blobs/<aa>/<sha256>``. Dataset directories hold hard links
+to the blob, so cloning a dataset for a new version only creates links, never copies bytes. The
+link count of a blob doubles as its reference count: a blob whose only link is the store itself
+is garbage unless a Hubfile still points at its checksum.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import uuid
+
+from app.modules.hubfile import compression
+from core.configuration.configuration import uploads_folder_name
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def blobs_root() -> str:
+    working_dir = os.getenv("WORKING_DIR") or os.getcwd()
+    return os.path.join(working_dir, uploads_folder_name(), "blobs")
+
+
+def blob_path(checksum: str):
+    """Path of the blob for ``checksum`` (None for anything that is not a sha256 hex digest)."""
+    if not checksum or not SHA256_RE.match(checksum):
+        return None
+    return os.path.join(blobs_root(), checksum[:2], checksum)
+
+
+def has_blob(checksum: str) -> bool:
+    path = blob_path(checksum)
+    return path is not None and os.path.exists(path)
+
+
+def hash_file(path):
+    """Streams ``path`` and returns ``(sha256, size)`` of its (decompressed) payload."""
+    digest = hashlib.sha256()
+    size = 0
+    with compression.open_payload(path) as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def write_and_hash(stream, dest):
+    """Copies ``stream`` into ``dest`` chunk by chunk, hashing and counting the bytes as they pass.
+
+    Returns ``(sha256, size)``: one pass over the data and memory bounded by ``CHUNK_SIZE``.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(dest, "wb") as f:
+        while chunk := stream.read(CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+            f.write(chunk)
+    return digest.hexdigest(), size
+
+
+def _replace_with_link(source, dest):
+    """Atomically makes ``dest`` a hard link to ``source`` (a copy where hard links are not possible)."""
+    tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.link(source, tmp)
+    except OSError:
+        shutil.copy2(source, tmp)
+    os.replace(tmp, dest)
+
+
+def ingest(path, checksum: str = None) -> str:
+    """Stores the file at ``path`` in the blob store and returns its sha256.
+
+    ``path`` stays where it is but ends up sharing its inode with the blob. When an identical blob
+    already exists ``path`` is replaced by a link to it, so duplicate uploads release their bytes.
+    ``checksum`` skips re-reading the file when the digest was computed while saving it. With
+    compression enabled the blob is written zstd-compressed and ``path`` then links to it as well.
+    """
+    if checksum is None or not SHA256_RE.match(checksum):
+        checksum, _ = hash_file(path)
+    target = blob_path(checksum)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    if os.path.exists(target):
+        if not os.path.samefile(path, target):
+            _replace_with_link(target, path)
+        return checksum
+
+    if compression.compression_enabled() and not compression.is_zstd(path):
+        tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            compression.compress_file(path, tmp)
+            os.replace(tmp, target)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        _replace_with_link(target, path)
+        return checksum
+
+    try:
+        os.link(path, target)
+    except FileExistsError:
+        # Otro proceso ha guardado el mismo contenido entre la comprobación y el enlace
+        _replace_with_link(target, path)
+    except OSError:
+        # Sin soporte de enlaces duros (p. ej. otro sistema de ficheros): guardamos una copia
+        tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+        shutil.copy2(path, tmp)
+        os.replace(tmp, target)
+    return checksum
+
+
+def link_to(checksum: str, dest: str) -> bool:
+    """Materialises the blob ``checksum`` at ``dest``. Returns False if the store does not have it."""
+    source = blob_path(checksum)
+    if source is None or not os.path.exists(source):
+        return False
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    _replace_with_link(source, dest)
+    return True
+
+
+def iter_unlinked_blobs():
+    """Yields ``(checksum, path)`` for blobs that no dataset directory links to anymore."""
+    root = blobs_root()
+    if not os.path.isdir(root):
+        return
+    for prefix in os.listdir(root):
+        directory = os.path.join(root, prefix)
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if SHA256_RE.match(name) and os.stat(path).st_nlink <= 1:
+                yield name, path
+
+
+def collect_garbage(referenced) -> list:
+    """Deletes unlinked blobs whose checksum is not in ``referenced(checksums) -> set``.
+
+    Returns the checksums that were removed.
+    """
+    removed = []
+    candidates = dict(iter_unlinked_blobs())
+    if not candidates:
+        return removed
+    keep = referenced(list(candidates))
+    for checksum, path in candidates.items():
+        if checksum in keep:
+            continue
+        try:
+            os.remove(path)
+            removed.append(checksum)
+        except FileNotFoundError:
+            pass
+    logger.info("Blob store garbage collection removed %d blobs", len(removed))
+    return removed
@@ -0,0 +1,584 @@
+"""Columnar on-disk cache for published CSV files.
+
+A cached table lives in its own directory (keyed by the Hubfile checksum) and contains a
+``manifest.json`` plus one binary file per column:
+
+- ``int`` columns are stored as native int64 values (``array`` typecode ``q``),
+- ``float`` columns as native float64 values (``d``),
+- ``string`` columns are dictionary encoded: int32 codes (``i``) and a JSON dictionary.
+
+Columns with missing values get a one-byte-per-row null mask. Every file is opened through
+``mmap``, so reading the cache never parses text.
+
+Rows are also split into row groups of ``ROW_GROUP_SIZE`` rows. Each group records where it
+starts in the table and in the source CSV (byte offset/length) plus a zone map: the min, max and
+null count of every column. Filters skip the groups whose zone map rules out a match.
+"""
+
+import bisect
+import csv
+import json
+import math
+import mmap
+import operator
+import os
+import re
+import shutil
+import sys
+import uuid
+from array import array
+
+from app.modules.hubfile import compression
+
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 2
+ROW_GROUP_SIZE = 64 * 1024
+
+INT, FLOAT, STRING = "int", "float", "string"
+TYPECODES = {INT: "q", FLOAT: "d", STRING: "i"}
+
+INT_RE = re.compile(r"^[+-]?\d+$")
+FLOAT_RE = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
+
+SNIFF_BYTES = 64 * 1024
+FLUSH_EVERY = 64 * 1024
+
+OPERATORS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "lt": operator.lt,
+    "le": operator.le,
+}
+
+
+def open_csv(path):
+    return compression.open_payload_text(path)
+
+
+def sniff_delimiter(path) -> str:
+    with open_csv(path) as f:
+        sample = f.read(SNIFF_BYTES)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+
+def _cell_type(raw: str):
+    if INT_RE.match(raw):
+        value = int(raw)
+        if INT64_MIN <= value <= INT64_MAX:
+            return INT
+        return FLOAT
+    if FLOAT_RE.match(raw):
+        return FLOAT
+    return STRING
+
+
+def _widen(current, new):
+    if current is None:
+        return new
+    if current == STRING or new == STRING:
+        return STRING
+    if current == FLOAT or new == FLOAT:
+        return FLOAT
+    return INT
+
+
+def parse_value(raw, column_type):
+    """Converts a raw CSV cell into the Python value of its column type (None for empty cells)."""
+    if raw is None:
+        return None
+    raw = raw.strip()
+    if raw == "":
+        return None
+    if column_type == INT:
+        return int(raw)
+    if column_type == FLOAT:
+        return float(raw)
+    return raw
+
+
+def normalize_row(row, width):
+    if len(row) < width:
+        return row + [""] * (width - len(row))
+    return row[:width]
+
+
+def iter_csv_rows(path, delimiter=None):
+    """Yields the header and then every data row, padded or trimmed to the header width."""
+    delimiter = delimiter or sniff_delimiter(path)
+    with open_csv(path) as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        yield header
+        for row in reader:
+            yield normalize_row(row, len(header))
+
+
+def iter_csv_records(path, delimiter=None, start=0, end=None):
+    """Yields ``(byte_offset, row)`` for the raw CSV records found in ``[start, end)``.
+
+    ``start`` and ``end`` must fall on record boundaries (0, a value yielded here or the file size).
+    The header is the first record when ``start`` is 0.
+    """
+    delimiter = delimiter or sniff_delimiter(path)
+    with compression.open_payload(path, offset=start) as f:
+        yield from _read_records(f, delimiter, start, end)
+
+
+def iter_csv_ranges(path, ranges, delimiter=None):
+    """Yields ``(byte_offset, row)`` for the records of every ``(start, end)`` range, in one pass.
+
+    The ranges must be sorted and disjoint, with bounds as in ``iter_csv_records``. The payload is
+    opened once and the reader only moves forward, skipping the bytes between ranges.
+    """
+    delimiter = delimiter or sniff_delimiter(path)
+    position = 0
+    with compression.open_payload(path) as f:
+        for start, end in ranges:
+            if start < position:
+                raise ValueError("Byte ranges must be sorted and must not overlap")
+            compression.advance(f, start - position)
+            yield from _read_records(f, delimiter, start, end)
+            position = end
+
+
+def iter_rows_at(path, row_groups, indices, width, delimiter=None):
+    """Yields the original text of the rows at ``indices`` (sorted), padded or trimmed to ``width``.
+
+    Only the row groups (manifest entries) that hold them are read, in one pass. The cache keeps
+    parsed values, so this is how previews and query results show the cells exactly as uploaded.
+    """
+    wanted = set(indices)
+    if not wanted:
+        return
+    offsets = [group["row_offset"] for group in row_groups]
+    groups = [row_groups[k] for k in sorted({bisect.bisect_right(offsets, i) - 1 for i in wanted})]
+    starts = {group["byte_offset"]: group["row_offset"] for group in groups}
+    ranges = [(group["byte_offset"], group["byte_offset"] + group["byte_length"]) for group in groups]
+    records = iter_csv_ranges(path, ranges, delimiter)
+    try:
+        row_index = None
+        for offset, row in records:
+            row_index = starts[offset] if offset in starts else row_index + 1
+            if row_index in wanted:
+                yield normalize_row(row, width)
+                wanted.discard(row_index)
+                if not wanted:
+                    return
+    finally:
+        records.close()
+
+
+def _read_records(f, delimiter, start, end):
+    """Parses the records of ``f`` (positioned at ``start``) until ``end``, leaving ``f`` there."""
+    position = start
+
+    def lines():
+        nonlocal position
+        if end is not None and position >= end:
+            return
+        for raw in f:
+            position += len(raw)
+            yield raw.decode("utf-8")
+            if end is not None and position >= end:
+                return
+
+    reader = csv.reader(lines(), delimiter=delimiter)
+    while True:
+        offset = position
+        row = next(reader, None)
+        if row is None:
+            return
+        yield offset, row
+
+
+def infer_schema(path):
+    """First pass over a CSV: returns ``(delimiter, header, types)``.
+
+    Empty cells do not take part in inference; a column with no values at all is a string column.
+    """
+    delimiter = sniff_delimiter(path)
+    rows = iter_csv_rows(path, delimiter)
+    header = next(rows, [])
+    types = [None] * len(header)
+    for row in rows:
+        for i, raw in enumerate(row):
+            raw = raw.strip()
+            if raw and types[i] != STRING:
+                types[i] = _widen(types[i], _cell_type(raw))
+    return delimiter, header, [t or STRING for t in types]
+
+
+class ColumnStats:
+    """Streaming per-column accumulator (count, nulls, min, max, mean and distinct strings)."""
+
+    def __init__(self, column_type, track_distinct=True):
+        self.column_type = column_type
+        self.count = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.total = 0
+        self.distinct = set() if column_type == STRING and track_distinct else None
+
+    def add(self, value):
+        if value is None:
+            self.nulls += 1
+            return
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self.distinct is not None:
+            self.distinct.add(value)
+        elif self.column_type != STRING:
+            self.total += value
+
+    def to_dict(self):
+        data = {
+            "type": self.column_type,
+            "count": self.count,
+            "nulls": self.nulls,
+            "min": self.min,
+            "max": self.max,
+        }
+        if self.distinct is not None:
+            data["distinct"] = len(self.distinct)
+        elif self.column_type != STRING:
+            data["mean"] = (self.total / self.count) if self.count else None
+        return data
+
+    def zone(self):
+        zone = {"min": self.min, "max": self.max, "nulls": self.nulls}
+        # JSON (y las columnas JSON de MySQL) no admite Infinity: el grupo queda sin límites y no se descarta
+        if any(isinstance(bound, float) and not math.isfinite(bound) for bound in (self.min, self.max)):
+            zone.update(min=None, max=None, unbounded=True)
+        return zone
+
+
+class _RowGroup:
+    def __init__(self, row_offset, byte_offset, types):
+        self.row_offset = row_offset
+        self.row_count = 0
+        self.byte_offset = byte_offset
+        self.byte_length = 0
+        self.stats = [ColumnStats(t, track_distinct=False) for t in types]
+
+    def to_dict(self):
+        return {
+            "row_offset": self.row_offset,
+            "row_count": self.row_count,
+            "byte_offset": self.byte_offset,
+            "byte_length": self.byte_length,
+            "columns": [s.zone() for s in self.stats],
+        }
+
+
+def zone_may_match(zone, op, literal) -> bool:
+    """False only when no value within ``zone`` (a row group zone map entry) can satisfy ``<op> literal``."""
+    if zone.get("unbounded"):
+        return True
+    low, high = zone.get("min"), zone.get("max")
+    if low is None or high is None:
+        # Solo nulos en el grupo: ningún operador los selecciona
+        return False
+    try:
+        if op == "eq":
+            return low <= literal <= high
+        if op == "ne":
+            return not (low == high == literal)
+        if op == "gt":
+            return high > literal
+        if op == "ge":
+            return high >= literal
+        if op == "lt":
+            return low < literal
+        if op == "le":
+            return low <= literal
+    except TypeError:
+        # Tipos no comparables (p. ej. literal numérico frente a columna de texto): no descartamos
+        return True
+    raise ValueError(f"Unsupported operator '{op}'")
+
+
+def cache_ready(directory) -> bool:
+    """True if ``directory`` holds a complete cache written with the current format version."""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f).get("format_version") == FORMAT_VERSION
+    except (OSError, ValueError):
+        return False
+
+
+def scan_csv_statistics(path):
+    """Computes column statistics straight from the CSV (used when no columnar cache exists)."""
+    delimiter, header, types = infer_schema(path)
+    stats = [ColumnStats(t) for t in types]
+    n_rows = 0
+    rows = iter_csv_rows(path, delimiter)
+    next(rows, None)
+    for row in rows:
+        n_rows += 1
+        for i, raw in enumerate(row):
+            stats[i].add(parse_value(raw, types[i]))
+    return {
+        "n_rows": n_rows,
+        "columns": [dict(name=name, **s.to_dict()) for name, s in zip(header, stats)],
+    }
+
+
+class _ColumnWriter:
+    def __init__(self, directory, index, column_type):
+        self.column_type = column_type
+        self.values_name = f"{index}.bin"
+        self.nulls_name = f"{index}.nulls"
+        self.values_path = os.path.join(directory, self.values_name)
+        self.nulls_path = os.path.join(directory, self.nulls_name)
+        self.values_file = open(self.values_path, "wb")
+        self.nulls_file = open(self.nulls_path, "wb")
+        self.values = array(TYPECODES[column_type])
+        self.nulls = bytearray()
+        self.has_nulls = False
+        self.dictionary = {} if column_type == STRING else None
+
+    def append(self, value):
+        if value is None:
+            self.has_nulls = True
+            self.nulls.append(1)
+            if self.column_type == FLOAT:
+                self.values.append(float("nan"))
+            elif self.column_type == STRING:
+                self.values.append(-1)
+            else:
+                self.values.append(0)
+        else:
+            self.nulls.append(0)
+            if self.dictionary is not None:
+                value = self.dictionary.setdefault(value, len(self.dictionary))
+            self.values.append(value)
+        if len(self.values) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        self.values.tofile(self.values_file)
+        self.nulls_file.write(self.nulls)
+        self.values = array(TYPECODES[self.column_type])
+        self.nulls = bytearray()
+
+    def close(self, directory):
+        self.flush()
+        self.values_file.close()
+        self.nulls_file.close()
+        if not self.has_nulls:
+            os.remove(self.nulls_path)
+        entry = {
+            "type": self.column_type,
+            "file": self.values_name,
+            "nulls": self.nulls_name if self.has_nulls else None,
+            "dictionary": None,
+        }
+        if self.dictionary is not None:
+            entry["dictionary"] = f"{os.path.splitext(self.values_name)[0]}.dict.json"
+            with open(os.path.join(directory, entry["dictionary"]), "w", encoding="utf-8") as f:
+                json.dump(list(self.dictionary), f)
+        return entry
+
+
+def build_columnar_cache(csv_path, dest_dir, checksum=None, row_group_size=None):
+    """Converts ``csv_path`` into the columnar layout under ``dest_dir`` and returns the manifest.
+
+    The table is written to a sibling temporary directory and renamed into place, so readers never
+    see a half-written cache. If another worker already produced ``dest_dir`` its copy is kept; a
+    cache left by an older format version is replaced.
+    """
+    row_group_size = row_group_size or ROW_GROUP_SIZE
+    delimiter, header, types = infer_schema(csv_path)
+
+    parent = os.path.dirname(os.path.abspath(dest_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = os.path.join(parent, f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+
+    try:
+        writers = [_ColumnWriter(tmp_dir, i, t) for i, t in enumerate(types)]
+        stats = [ColumnStats(t) for t in types]
+        groups = []
+        group = None
+        n_rows = 0
+        records = iter_csv_records(csv_path, delimiter)
+        next(records, None)
+        for offset, row in records:
+            if group is None or group.row_count >= row_group_size:
+                if group is not None:
+                    group.byte_length = offset - group.byte_offset
+                group = _RowGroup(n_rows, offset, types)
+                groups.append(group)
+            n_rows += 1
+            group.row_count += 1
+            for i, raw in enumerate(normalize_row(row, len(header))):
+                value = parse_value(raw, types[i])
+                writers[i].append(value)
+                stats[i].add(value)
+                group.stats[i].add(value)
+        if group is not None:
+            group.byte_length = compression.payload_size(csv_path) - group.byte_offset
+
+        columns = []
+        for name, writer, column_stats in zip(header, writers, stats):
+            entry = writer.close(tmp_dir)
+            entry["name"] = name
+            entry["stats"] = column_stats.to_dict()
+            columns.append(entry)
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "checksum": checksum,
+            "byteorder": sys.byteorder,
+            "delimiter": delimiter,
+            "n_rows": n_rows,
+            "columns": columns,
+            "row_groups": [g.to_dict() for g in groups],
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        if os.path.isdir(dest_dir) and not cache_ready(dest_dir):
+            shutil.rmtree(dest_dir, ignore_errors=True)
+        try:
+            os.replace(tmp_dir, dest_dir)
+        except OSError:
+            if not os.path.exists(os.path.join(dest_dir, MANIFEST_NAME)):
+                raise
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return manifest
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _map_file(path, typecode):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None, memoryview(b"").cast(typecode)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return mapped, memoryview(mapped).cast(typecode)
+
+
+class Column:
+    def __init__(self, directory, entry):
+        self.name = entry["name"]
+        self.type = entry["type"]
+        self.stats = entry.get("stats") or {}
+        self._maps = []
+        mapped, self.values = _map_file(os.path.join(directory, entry["file"]), TYPECODES[self.type])
+        self._maps.append(mapped)
+        self.nulls = None
+        if entry.get("nulls"):
+            mapped, self.nulls = _map_file(os.path.join(directory, entry["nulls"]), "B")
+            self._maps.append(mapped)
+        self.dictionary = None
+        if entry.get("dictionary"):
+            with open(os.path.join(directory, entry["dictionary"]), "r", encoding="utf-8") as f:
+                self.dictionary = json.load(f)
+
+    def is_null(self, i) -> bool:
+        return self.nulls is not None and self.nulls[i] == 1
+
+    def value(self, i):
+        if self.is_null(i):
+            return None
+        raw = self.values[i]
+        return self.dictionary[raw] if self.dictionary is not None else raw
+
+    def close(self):
+        self.values.release()
+        if self.nulls is not None:
+            self.nulls.release()
+        for mapped in self._maps:
+            if mapped is not None:
+                mapped.close()
+
+
+class ColumnarTable:
+    """Read-only, memory-mapped view over a cache directory produced by ``build_columnar_cache``."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar format version in {directory}")
+        if self.manifest.get("byteorder") != sys.byteorder:
+            raise ValueError(f"Columnar cache in {directory} was written with a different byte order")
+        self.n_rows = self.manifest["n_rows"]
+        self.row_groups = self.manifest["row_groups"]
+        self.columns = [Column(directory, entry) for entry in self.manifest["columns"]]
+        self._by_name = {c.name: c for c in self.columns}
+
+    @property
+    def column_names(self):
+        return [c.name for c in self.columns]
+
+    def column(self, name) -> Column:
+        return self._by_name[name]
+
+    def row(self, i):
+        return [c.value(i) for c in self.columns]
+
+    def rows(self, start=0, stop=None):
+        stop = self.n_rows if stop is None else min(stop, self.n_rows)
+        for i in range(start, stop):
+            yield self.row(i)
+
+    def matching_rows(self, column_name, op, literal, start=0, stop=None):
+        """Yields indexes of rows in ``[start, stop)`` where ``column <op> literal`` holds.
+
+        Row groups whose zone map cannot contain a match are skipped without touching their values.
+        """
+        column = self.column(column_name)
+        index = self.columns.index(column)
+        accept = self._row_predicate(column, op, literal)
+        stop = self.n_rows if stop is None else min(stop, self.n_rows)
+
+        for group in self.row_groups:
+            low = max(start, group["row_offset"])
+            high = min(stop, group["row_offset"] + group["row_count"])
+            if low >= high or not zone_may_match(group["columns"][index], op, literal):
+                continue
+            for i in range(low, high):
+                if not column.is_null(i) and accept(column.values[i]):
+                    yield i
+
+    @staticmethod
+    def _row_predicate(column, op, literal):
+        compare = OPERATORS[op]
+        if column.dictionary is None:
+            return lambda raw: compare(raw, literal)
+        if op in ("eq", "ne"):
+            # Translate the literal into its code once and compare integers
+            try:
+                code = column.dictionary.index(literal)
+            except ValueError:
+                code = None
+            return lambda raw: compare(raw, code)
+        accepted = {code for code, value in enumerate(column.dictionary) if compare(value, literal)}
+        return accepted.__contains__
+
+    def close(self):
+        for column in self.columns:
+            column.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,168 @@
+"""Optional zstd compression of stored Hubfile payloads.
+
+With ``UPLOADS_COMPRESSION=zstd`` blobs are written zstd-compressed when they enter the blob store
+(the dataset directories link to the same compressed inode). Compression is detected per file
+from the zstd magic number, so compressed and plain files can coexist and the mode can be turned
+on or off at any time. Every reader must go through ``open_payload``/``open_payload_text``.
+
+Payloads are compressed as independent frames of ``FRAME_SIZE`` bytes followed by a seek table
+(the zstd "seekable format": a skippable frame listing the size of every frame), so readers can
+jump to any offset decompressing at most one frame. Files compressed as a single frame are still
+read, decompressing from the start.
+"""
+
+import io
+import os
+import shutil
+import struct
+import zlib
+
+import zstandard
+
+from core.payloads.zstd import (
+    CHUNK_SIZE,
+    SEEK_FOOTER,
+    SEEKABLE_MAGIC,
+    SKIPPABLE_MAGIC,
+    ZSTD_MAGIC,
+    SeekableZstdReader,
+    discard,
+    read_seek_table,
+)
+
+FRAME_SIZE = 4 * CHUNK_SIZE
+
+
+def compression_enabled() -> bool:
+    return os.getenv("UPLOADS_COMPRESSION", "").strip().lower() == "zstd"
+
+
+def compression_level() -> int:
+    return int(os.getenv("UPLOADS_COMPRESSION_LEVEL", "3"))
+
+
+def is_zstd(path) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(ZSTD_MAGIC)) == ZSTD_MAGIC
+
+
+def compress_file(src, dest, level=None):
+    """Writes a seekable zstd-compressed copy of ``src`` to ``dest`` (one frame per ``FRAME_SIZE`` bytes)."""
+    compressor = zstandard.ZstdCompressor(level=level or compression_level(), write_content_size=True)
+    entries = []
+    with open(src, "rb") as fin, open(dest, "wb") as fout:
+        while True:
+            block = fin.read(FRAME_SIZE)
+            if not block and entries:
+                break
+            frame = compressor.compress(block)
+            fout.write(frame)
+            entries.append((len(frame), len(block)))
+            if not block:
+                break
+        table = b"".join(struct.pack("<II", c, d) for c, d in entries)
+        table += SEEK_FOOTER.pack(len(entries), 0, SEEKABLE_MAGIC)
+        fout.write(struct.pack("<II", SKIPPABLE_MAGIC, len(table)) + table)
+
+
+def open_payload(path, offset=0):
+    """Opens a stored payload for binary reading, decompressing on the fly when it is zstd.
+
+    ``offset`` positions the reader in the decompressed payload. Plain and seekable zstd files
+    return seekable readers; a single-frame zstd file decompresses and discards the bytes before it.
+    """
+    f = open(path, "rb")
+    if f.read(len(ZSTD_MAGIC)) != ZSTD_MAGIC:
+        f.seek(offset)
+        return f
+    seek_table = read_seek_table(f)
+    if seek_table is not None:
+        reader = io.BufferedReader(SeekableZstdReader(f, *seek_table), buffer_size=CHUNK_SIZE)
+        reader.seek(offset)
+        return reader
+    f.seek(0)
+    reader = io.BufferedReader(
+        zstandard.ZstdDecompressor().stream_reader(f, read_size=CHUNK_SIZE, closefd=True), buffer_size=CHUNK_SIZE
+    )
+    discard(reader, offset)
+    return reader
+
+
+def advance(reader, count):
+    """Moves a reader returned by ``open_payload`` ``count`` bytes forward."""
+    if reader.seekable():
+        reader.seek(count, io.SEEK_CUR)
+    else:
+        discard(reader, count)
+
+
+def is_seekable(path) -> bool:
+    """Whether readers can jump to any offset of ``path`` without decompressing what comes before."""
+    with open(path, "rb") as f:
+        return f.read(len(ZSTD_MAGIC)) != ZSTD_MAGIC or read_seek_table(f) is not None
+
+
+def open_payload_text(path):
+    return io.TextIOWrapper(open_payload(path), encoding="utf-8", newline="")
+
+
+def payload_size(path) -> int:
+    """Size of the payload once decompressed."""
+    with open(path, "rb") as f:
+        header = f.read(18)
+        seek_table = read_seek_table(f) if header[: len(ZSTD_MAGIC)] == ZSTD_MAGIC else None
+    if seek_table is not None:
+        return seek_table[1]
+    if header[: len(ZSTD_MAGIC)] == ZSTD_MAGIC:
+        size = zstandard.frame_content_size(header)
+        if size >= 0:
+            return size
+        with open_payload(path) as reader:
+            return sum(len(chunk) for chunk in iter(lambda: reader.read(CHUNK_SIZE), b""))
+    return os.path.getsize(path)
+
+
+def copy_payload(path, fileobj):
+    """Streams the decompressed payload of ``path`` into ``fileobj``."""
+    with open_payload(path) as reader:
+        shutil.copyfileobj(reader, fileobj, CHUNK_SIZE)
+
+
+def iter_payload(path, encoding=None):
+    """Yields the payload of ``path`` in chunks.
+
+    ``encoding`` is the content coding the client will receive: ``"zstd"`` sends the stored
+    compressed bytes as they are, ``"gzip"`` re-encodes on the fly and ``None`` decompresses.
+    """
+    if encoding == "zstd":
+        with open(path, "rb") as f:
+            yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+        return
+
+    with open_payload(path) as reader:
+        if encoding != "gzip":
+            yield from iter(lambda: reader.read(CHUNK_SIZE), b"")
+            return
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in iter(lambda: reader.read(CHUNK_SIZE), b""):
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def negotiate_encoding(path, accept_encoding) -> str:
+    """Content coding to serve a stored payload with, given the client's ``Accept-Encoding``."""
+    if not is_zstd(path):
+        return None
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        if params.replace(" ", "").lower() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    if "zstd" in accepted:
+        return "zstd"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
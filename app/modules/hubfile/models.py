@@ -15,6 +15,13 @@ class Hubfile(db.Model):
     size = db.Column(db.Integer, nullable=False)
     # New column to reference FileModel (replacing legacy feature_model_id)
     file_model_id = db.Column(db.Integer, db.ForeignKey("file_model.id"), nullable=False)
+    row_groups = db.relationship(
+        "HubfileRowGroup",
+        backref="file",
+        lazy=True,
+        cascade="all, delete-orphan",
+        order_by="HubfileRowGroup.group_index",
+    )
 
     def get_formatted_size(self):
         from app.modules.dataset.services import SizeService
@@ -77,3 +84,27 @@ class HubfileDownloadRecord(db.Model):
             f"date={self.download_date} "
             f"cookie={self.download_cookie}>"
         )
+
+
+class HubfileRowGroup(db.Model):
+    """Zone map of a block of consecutive rows of a tabular Hubfile.
+
+    ``zone_map`` holds one ``{"name", "type", "min", "max", "nulls"}`` entry per column; the byte range
+    points into the CSV whose checksum is ``checksum`` so stale groups are ignored after a re-upload.
+    """
+
+    __tablename__ = "file_row_group"
+    __table_args__ = (db.UniqueConstraint("file_id", "group_index", name="uq_file_row_group_index"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    file_id = db.Column(db.Integer, db.ForeignKey("file.id", ondelete="CASCADE"), nullable=False, index=True)
+    checksum = db.Column(db.String(120), nullable=False)
+    group_index = db.Column(db.Integer, nullable=False)
+    row_offset = db.Column(db.BigInteger, nullable=False)
+    row_count = db.Column(db.Integer, nullable=False)
+    byte_offset = db.Column(db.BigInteger, nullable=False)
+    byte_length = db.Column(db.BigInteger, nullable=False)
+    zone_map = db.Column(db.JSON, nullable=False)
+
+    def __repr__(self):
+        return f"<FileRowGroup file_id={self.file_id} group={self.group_index} rows={self.row_count}>"
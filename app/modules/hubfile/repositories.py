@@ -4,7 +4,7 @@ from app import db
 from app.modules.auth.models import User
 from app.modules.dataset.models import DataSet
 from app.modules.fileModel.models import FileModel
-from app.modules.hubfile.models import Hubfile, HubfileDownloadRecord, HubfileViewRecord
+from app.modules.hubfile.models import Hubfile, HubfileDownloadRecord, HubfileRowGroup, HubfileViewRecord
 from core.repositories.BaseRepository import BaseRepository
 
 
@@ -25,6 +25,14 @@ class HubfileRepository(BaseRepository):
     def get_dataset_by_hubfile(self, hubfile: Hubfile) -> DataSet:
         return db.session.query(DataSet).join(FileModel).join(Hubfile).filter(Hubfile.id == hubfile.id).first()
 
+    def existing_checksums(self, checksums, chunk_size: int = 500) -> set:
+        found = set()
+        for i in range(0, len(checksums), chunk_size):
+            chunk = checksums[i : i + chunk_size]
+            rows = db.session.query(Hubfile.checksum).filter(Hubfile.checksum.in_(chunk)).distinct()
+            found.update(checksum for (checksum,) in rows)
+        return found
+
 
 class HubfileViewRecordRepository(BaseRepository):
     def __init__(self):
@@ -42,3 +50,42 @@ class HubfileDownloadRecordRepository(BaseRepository):
     def total_hubfile_downloads(self) -> int:
         max_id = self.model.query.with_entities(func.max(self.model.id)).scalar()
         return max_id if max_id is not None else 0
+
+
+class HubfileRowGroupRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(HubfileRowGroup)
+
+    def get_by_file(self, file_id: int, checksum: str):
+        return (
+            self.model.query.filter_by(file_id=file_id, checksum=checksum)
+            .order_by(self.model.group_index)
+            .all()
+        )
+
+    def has_row_groups(self, file_id: int, checksum: str) -> bool:
+        return db.session.query(self.model.query.filter_by(file_id=file_id, checksum=checksum).exists()).scalar()
+
+    def replace_for_file(self, file_id: int, checksum: str, manifest: dict):
+        """Replaces the stored row groups of a file with the ones of a columnar cache manifest."""
+        columns = manifest["columns"]
+        self.model.query.filter_by(file_id=file_id).delete(synchronize_session=False)
+        db.session.add_all(
+            [
+                self.model(
+                    file_id=file_id,
+                    checksum=checksum,
+                    group_index=index,
+                    row_offset=group["row_offset"],
+                    row_count=group["row_count"],
+                    byte_offset=group["byte_offset"],
+                    byte_length=group["byte_length"],
+                    zone_map=[
+                        {"name": column["name"], "type": column["type"], **zone}
+                        for column, zone in zip(columns, group["columns"])
+                    ],
+                )
+                for index, group in enumerate(manifest["row_groups"])
+            ]
+        )
+        db.session.commit()
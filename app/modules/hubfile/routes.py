@@ -2,14 +2,14 @@ import os
 import uuid
 from datetime import datetime, timezone
 
-from flask import current_app, jsonify, make_response, request, send_from_directory
+from flask import Response, current_app, jsonify, make_response, request, send_from_directory
 from flask_login import current_user
 
 from app import db
-from app.modules.hubfile import hubfile_bp
+from app.modules.hubfile import compression, hubfile_bp
 from app.modules.hubfile.models import Hubfile
 from app.modules.hubfile.models import HubfileDownloadRecord, HubfileViewRecord
-from app.modules.hubfile.services import HubfileDownloadRecordService, HubfileService
+from app.modules.hubfile.services import HubfileDownloadRecordService, HubfileService, HubfileTabularService
 
 
 @hubfile_bp.route("/file/download/<int:file_id>", methods=["GET"])
@@ -40,8 +40,19 @@ def download_file(file_id):
             download_cookie=user_cookie,
         )
 
+    # Los ficheros comprimidos se sirven tal cual si el cliente acepta zstd, o recodificados a gzip
+    full_path = os.path.join(file_path, filename)
+    if os.path.isfile(full_path) and compression.is_zstd(full_path):
+        encoding = compression.negotiate_encoding(full_path, request.headers.get("Accept-Encoding"))
+        resp = Response(compression.iter_payload(full_path, encoding), mimetype="text/csv")
+        resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        resp.headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+    else:
+        resp = make_response(send_from_directory(directory=file_path, path=filename, as_attachment=True))
+
     # Save the cookie to the user's browser
-    resp = make_response(send_from_directory(directory=file_path, path=filename, as_attachment=True))
     resp.set_cookie("file_download_cookie", user_cookie)
 
     return resp
@@ -79,7 +90,7 @@ def view_file(file_id):
         return jsonify({"success": False, "error": "File not found"}), 404
 
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
+        with compression.open_payload_text(file_path) as f:
             content = f.read()
 
         user_cookie = request.cookies.get("view_cookie")
@@ -111,3 +122,51 @@ def view_file(file_id):
 
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
+
+
+def _limit_arg(default):
+    limit = request.args.get("limit", default, type=int)
+    return max(1, min(limit, 1000))
+
+
+@hubfile_bp.route("/file/preview/<int:file_id>", methods=["GET"])
+def preview_file(file_id):
+    file = HubfileService().get_or_404(file_id)
+    try:
+        data = HubfileTabularService().preview(
+            file,
+            limit=_limit_arg(HubfileTabularService.PREVIEW_ROWS),
+            offset=max(0, request.args.get("offset", 0, type=int)),
+        )
+    except FileNotFoundError:
+        return jsonify({"success": False, "error": "File not found"}), 404
+    return jsonify({"success": True, **data}), 200
+
+
+@hubfile_bp.route("/file/statistics/<int:file_id>", methods=["GET"])
+def file_statistics(file_id):
+    file = HubfileService().get_or_404(file_id)
+    try:
+        data = HubfileTabularService().statistics(file)
+    except FileNotFoundError:
+        return jsonify({"success": False, "error": "File not found"}), 404
+    return jsonify({"success": True, **data}), 200
+
+
+@hubfile_bp.route("/file/query/<int:file_id>", methods=["GET"])
+def query_file(file_id):
+    file = HubfileService().get_or_404(file_id)
+    column = request.args.get("column")
+    op = request.args.get("op", "eq")
+    value = request.args.get("value")
+    if not column or value is None:
+        return jsonify({"success": False, "error": "'column' and 'value' are required"}), 400
+    try:
+        data = HubfileTabularService().query(
+            file, column, op, value, limit=_limit_arg(HubfileTabularService.QUERY_LIMIT)
+        )
+    except FileNotFoundError:
+        return jsonify({"success": False, "error": "File not found"}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify({"success": True, **data}), 200
@@ -1,15 +1,52 @@
+import itertools
+import logging
 import os
+import re
 
 from app.modules.auth.models import User
 from app.modules.dataset.models import DataSet
+from app.modules.hubfile import blobstore, columnar
 from app.modules.hubfile.models import Hubfile
 from app.modules.hubfile.repositories import (
     HubfileDownloadRecordRepository,
     HubfileRepository,
+    HubfileRowGroupRepository,
     HubfileViewRecordRepository,
 )
+from core.configuration.configuration import uploads_folder_name
+from core.jobs import enqueue
 from core.services.BaseService import BaseService
 
+logger = logging.getLogger(__name__)
+
+SAFE_CHECKSUM_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def columnar_cache_dir(checksum: str):
+    """Directory of the columnar cache for a given Hubfile checksum (None if the checksum is unusable)."""
+    if not checksum or not SAFE_CHECKSUM_RE.match(checksum):
+        return None
+    working_dir = os.getenv("WORKING_DIR") or os.getcwd()
+    return os.path.join(working_dir, uploads_folder_name(), "columnar", checksum)
+
+
+def build_tabular_index(hubfile_id: int, csv_path: str, checksum: str):
+    """Builds the columnar cache of a CSV (unless it exists) and stores the file's row groups.
+
+    Safe to call from any thread with an application context (it runs as a background job).
+    """
+    cache_dir = columnar_cache_dir(checksum)
+    if cache_dir is None:
+        return None
+    if not columnar.cache_ready(cache_dir):
+        columnar.build_columnar_cache(csv_path, cache_dir, checksum=checksum)
+        logger.info("Built columnar cache for %s at %s", csv_path, cache_dir)
+    row_group_repository = HubfileRowGroupRepository()
+    if not row_group_repository.has_row_groups(hubfile_id, checksum):
+        with columnar.ColumnarTable(cache_dir) as table:
+            row_group_repository.replace_for_file(hubfile_id, checksum, table.manifest)
+    return cache_dir
+
 
 class HubfileService(BaseService):
     def __init__(self):
@@ -24,7 +61,14 @@ class HubfileService(BaseService):
         return self.repository.get_dataset_by_hubfile(hubfile)
 
     def get_path_by_hubfile(self, hubfile: Hubfile) -> str:
+        # El contenido se resuelve a través del almacén de blobs cuando ya está allí
+        blob_path = blobstore.blob_path(hubfile.checksum)
+        if blob_path and os.path.exists(blob_path):
+            return blob_path
+        return self.get_dataset_path_by_hubfile(hubfile)
 
+    def get_dataset_path_by_hubfile(self, hubfile: Hubfile) -> str:
+        """Path of the file in its dataset directory, whether or not it is in the blob store."""
         hubfile_user = self.get_owner_user_by_hubfile(hubfile)
         hubfile_dataset = self.get_dataset_by_hubfile(hubfile)
         working_dir = os.getenv("WORKING_DIR") or os.getcwd()
@@ -42,7 +86,209 @@ class HubfileService(BaseService):
         hubfile_download_record_repository = HubfileDownloadRecordRepository()
         return hubfile_download_record_repository.total_hubfile_downloads()
 
+    def collect_garbage(self) -> list:
+        """Removes blobs that no dataset directory links to and no Hubfile references."""
+        return blobstore.collect_garbage(self.repository.existing_checksums)
+
 
 class HubfileDownloadRecordService(BaseService):
     def __init__(self):
         super().__init__(HubfileDownloadRecordRepository())
+
+
+class HubfileTabularService:
+    """Preview, query and statistics over CSV Hubfiles.
+
+    Reads go to the columnar cache (see ``columnar.py``) when it exists and fall back to parsing the
+    CSV otherwise; a cache miss schedules the conversion so the next read is served from the cache.
+    Both paths use the row group zone maps to skip blocks of rows that cannot match a filter.
+    """
+
+    PREVIEW_ROWS = 20
+    QUERY_LIMIT = 100
+
+    def __init__(self):
+        self.hubfile_service = HubfileService()
+        self.row_group_repository = HubfileRowGroupRepository()
+
+    def get_csv_path(self, hubfile: Hubfile) -> str:
+        path = self.hubfile_service.get_path_by_hubfile(hubfile)
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        return path
+
+    def open_cached_table(self, hubfile: Hubfile):
+        cache_dir = columnar_cache_dir(hubfile.checksum)
+        if cache_dir is None or not columnar.cache_ready(cache_dir):
+            return None
+        try:
+            return columnar.ColumnarTable(cache_dir)
+        except (OSError, ValueError):
+            logger.exception("Unreadable columnar cache at %s, falling back to CSV", cache_dir)
+            return None
+
+    def get_row_groups(self, hubfile: Hubfile):
+        return self.row_group_repository.get_by_file(hubfile.id, hubfile.checksum)
+
+    def build_cache(self, hubfile: Hubfile):
+        return build_tabular_index(hubfile.id, self.get_csv_path(hubfile), hubfile.checksum)
+
+    def schedule_cache_build(self, hubfile: Hubfile) -> bool:
+        """Converts the Hubfile in the background. Returns False if nothing had to be scheduled."""
+        cache_dir = columnar_cache_dir(hubfile.checksum)
+        if cache_dir is None:
+            return False
+        if columnar.cache_ready(cache_dir) and self.row_group_repository.has_row_groups(hubfile.id, hubfile.checksum):
+            return False
+        try:
+            csv_path = self.get_csv_path(hubfile)
+        except FileNotFoundError:
+            logger.warning("Cannot build columnar cache, CSV for hubfile %s not found", hubfile.id)
+            return False
+        enqueue(build_tabular_index, hubfile.id, csv_path, hubfile.checksum, key=f"columnar:{hubfile.id}")
+        return True
+
+    def schedule_dataset_cache_build(self, dataset: DataSet):
+        for hubfile in dataset.files():
+            self.schedule_cache_build(hubfile)
+
+    def preview(self, hubfile: Hubfile, limit: int = PREVIEW_ROWS, offset: int = 0) -> dict:
+        table = self.open_cached_table(hubfile)
+        if table is not None:
+            with table:
+                indices = range(offset, min(offset + limit, table.n_rows))
+                rows = self._original_rows(hubfile, table, indices)
+                return {"source": "columnar", "columns": table.column_names, "rows": rows}
+
+        path = self.get_csv_path(hubfile)
+        self.schedule_cache_build(hubfile)
+        delimiter = columnar.sniff_delimiter(path)
+        header_rows = columnar.iter_csv_rows(path, delimiter)
+        header = next(header_rows, [])
+        header_rows.close()
+
+        # Saltamos directamente al grupo que contiene ``offset`` en lugar de recorrer el CSV
+        start_byte, skip = None, offset
+        for group in self.get_row_groups(hubfile):
+            if group.row_offset + group.row_count > offset:
+                start_byte, skip = group.byte_offset, offset - group.row_offset
+                break
+        if start_byte is None:
+            csv_rows = columnar.iter_csv_rows(path, delimiter)
+            next(csv_rows, None)
+        else:
+            csv_rows = (
+                columnar.normalize_row(row, len(header))
+                for _, row in columnar.iter_csv_records(path, delimiter, start=start_byte)
+            )
+        rows = [[cell or None for cell in row] for row in itertools.islice(csv_rows, skip, skip + limit)]
+        csv_rows.close()
+        return {"source": "csv", "columns": header, "rows": rows}
+
+    def statistics(self, hubfile: Hubfile) -> dict:
+        table = self.open_cached_table(hubfile)
+        if table is not None:
+            with table:
+                columns = [dict(name=c.name, **c.stats) for c in table.columns]
+                return {"source": "columnar", "n_rows": table.n_rows, "columns": columns}
+
+        path = self.get_csv_path(hubfile)
+        self.schedule_cache_build(hubfile)
+        return {"source": "csv", **columnar.scan_csv_statistics(path)}
+
+    def query(self, hubfile: Hubfile, column: str, op: str, value: str, limit: int = QUERY_LIMIT) -> dict:
+        """Rows where ``column <op> value`` holds, ``op`` being one of ``columnar.OPERATORS``."""
+        if op not in columnar.OPERATORS:
+            raise ValueError(f"Unsupported operator '{op}'")
+
+        table = self.open_cached_table(hubfile)
+        if table is not None:
+            with table:
+                if column not in table.column_names:
+                    raise ValueError(f"Unknown column '{column}'")
+                literal = _coerce_literal(value, table.column(column).type)
+                indices = list(itertools.islice(table.matching_rows(column, op, literal), limit + 1))
+                rows = self._original_rows(hubfile, table, indices)
+                return _query_result("columnar", table.column_names, rows, limit)
+
+        path = self.get_csv_path(hubfile)
+        self.schedule_cache_build(hubfile)
+        delimiter = columnar.sniff_delimiter(path)
+        header_rows = columnar.iter_csv_rows(path, delimiter)
+        header = next(header_rows, [])
+        header_rows.close()
+        if column not in header:
+            raise ValueError(f"Unknown column '{column}'")
+        index = header.index(column)
+
+        groups = self.get_row_groups(hubfile)
+        if groups:
+            column_type = groups[0].zone_map[index]["type"]
+            literal = _coerce_literal(value, column_type)
+            rows = self._query_csv_groups(path, delimiter, header, groups, index, column_type, op, literal, limit)
+        else:
+            rows = self._query_csv_scan(path, delimiter, index, op, value, limit)
+        return _query_result("csv", header, rows, limit)
+
+    def _original_rows(self, hubfile: Hubfile, table, indices) -> list:
+        """Cells of the rows at ``indices`` as written in the CSV, like the CSV fallback returns them."""
+        rows = columnar.iter_rows_at(
+            self.get_csv_path(hubfile), table.row_groups, indices, len(table.columns), table.manifest["delimiter"]
+        )
+        return [[cell or None for cell in row] for row in rows]
+
+    def _query_csv_groups(self, path, delimiter, header, groups, index, column_type, op, literal, limit):
+        """Reads only the byte ranges of the row groups whose zone map admits a match, in one pass."""
+        compare = columnar.OPERATORS[op]
+        ranges = [
+            (group.byte_offset, group.byte_offset + group.byte_length)
+            for group in sorted(groups, key=lambda g: g.byte_offset)
+            if columnar.zone_may_match(group.zone_map[index], op, literal)
+        ]
+        rows = []
+        records = columnar.iter_csv_ranges(path, ranges, delimiter)
+        for _, row in records:
+            row = columnar.normalize_row(row, len(header))
+            cell = columnar.parse_value(row[index], column_type)
+            if cell is not None and compare(cell, literal):
+                rows.append([c or None for c in row])
+                if len(rows) > limit:
+                    break
+        records.close()
+        return rows
+
+    def _query_csv_scan(self, path, delimiter, index, op, value, limit):
+        compare = columnar.OPERATORS[op]
+        csv_rows = columnar.iter_csv_rows(path, delimiter)
+        next(csv_rows, None)
+        rows = []
+        for row in csv_rows:
+            cell = row[index].strip()
+            if cell and _compare_text(compare, cell, value):
+                rows.append([c or None for c in row])
+                if len(rows) > limit:
+                    break
+        csv_rows.close()
+        return rows
+
+
+def _coerce_literal(value: str, column_type: str):
+    try:
+        if column_type == columnar.INT:
+            return int(value) if columnar.INT_RE.match(value.strip()) else float(value)
+        if column_type == columnar.FLOAT:
+            return float(value)
+    except ValueError:
+        raise ValueError(f"'{value}' is not a valid {column_type} value")
+    return value
+
+
+def _compare_text(compare, cell: str, literal: str) -> bool:
+    """Numeric comparison when both sides look numeric, plain string comparison otherwise."""
+    if columnar.FLOAT_RE.match(cell) and columnar.FLOAT_RE.match(literal.strip()):
+        return compare(float(cell), float(literal))
+    return compare(cell, literal)
+
+
+def _query_result(source, columns, rows, limit):
+    return {"source": source, "columns": columns, "rows": rows[:limit], "truncated": len(rows) > limit}
@@ -1,5 +1,19 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+
 import pytest
 
+from app import db
+from app.modules.auth.models import User
+from app.modules.dataset.models import DSMetaData, PublicationType, TabularDataset
+from app.modules.fileModel.models import FileModel
+from app.modules.hubfile import blobstore, columnar, compression
+from app.modules.hubfile.models import Hubfile
+from app.modules.hubfile.services import HubfileService, HubfileTabularService, columnar_cache_dir
+
 
 @pytest.fixture(scope="module")
 def test_client(test_client):
@@ -22,3 +36,283 @@ def test_sample_assertion(test_client):
     """
     greeting = "Hello, World!"
     assert greeting == "Hello, World!", "The greeting does not coincide with 'Hello, World!'"
+
+
+CSV_CONTENT = "name,age,score\nana,31,7.5\nluis,25,\npedro,40,9.25\nana,19,6\n"
+
+
+def create_csv_hubfile(working_dir, checksum="cafe01", content=CSV_CONTENT):
+    user = User(email=f"hubfile_{checksum}@example.com", password="1234")
+    db.session.add(user)
+    db.session.flush()
+
+    meta = DSMetaData(title="Tabular DS", description="desc", publication_type=PublicationType.NONE)
+    db.session.add(meta)
+    db.session.flush()
+
+    ds = TabularDataset(user_id=user.id, ds_meta_data_id=meta.id)
+    db.session.add(ds)
+    db.session.flush()
+
+    fm = FileModel(data_set_id=ds.id)
+    db.session.add(fm)
+    db.session.flush()
+
+    hubfile = Hubfile(name="people.csv", checksum=checksum, size=len(content), file_model_id=fm.id)
+    db.session.add(hubfile)
+    db.session.commit()
+
+    dataset_dir = os.path.join(working_dir, "uploads", f"user_{user.id}", f"dataset_{ds.id}")
+    os.makedirs(dataset_dir, exist_ok=True)
+    with open(os.path.join(dataset_dir, hubfile.name), "w", encoding="utf-8") as f:
+        f.write(content)
+    return hubfile
+
+
+def test_columnar_roundtrip(tmp_path):
+    csv_path = tmp_path / "data.csv"
+    csv_path.write_text(CSV_CONTENT, encoding="utf-8")
+
+    manifest = columnar.build_columnar_cache(str(csv_path), str(tmp_path / "cache"), checksum="abc")
+    assert manifest["n_rows"] == 4
+    assert [c["type"] for c in manifest["columns"]] == ["string", "int", "float"]
+
+    with columnar.ColumnarTable(str(tmp_path / "cache")) as table:
+        assert table.column_names == ["name", "age", "score"]
+        assert table.row(1) == ["luis", 25, None]
+        assert list(table.matching_rows("name", "eq", "ana")) == [0, 3]
+        assert list(table.matching_rows("age", "gt", 30)) == [0, 2]
+        assert table.column("score").stats["nulls"] == 1
+        assert table.column("age").stats["max"] == 40
+
+
+def test_tabular_service_falls_back_to_csv_and_builds_cache(clean_database, test_client, tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    scheduled = []
+    monkeypatch.setattr(
+        "app.modules.hubfile.services.enqueue", lambda fn, *args, **kwargs: scheduled.append((fn, args))
+    )
+
+    with test_client.application.app_context():
+        hubfile = create_csv_hubfile(str(tmp_path))
+        service = HubfileTabularService()
+
+        preview = service.preview(hubfile, limit=2)
+        assert preview["source"] == "csv"
+        assert preview["rows"] == [["ana", "31", "7.5"], ["luis", "25", None]]
+        assert len(scheduled) == 1
+
+        # Ejecutamos la construcción programada como lo haría el worker de trabajos
+        fn, args = scheduled[0]
+        fn(*args)
+
+        stats = service.statistics(hubfile)
+        assert stats["source"] == "columnar"
+        assert stats["n_rows"] == 4
+        assert stats["columns"][1]["mean"] == 28.75
+
+        result = service.query(hubfile, "age", "ge", "31", limit=1)
+        assert result["source"] == "columnar"
+        assert result["rows"] == [["ana", "31", "7.5"]]
+        assert result["truncated"] is True
+        assert len(scheduled) == 1
+
+
+def test_query_file_endpoint_rejects_unknown_column(clean_database, test_client, tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    monkeypatch.setattr("app.modules.hubfile.services.enqueue", lambda fn, *args, **kwargs: None)
+
+    with test_client.application.app_context():
+        hubfile = create_csv_hubfile(str(tmp_path), checksum="cafe02")
+        file_id = hubfile.id
+
+    response = test_client.get(f"/file/query/{file_id}?column=height&op=gt&value=1")
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+    response = test_client.get(f"/file/query/{file_id}?column=name&op=eq&value=pedro")
+    assert response.status_code == 200
+    assert response.get_json()["rows"] == [["pedro", "40", "9.25"]]
+
+
+def test_zone_maps_store_non_finite_bounds_as_unbounded(tmp_path):
+    csv_path = tmp_path / "huge.csv"
+    csv_path.write_text("name,value\na,1.5\nb,1e999\nc,2.5\nd,3.5\n", encoding="utf-8")
+
+    manifest = columnar.build_columnar_cache(str(csv_path), str(tmp_path / "cache"), row_group_size=2)
+    groups = manifest["row_groups"]
+    assert groups[0]["columns"][1] == {"min": None, "max": None, "nulls": 0, "unbounded": True}
+    assert groups[1]["columns"][1] == {"min": 2.5, "max": 3.5, "nulls": 0}
+    # El grupo sin límites nunca se descarta y el zone map es JSON estándar
+    assert columnar.zone_may_match(groups[0]["columns"][1], "gt", 100)
+    json.dumps([g["columns"] for g in groups], allow_nan=False)
+    with columnar.ColumnarTable(str(tmp_path / "cache")) as table:
+        assert list(table.matching_rows("value", "gt", 3)) == [1, 3]
+
+
+def test_row_groups_record_zone_maps_and_byte_ranges(tmp_path):
+    content = 'name,price\nbolt,5\n"nut\nsmall",7\nwasher,150\ngear,300\nshaft,\n'
+    csv_path = tmp_path / "parts.csv"
+    csv_path.write_text(content, encoding="utf-8")
+
+    manifest = columnar.build_columnar_cache(str(csv_path), str(tmp_path / "cache"), row_group_size=2)
+    groups = manifest["row_groups"]
+    assert [(g["row_offset"], g["row_count"]) for g in groups] == [(0, 2), (2, 2), (4, 1)]
+    assert groups[0]["columns"][1] == {"min": 5, "max": 7, "nulls": 0}
+    assert groups[2]["columns"][1] == {"min": None, "max": None, "nulls": 1}
+
+    second = groups[1]
+    records = columnar.iter_csv_records(
+        str(csv_path), ",", start=second["byte_offset"], end=second["byte_offset"] + second["byte_length"]
+    )
+    assert [row for _, row in records] == [["washer", "150"], ["gear", "300"]]
+
+    assert not columnar.zone_may_match(groups[0]["columns"][1], "gt", 100)
+    assert columnar.zone_may_match(groups[1]["columns"][1], "gt", 100)
+    with columnar.ColumnarTable(str(tmp_path / "cache")) as table:
+        assert list(table.matching_rows("price", "gt", 100)) == [2, 3]
+
+
+def test_csv_fallback_uses_stored_row_groups(clean_database, test_client, tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    monkeypatch.setattr(columnar, "ROW_GROUP_SIZE", 2)
+    monkeypatch.setattr("app.modules.hubfile.services.enqueue", lambda fn, *args, **kwargs: None)
+
+    with test_client.application.app_context():
+        hubfile = create_csv_hubfile(str(tmp_path), checksum="cafe03")
+        service = HubfileTabularService()
+        service.build_cache(hubfile)
+
+        groups = service.get_row_groups(hubfile)
+        assert [g.row_count for g in groups] == [2, 2]
+        assert groups[1].zone_map[1] == {"name": "age", "type": "int", "min": 19, "max": 40, "nulls": 0}
+
+        # Sin caché columnar la consulta lee solo los grupos cuyo zone map admite coincidencias
+        shutil.rmtree(columnar_cache_dir(hubfile.checksum))
+        read_ranges = []
+        iter_ranges = columnar.iter_csv_ranges
+
+        def tracking_iter_ranges(path, ranges, delimiter=None):
+            read_ranges.extend(ranges)
+            return iter_ranges(path, ranges, delimiter)
+
+        monkeypatch.setattr(columnar, "iter_csv_ranges", tracking_iter_ranges)
+        result = service.query(hubfile, "age", "gt", "35")
+        assert result["source"] == "csv"
+        assert result["rows"] == [["pedro", "40", "9.25"]]
+        assert read_ranges == [(groups[1].byte_offset, groups[1].byte_offset + groups[1].byte_length)]
+
+        preview = service.preview(hubfile, limit=2, offset=3)
+        assert preview["rows"] == [["ana", "19", "6"]]
+
+
+def test_preview_and_query_keep_the_original_cell_text(clean_database, test_client, tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    monkeypatch.setattr(columnar, "ROW_GROUP_SIZE", 2)
+    monkeypatch.setattr("app.modules.hubfile.services.enqueue", lambda fn, *args, **kwargs: None)
+    content = "code,price\n007, 1.50\n010,2\n\"a,b\",3.0\n042,\n"
+
+    with test_client.application.app_context():
+        hubfile = create_csv_hubfile(str(tmp_path), checksum="cafe04", content=content)
+        service = HubfileTabularService()
+        from_csv = service.preview(hubfile, limit=3), service.query(hubfile, "price", "ge", "2")
+        service.build_cache(hubfile)
+        from_cache = service.preview(hubfile, limit=3), service.query(hubfile, "price", "ge", "2")
+
+    assert [r["source"] for r in from_cache] == ["columnar", "columnar"]
+    assert from_csv[0]["rows"] == from_cache[0]["rows"] == [["007", " 1.50"], ["010", "2"], ["a,b", "3.0"]]
+    assert from_csv[1]["rows"] == from_cache[1]["rows"] == [["010", "2"], ["a,b", "3.0"]]
+
+
+def test_blobstore_deduplicates_identical_uploads(tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    first = tmp_path / "a.csv"
+    second = tmp_path / "b.csv"
+    first.write_text("x,y\n1,2\n", encoding="utf-8")
+    second.write_text("x,y\n1,2\n", encoding="utf-8")
+
+    checksum = blobstore.ingest(str(first))
+    assert blobstore.ingest(str(second)) == checksum
+    assert os.path.samefile(first, second)
+    assert os.path.samefile(first, blobstore.blob_path(checksum))
+
+    copy = tmp_path / "dataset_2" / "a.csv"
+    assert blobstore.link_to(checksum, str(copy))
+    assert os.stat(blobstore.blob_path(checksum)).st_nlink == 4
+
+
+def test_blobstore_garbage_collection_keeps_referenced_blobs(clean_database, test_client, tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    monkeypatch.setattr("app.modules.hubfile.services.enqueue", lambda fn, *args, **kwargs: None)
+
+    with test_client.application.app_context():
+        hubfile = create_csv_hubfile(str(tmp_path), checksum="cafe04")
+        csv_path = HubfileService().get_path_by_hubfile(hubfile)
+        hubfile.checksum = blobstore.ingest(csv_path)
+        db.session.commit()
+
+        orphan = tmp_path / "orphan.csv"
+        orphan.write_text("only,once\n", encoding="utf-8")
+        orphan_checksum = blobstore.ingest(str(orphan))
+
+        # Nadie enlaza ya a ninguno de los dos blobs, pero el primero sigue referenciado por un Hubfile
+        os.remove(csv_path)
+        os.remove(orphan)
+        assert HubfileService().collect_garbage() == [orphan_checksum]
+        assert blobstore.has_blob(hubfile.checksum)
+        assert HubfileService().get_path_by_hubfile(hubfile) == blobstore.blob_path(hubfile.checksum)
+
+
+def test_compressed_blobs_keep_plain_checksum_and_readers(tmp_path, monkeypatch):
+    monkeypatch.setenv("WORKING_DIR", str(tmp_path))
+    monkeypatch.setenv("UPLOADS_COMPRESSION", "zstd")
+    content = "name,price\n" + "".join(f"item{i},{i}\n" for i in range(500))
+    csv_path = tmp_path / "items.csv"
+    csv_path.write_text(content, encoding="utf-8")
+    plain_checksum = hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    assert blobstore.ingest(str(csv_path)) == plain_checksum
+    assert compression.is_zstd(str(csv_path))
+    assert os.path.samefile(csv_path, blobstore.blob_path(plain_checksum))
+    assert blobstore.hash_file(str(csv_path)) == (plain_checksum, len(content))
+    assert compression.payload_size(str(csv_path)) == len(content)
+
+    manifest = columnar.build_columnar_cache(str(csv_path), str(tmp_path / "cache"), row_group_size=100)
+    last = manifest["row_groups"][-1]
+    records = columnar.iter_csv_records(str(csv_path), ",", start=last["byte_offset"])
+    assert [row for _, row in records][-1] == ["item499", "499"]
+
+    assert b"".join(compression.iter_payload(str(csv_path))) == content.encode("utf-8")
+    gzipped = b"".join(compression.iter_payload(str(csv_path), "gzip"))
+    assert gzip.decompress(gzipped) == content.encode("utf-8")
+    assert compression.negotiate_encoding(str(csv_path), "gzip, zstd;q=0") == "gzip"
+    assert compression.negotiate_encoding(str(csv_path), "zstd") == "zstd"
+    assert compression.negotiate_encoding(str(csv_path), "identity") is None
+
+
+def test_compressed_payloads_seek_by_frame_and_ranges_are_read_in_one_pass(tmp_path, monkeypatch):
+    monkeypatch.setattr(compression, "FRAME_SIZE", 256)
+    content = "name,price\n" + "".join(f"item{i},{i}\n" for i in range(500))
+    plain = tmp_path / "items.csv"
+    plain.write_text(content, encoding="utf-8")
+    packed = tmp_path / "items.csv.zst"
+    compression.compress_file(str(plain), str(packed))
+
+    assert compression.is_seekable(str(packed))
+    assert compression.payload_size(str(packed)) == len(content)
+    for offset in (0, 255, 256, 3000, len(content)):
+        with compression.open_payload(str(packed), offset=offset) as f:
+            assert f.read().decode("utf-8") == content[offset:]
+
+    manifest = columnar.build_columnar_cache(str(plain), str(tmp_path / "cache"), row_group_size=100)
+    groups = manifest["row_groups"]
+    ranges = [(g["byte_offset"], g["byte_offset"] + g["byte_length"]) for g in (groups[1], groups[3])]
+    opened = []
+    real_open = compression.open_payload
+    monkeypatch.setattr(compression, "open_payload", lambda *a, **kw: opened.append(a) or real_open(*a, **kw))
+
+    rows = [row for _, row in columnar.iter_csv_ranges(str(packed), ranges, ",")]
+    assert [rows[0], rows[99], rows[100], rows[-1]] == [
+        ["item100", "100"], ["item199", "199"], ["item300", "300"], ["item399", "399"]
+    ]
+    assert len(rows) == 200 and len(opened) == 1
@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SubmitField
+from wtforms import SelectField, StringField, SubmitField
 from wtforms.validators import DataRequired, Length, Optional, Regexp
 
 
@@ -15,4 +15,13 @@ class UserProfileForm(FlaskForm):
         ],
     )
     affiliation = StringField("Affiliation", validators=[Optional(), Length(min=5, max=100)])
+    notification_frequency = SelectField(
+        "Dataset notifications",
+        choices=[
+            ("immediate", "One email per new dataset"),
+            ("hourly", "Hourly digest"),
+            ("daily", "Daily digest"),
+        ],
+        default="immediate",
+    )
     submit = SubmitField("Save profile")
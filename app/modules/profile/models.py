@@ -2,6 +2,12 @@ from app import db
 
 
 class UserProfile(db.Model):
+    # Cuándo recibe el usuario los avisos de nuevos datasets de lo que sigue
+    NOTIFY_IMMEDIATE = "immediate"
+    NOTIFY_HOURLY = "hourly"
+    NOTIFY_DAILY = "daily"
+    NOTIFICATION_FREQUENCIES = (NOTIFY_IMMEDIATE, NOTIFY_HOURLY, NOTIFY_DAILY)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), unique=True, nullable=False)
 
@@ -9,6 +15,9 @@ class UserProfile(db.Model):
     affiliation = db.Column(db.String(100))
     name = db.Column(db.String(100), nullable=False)
     surname = db.Column(db.String(100), nullable=False)
+    notification_frequency = db.Column(
+        db.String(10), nullable=False, default=NOTIFY_IMMEDIATE, server_default=NOTIFY_IMMEDIATE
+    )
 
     def save(self):
         if not self.id:
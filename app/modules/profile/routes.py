@@ -13,11 +13,11 @@ from app.modules.profile.services import UserProfileService
 @login_required
 def edit_profile():
     auth_service = AuthenticationService()
-    profile = auth_service.get_authenticated_user_profile
+    profile = auth_service.get_authenticated_user_profile()
     if not profile:
         return redirect(url_for("public.index"))
 
-    form = UserProfileForm()
+    form = UserProfileForm(notification_frequency=profile.notification_frequency)
     if request.method == "POST":
         service = UserProfileService()
         result, errors = service.update_profile(profile.id, form)
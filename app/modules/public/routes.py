@@ -1,15 +1,19 @@
 import logging
 
-from flask import redirect, render_template, url_for
+from flask import render_template, request
 from flask_login import current_user
 
 from app.modules.community.services import CommunityService
 from app.modules.dataset.services import AuthorService, DataSetService
 from app.modules.fileModel.services import FileModelService
+from app.modules.followAuthor.services import FollowauthorService
+from app.modules.followCommunity.services import FollowcommunityService
 from app.modules.public import public_bp
 
 logger = logging.getLogger(__name__)
 
+AUTHORS_PER_PAGE = 20
+
 
 @public_bp.route("/")
 def index():
@@ -42,19 +46,27 @@ def index():
 def authors_and_communities():
     """Render a page listing authors and communities."""
     logger.info("Access authors and communities view")
-    
-    # Load authors
-    author_service = AuthorService()
-    author_model = author_service.repository.model
-    authors_q = author_model.query.all()
-    authors = [a.to_dict() for a in authors_q]
-    for idx, a in enumerate(authors):
-        if current_user.is_authenticated:
-            a['is_following'] = authors_q[idx].followers.filter_by(follower_id=current_user.id).first() is not None
-        a['id'] = authors_q[idx].id
+
+    # Una página de autores y el estado de seguimiento de todos ellos en una sola consulta
+    page = request.args.get("page", 1, type=int)
+    pagination = AuthorService().paginate(page, AUTHORS_PER_PAGE)
+    followed_authors = FollowauthorService().followed_author_ids(current_user, [a.id for a in pagination.items])
+    authors = []
+    for author in pagination.items:
+        a = author.to_dict()
+        a["id"] = author.id
+        a["followers_count"] = author.followers_count
+        a["is_following"] = author.id in followed_authors
+        authors.append(a)
 
     # Load communities
-    community_service = CommunityService()
-    communities = community_service.list_all()
+    communities = CommunityService().list_all()
+    followed_communities = FollowcommunityService().followed_community_ids(current_user, [c.id for c in communities])
 
-    return render_template('public/authors_communities.html', authors=authors, communities=communities)
+    return render_template(
+        "public/authors_communities.html",
+        authors=authors,
+        pagination=pagination,
+        communities=communities,
+        followed_communities=followed_communities,
+    )
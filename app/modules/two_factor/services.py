@@ -1,4 +1,4 @@
-from locust import User
+from app.modules.auth.models import User
 from app.modules.two_factor.repositories import TwoFactorRepository
 from core.services.BaseService import BaseService
 from app.modules.auth.services import AuthenticationService
@@ -1,16 +1,16 @@
 import logging
-import os
-import smtplib
-from email.message import EmailMessage
-from typing import Iterable
 
-from sqlalchemy import or_
-from sqlalchemy.orm import joinedload
+from datetime import datetime
+from itertools import groupby
+
+from sqlalchemy import func, insert, literal, select, union
 
 from app import db
 from app.modules.auth.models import User as AuthUser
-from app.modules.dataset.models import Author as DSAuthor
-from app.modules.dataset.models import DSMetaData as DSMetaData
+from app.modules.dataset.models import BaseDataset, DSMetaData
+from app.modules.profile.models import UserProfile
+from core.mail import mail_configured, queue_email_batches, queue_messages
+from core.mail.models import PendingNotification
 
 try:
     from app.modules.followAuthor.models import Followauthor
@@ -30,38 +30,112 @@ except Exception:
 
 logger = logging.getLogger(__name__)
 
+# Destinatarios por email de la bandeja de salida (y filas por lectura del cursor)
+RECIPIENT_CHUNK_SIZE = 1000
+
+
+# Preferencia de cada seguidor (sin perfil se avisa al momento)
+_frequency = func.coalesce(UserProfile.notification_frequency, UserProfile.NOTIFY_IMMEDIATE)
 
-def _send_email(subject: str, body: str, recipients: Iterable[str]):
-    """Send an email using Gmail SMTP. Requires env vars GMAIL_USER and GMAIL_APP_PASSWORD.
 
-    recipients: iterable of email addresses (strings)
+def _followers(columns, author_id=None, community_id=None, exclude_author_id=None, where=()):
+    """Selects ``columns`` for the distinct followers of an author and/or a community.
+
+    Someone who follows both appears once; ``exclude_author_id`` leaves out the followers of that
+    author. Returns None when neither an author nor a community is given.
     """
-    gmail_user = os.getenv("GMAIL_USER")
-    gmail_app_password = os.getenv("GMAIL_APP_PASSWORD")
+    queries = []
+    if author_id:
+        queries.append(
+            select(*columns)
+            .join(Followauthor, Followauthor.follower_id == AuthUser.id)
+            .where(Followauthor.author_id == author_id)
+        )
+    if community_id:
+        queries.append(
+            select(*columns)
+            .join(Followcommunity, Followcommunity.follower_id == AuthUser.id)
+            .where(Followcommunity.community_id == community_id)
+        )
+    if not queries:
+        return None
+    queries = [q.outerjoin(UserProfile, UserProfile.user_id == AuthUser.id).where(*where) for q in queries]
+    if exclude_author_id:
+        excluded = select(Followauthor.follower_id).where(Followauthor.author_id == exclude_author_id)
+        queries = [q.where(AuthUser.id.notin_(excluded)) for q in queries]
+    return union(*queries) if len(queries) > 1 else queries[0].distinct()
+
+
+def follower_email_batches(author_id=None, community_id=None, exclude_author_id=None, chunk_size=None):
+    """Yields the emails of the followers to notify right away, in lists of ``chunk_size``.
 
-    if not gmail_user or not gmail_app_password:
-        logger.warning("Gmail credentials not configured, skipping email send")
+    A single joined query whose rows are streamed from the cursor, so the cost depends on the
+    number of batches and not on the number of followers. Followers who chose a digest are left
+    out (see ``defer_to_digests``).
+    """
+    stmt = _followers(
+        [AuthUser.email],
+        author_id,
+        community_id,
+        exclude_author_id,
+        where=[AuthUser.email.isnot(None), _frequency == UserProfile.NOTIFY_IMMEDIATE],
+    )
+    if stmt is None:
         return
 
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = gmail_user
-    msg["To"] = ", ".join(recipients)
-    msg.set_content(body)
+    chunk_size = chunk_size or RECIPIENT_CHUNK_SIZE
+    result = db.session.execute(stmt.execution_options(yield_per=chunk_size))
+    for partition in result.scalars().partitions(chunk_size):
+        yield list(partition)
+
+
+def defer_to_digests(dataset_id, author_id=None, community_id=None, exclude_author_id=None) -> int:
+    """Stores the dataset for the next digest of every follower who chose one (a single INSERT ... SELECT)."""
+    followers = _followers(
+        [AuthUser.id.label("user_id"), _frequency.label("frequency")],
+        author_id,
+        community_id,
+        exclude_author_id,
+        where=[_frequency != UserProfile.NOTIFY_IMMEDIATE],
+    )
+    if followers is None:
+        return 0
+    followers = followers.subquery()
+    stmt = insert(PendingNotification).from_select(
+        ["user_id", "frequency", "dataset_id", "community_id", "created_at"],
+        select(
+            followers.c.user_id,
+            followers.c.frequency,
+            literal(dataset_id, type_=db.Integer),
+            literal(community_id, type_=db.Integer),
+            literal(datetime.utcnow(), type_=db.DateTime),
+        ),
+    )
+    count = db.session.execute(stmt).rowcount
+    db.session.commit()
+    return count
 
+
+def _dataset_link(dataset):
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-            smtp.login(gmail_user, gmail_app_password)
-            smtp.send_message(msg)
-        logger.info("Sent notification email to %s", recipients)
-    except Exception as exc:
-        logger.exception("Failed to send notification email: %s", exc)
+        return dataset.get_uvlhub_doi()
+    except Exception:
+        return None
+
+
+def _body(first_line, dataset):
+    body_lines = [first_line]
+    link = _dataset_link(dataset)
+    if link:
+        body_lines.append(f"Ver: {link}")
+    body_lines.append("")
+    body_lines.append("Puedes desactivar estas notificaciones desde tu cuenta en la plataforma.")
+    return "\n".join(body_lines)
 
 
 def notify_followers_of_author(user_id, dataset):
-    """Notify followers of a single author (by id) about a dataset.
+    """Notify followers of the author linked to ``user_id`` about a dataset.
 
-    author_id: integer id of the author whose followers should be notified
     dataset: DataSet instance used to build the email body
     """
     from app.modules.dataset.services import DataSetService
@@ -70,68 +144,130 @@ def notify_followers_of_author(user_id, dataset):
     if not author_id:
         logger.debug("No author_id provided to notify_followers_of_author for dataset %s", getattr(dataset, "id", "?"))
         return
+    if not mail_configured():
+        return
 
+    title = getattr(dataset.ds_meta_data, "title", "sin título")
+    subject = f"Nuevo dataset publicado: {title}"
+    body = _body(f"Se ha publicado un nuevo dataset: {title}.", dataset)
     try:
-        follows = Followauthor.query.filter_by(author_id=author_id).all()
+        defer_to_digests(dataset.id, author_id=author_id)
+        emails = queue_email_batches(subject, body, follower_email_batches(author_id=author_id))
     except Exception:
-        logger.exception("Error querying Followauthor for author_id=%s dataset=%s", author_id, getattr(dataset, "id", "?"))
+        logger.exception("Error notifying followers of author %s about dataset %s", author_id, dataset.id)
         return
+    logger.info("Queued %d notification emails for author %s dataset %s", len(emails), author_id, dataset.id)
+
+
+def notify_followers_of_community(community, dataset):
+    """Notify users who follow the given community about a dataset added/approved in it.
+
+    Followers of the dataset's author were already notified when it was published and are skipped.
+    """
+    from app.modules.dataset.services import DataSetService
 
-    recipients = set()
-    for f in follows:
-        try:
-            follower = getattr(f, "follower", None)
-            if follower is None:
-                follower = db.session.query(AuthUser).get(f.follower_id)
-            if follower and getattr(follower, "email", None):
-                recipients.add(follower.email)
-        except Exception:
-            logger.exception("Error retrieving follower for Followauthor id=%s", getattr(f, "id", "?"))
-
-    logger.info("Notification recipients for author %s dataset %s (count=%s): %s", author_id, getattr(dataset, "id", "?"), len(recipients), list(recipients))
-    if not recipients:
-        logger.debug("No followers found for author %s (dataset %s)", author_id, getattr(dataset, "id", "?"))
+    if not community or not mail_configured():
         return
 
-    subject = f"Nuevo dataset publicado: {getattr(dataset.ds_meta_data, 'title', 'sin título')}"
+    name = getattr(community, "name", "sin nombre")
+    title = getattr(dataset.ds_meta_data, "title", "sin título")
+    subject = f"Nuevo dataset en la comunidad: {name}"
+    body = _body(f"Se ha añadido un nuevo dataset a la comunidad {name}: {title}.", dataset)
+    author_id = DataSetService().get_author_id_by_user_id(dataset.user_id)
     try:
-        link = dataset.get_uvlhub_doi()
+        defer_to_digests(dataset.id, community_id=community.id, exclude_author_id=author_id)
+        batches = follower_email_batches(community_id=community.id, exclude_author_id=author_id)
+        emails = queue_email_batches(subject, body, batches)
     except Exception:
-        link = None
-    body_lines = [f"Se ha publicado un nuevo dataset: {getattr(dataset.ds_meta_data, 'title', 'sin título')}."]
-    if link:
-        body_lines.append(f"Ver: {link}")
-    body_lines.append("")
-    body_lines.append("Puedes desactivar estas notificaciones desde tu cuenta en la plataforma.")
+        logger.exception("Error notifying followers of community %s about dataset %s", community.id, dataset.id)
+        return
+    if not emails:
+        logger.debug("No followers to notify for community %s", getattr(community, "id", "?"))
 
-    _send_email(subject, "\n".join(body_lines), recipients)
 
+def notify_followers_of_community_datasets(community_id, dataset_ids):
+    """Background task: one email to the community followers listing every dataset approved at once.
 
-def notify_followers_of_community(community, dataset):
-    """Notify users who follow the given community about a dataset added/approved in it."""
-    if not community:
-        return
+    A single dataset goes through ``notify_followers_of_community``. With several, the followers of
+    the authors are not skipped (the datasets may come from different authors); digest users still
+    get each dataset in their next digest.
+    """
+    from app.modules.community.models import Community
+    from app.modules.dataset.services import DataSetService
 
-    follows = Followcommunity.query.filter_by(community_id=community.id).all()
-    recipients = set()
-    for f in follows:
-        if getattr(f, "follower", None) and getattr(f.follower, "email", None):
-            recipients.add(f.follower.email)
+    community = db.session.get(Community, community_id)
+    if community is None or not dataset_ids or not mail_configured():
+        return None
+    datasets = (
+        BaseDataset.query.filter(BaseDataset.id.in_(dataset_ids))
+        .join(DSMetaData, DSMetaData.id == BaseDataset.ds_meta_data_id)
+        .order_by(BaseDataset.id)
+        .all()
+    )
+    if len(datasets) == 1:
+        notify_followers_of_community(community, datasets[0])
+        return {"community_id": community_id, "datasets": 1}
 
-    if not recipients:
-        logger.debug("No followers for community %s", getattr(community, "id", "?"))
-        return
+    dataset_service = DataSetService()
+    for dataset in datasets:
+        author_id = dataset_service.get_author_id_by_user_id(dataset.user_id)
+        defer_to_digests(dataset.id, community_id=community_id, exclude_author_id=author_id)
 
-    subject = f"Nuevo dataset en la comunidad: {getattr(community, 'name', 'sin nombre')}"
-    try:
-        link = dataset.get_uvlhub_doi()
-    except Exception:
-        link = None
+    name = getattr(community, "name", "sin nombre")
+    lines = [f"Se han añadido {len(datasets)} datasets a la comunidad {name}:", ""]
+    for dataset in datasets:
+        doi = dataset.ds_meta_data.dataset_doi
+        lines.append(f"- {dataset.ds_meta_data.title or 'sin título'}" + (f" (https://doi.org/{doi})" if doi else ""))
+    lines.append("")
+    lines.append("Puedes desactivar estas notificaciones desde tu cuenta en la plataforma.")
+    subject = f"{len(datasets)} nuevos datasets en la comunidad: {name}"
+    emails = queue_email_batches(subject, "\n".join(lines), follower_email_batches(community_id=community_id))
+    logger.info("Queued %d emails for %d datasets approved in community %s", len(emails), len(datasets), community_id)
+    return {"community_id": community_id, "datasets": len(datasets), "emails": len(emails)}
 
-    body_lines = [f"Se ha añadido un nuevo dataset a la comunidad {getattr(community, 'name', 'sin nombre')}: {getattr(dataset.ds_meta_data, 'title', 'sin título')}."]
-    if link:
-        body_lines.append(f"Ver: {link}")
-    body_lines.append("")
-    body_lines.append("Puedes desactivar estas notificaciones desde tu cuenta en la plataforma.")
 
-    _send_email(subject, "\n".join(body_lines), recipients)
+def _digest_body(datasets):
+    lines = ["Nuevos datasets de los autores y comunidades que sigues:", ""]
+    for title, doi in datasets:
+        lines.append(f"- {title or 'sin título'}" + (f" (https://doi.org/{doi})" if doi else ""))
+    lines.append("")
+    lines.append("Puedes cambiar la frecuencia de estos resúmenes desde tu perfil en la plataforma.")
+    return "\n".join(lines)
+
+
+def send_digests(frequency: str) -> list:
+    """Queues one email per user with every dataset deferred to their ``frequency`` digest.
+
+    The datasets of the window come from one query grouped by user and dataset (a dataset reached
+    through an author and a community is listed once); the notifications included are deleted.
+    """
+    if not mail_configured():
+        return []
+    cutoff = (
+        db.session.query(func.max(PendingNotification.id)).filter(PendingNotification.frequency == frequency).scalar()
+    )
+    if cutoff is None:
+        return []
+
+    rows = db.session.execute(
+        select(PendingNotification.user_id, AuthUser.email, DSMetaData.title, DSMetaData.dataset_doi)
+        .join(AuthUser, AuthUser.id == PendingNotification.user_id)
+        .join(BaseDataset, BaseDataset.id == PendingNotification.dataset_id)
+        .join(DSMetaData, DSMetaData.id == BaseDataset.ds_meta_data_id)
+        .where(PendingNotification.frequency == frequency, PendingNotification.id <= cutoff)
+        .group_by(PendingNotification.user_id, AuthUser.email, BaseDataset.id, DSMetaData.title, DSMetaData.dataset_doi)
+        .order_by(PendingNotification.user_id, func.min(PendingNotification.id))
+    )
+    messages = []
+    for (_, email), datasets in groupby(rows, key=lambda row: (row.user_id, row.email)):
+        datasets = [(row.title, row.dataset_doi) for row in datasets]
+        subject = f"Resumen: {len(datasets)} nuevo(s) dataset(s)"
+        messages.append((subject, _digest_body(datasets), [email]))
+
+    emails = queue_messages(messages)
+    db.session.query(PendingNotification).filter(
+        PendingNotification.frequency == frequency, PendingNotification.id <= cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    logger.info("Queued %d %s digests", len(emails), frequency)
+    return emails
@@ -0,0 +1,2 @@
+# Los tests de core usan las mismas fixtures que los de los módulos
+from app.modules.conftest import clean_database, test_app, test_client  # noqa: F401
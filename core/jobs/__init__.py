@@ -0,0 +1,64 @@
+"""Background jobs.
+
+Request handlers call ``enqueue(fn, *args)`` and return immediately; the configured backend
+(``JOBS_BACKEND``: ``thread``, ``rq`` or ``sync``) runs ``fn`` later inside an application context.
+Every job has a row in the ``job`` table with its status, attempts and result, failed attempts are
+retried with exponential backoff, and ``GET /jobs/<id>`` reports the status. An active job with no
+activity for ``JOBS_STALE_AFTER`` seconds is considered lost and no longer blocks its key; running
+jobs record a heartbeat every ``JOBS_HEARTBEAT_INTERVAL`` seconds, so only lost ones go quiet.
+
+Arguments must be JSON-serialisable plain values (ids, paths, checksums), never ORM instances.
+"""
+
+import logging
+import uuid
+from datetime import datetime
+
+from flask import current_app
+
+from app import db
+from core.jobs.models import Job
+from core.jobs.runner import task_path
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(fn, *args, key: str = None, max_attempts: int = None, user_id: int = None, **kwargs) -> Job:
+    """Queues ``fn(*args, **kwargs)``. With ``key`` an active job with the same key is reused.
+
+    A stale job (see ``Job.is_stale``) is marked as failed and replaced by a new one.
+    """
+    if key is not None:
+        stale_after = current_app.config.get("JOBS_STALE_AFTER", 3600)
+        # populate_existing: el latido lo escribe otra conexión, no vale la copia de esta sesión
+        active = Job.query.filter(Job.key == key, Job.status.in_(Job.ACTIVE)).populate_existing().all()
+        for job in active:
+            if job.is_stale(stale_after):
+                logger.warning("Job %s (%s) made no progress for %ss, enqueuing it again", job.id, key, stale_after)
+                job.status = Job.FAILED
+                job.error = f"Lost: no activity for {stale_after:g}s"
+                job.finished_at = datetime.utcnow()
+        alive = [job for job in active if job.status in Job.ACTIVE]
+        if alive:
+            db.session.commit()
+            return alive[0]
+
+    job = Job(
+        id=uuid.uuid4().hex,
+        task=task_path(fn),
+        payload={"args": list(args), "kwargs": kwargs},
+        key=key,
+        user_id=user_id,
+        status=Job.QUEUED,
+        attempts=0,
+        max_attempts=max_attempts or current_app.config.get("JOBS_MAX_ATTEMPTS", 3),
+    )
+    db.session.add(job)
+    db.session.commit()
+    job_id = job.id
+    current_app.extensions["jobs"].submit(job_id)
+    return db.session.get(Job, job_id)
+
+
+def get_job(job_id: str):
+    return db.session.get(Job, job_id)
@@ -0,0 +1,91 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from app import db
+from core.jobs.runner import execute_job
+
+logger = logging.getLogger(__name__)
+
+
+class SyncBackend:
+    """Runs jobs immediately in the calling thread (tests and scripts). Retries are not delayed.
+
+    Each job gets its own application context, and so its own session: the rollback of a failed
+    job never discards the caller's pending work. Afterwards the caller's loaded objects are
+    expired, so it reads what the job changed.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def submit(self, job_id: str, delay: float = 0):
+        with self.app.app_context():
+            execute_job(job_id)
+        db.session.expire_all()
+
+    def shutdown(self):
+        pass
+
+
+class ThreadPoolBackend:
+    """Runs jobs in a pool of threads of the web process: enough for a single node."""
+
+    def __init__(self, app):
+        self.app = app
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config.get("JOBS_WORKERS", 4), thread_name_prefix="job"
+        )
+
+    def _run(self, job_id: str):
+        with self.app.app_context():
+            try:
+                execute_job(job_id)
+            except Exception:
+                logger.exception("Unexpected error running job %s", job_id)
+
+    def submit(self, job_id: str, delay: float = 0):
+        if delay > 0:
+            timer = threading.Timer(delay, self.executor.submit, args=(self._run, job_id))
+            timer.daemon = True
+            timer.start()
+        else:
+            self.executor.submit(self._run, job_id)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+class RQBackend:
+    """Sends jobs to a Redis queue served by ``rq worker --with-scheduler`` processes."""
+
+    def __init__(self, app):
+        from redis import Redis
+        from rq import Queue
+
+        self.app = app
+        self.queue = Queue(
+            app.config.get("JOBS_QUEUE", "rubikhub"),
+            connection=Redis.from_url(app.config["REDIS_URL"]),
+            default_timeout=app.config.get("JOBS_TIMEOUT", 3600),
+        )
+
+    def submit(self, job_id: str, delay: float = 0):
+        if delay > 0:
+            self.queue.enqueue_in(timedelta(seconds=delay), execute_job, job_id)
+        else:
+            self.queue.enqueue(execute_job, job_id)
+
+    def shutdown(self):
+        pass
+
+
+BACKENDS = {"sync": SyncBackend, "thread": ThreadPoolBackend, "rq": RQBackend}
+
+
+def create_backend(app):
+    name = app.config.get("JOBS_BACKEND", "thread")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown jobs backend '{name}'")
+    return BACKENDS[name](app)
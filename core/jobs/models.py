@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from app import db
+
+
+class Job(db.Model):
+    """A unit of background work and its status, whatever backend runs it."""
+
+    __tablename__ = "job"
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    RETRYING = "retrying"
+    FINISHED = "finished"
+    FAILED = "failed"
+    ACTIVE = (QUEUED, RUNNING, RETRYING)
+
+    id = db.Column(db.String(32), primary_key=True)
+    # Ruta importable de la función a ejecutar: "paquete.modulo:funcion"
+    task = db.Column(db.String(255), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    # Clave opcional para no encolar dos veces el mismo trabajo mientras siga activo
+    key = db.Column(db.String(255), nullable=True, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True, index=True)
+    status = db.Column(db.String(20), nullable=False, default=QUEUED, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    next_attempt_at = db.Column(db.DateTime, nullable=True)
+    # Latido del proceso que lo ejecuta (cada JOBS_HEARTBEAT_INTERVAL segundos mientras corre)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+
+    def last_activity(self) -> datetime:
+        """When the job last did (or was due to do) something: creation, last start or heartbeat, next retry."""
+        times = (self.created_at, self.started_at, self.heartbeat_at, self.next_attempt_at)
+        return max(t for t in times if t is not None)
+
+    def is_stale(self, stale_after: float, now: datetime = None) -> bool:
+        """An active job with no activity for ``stale_after`` seconds was lost by its backend.
+
+        The thread backend keeps its queue and pending retries in memory, so a restart leaves
+        their rows queued, running or retrying forever. A running job sends heartbeats, so a long
+        one is not taken for a lost one as long as ``stale_after`` exceeds the heartbeat interval.
+        """
+        now = now or datetime.utcnow()
+        return self.status in self.ACTIVE and (now - self.last_activity()).total_seconds() > stale_after
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "task": self.task.rsplit(":", 1)[-1],
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "next_attempt_at": self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+        }
+
+    def __repr__(self):
+        return f"Job<{self.id} {self.task} {self.status}>"
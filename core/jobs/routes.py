@@ -0,0 +1,17 @@
+from flask import Blueprint, abort, jsonify
+from flask_login import current_user
+
+from core.jobs import get_job
+
+jobs_bp = Blueprint("jobs", __name__)
+
+
+@jobs_bp.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        abort(404)
+    # Los trabajos de un usuario solo los puede consultar él
+    if job.user_id is not None and (not current_user.is_authenticated or current_user.id != job.user_id):
+        abort(404)
+    return jsonify(job.to_dict()), 200
@@ -0,0 +1,148 @@
+import importlib
+import logging
+import os
+import threading
+import traceback
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import update
+
+from app import db
+from core.jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+_worker_app = None
+
+
+def task_path(fn) -> str:
+    return f"{fn.__module__}:{fn.__qualname__}"
+
+
+def resolve_task(path: str):
+    module_name, _, attribute = path.partition(":")
+    target = importlib.import_module(module_name)
+    for name in attribute.split("."):
+        target = getattr(target, name)
+    return target
+
+
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff: ``JOBS_RETRY_BACKOFF * 2 ** (attempt - 1)`` seconds, capped."""
+    base = current_app.config.get("JOBS_RETRY_BACKOFF", 2)
+    cap = current_app.config.get("JOBS_RETRY_BACKOFF_MAX", 300)
+    return min(cap, base * 2 ** (attempt - 1))
+
+
+def set_worker_app(app):
+    """Application used by processes that run jobs outside of any request (RQ workers)."""
+    global _worker_app
+    _worker_app = app
+
+
+def _app_context():
+    # Los workers de RQ no tienen aplicación: creamos una por proceso
+    global _worker_app
+    if has_app_context():
+        return nullcontext()
+    if _worker_app is None:
+        from app import create_app
+
+        _worker_app = create_app(os.getenv("FLASK_ENV", "development"))
+    return _worker_app.app_context()
+
+
+class _Heartbeat:
+    """Refreshes ``heartbeat_at`` of a running job from a thread while the task runs.
+
+    Without it a long, quiet job would look stale (see ``Job.is_stale``) and be enqueued again.
+    It writes through its own connection, outside the task's transaction.
+    """
+
+    def __init__(self, job_id: str, interval: float):
+        self.job_id = job_id
+        self.interval = interval
+        self.engine = db.engine
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name=f"job-heartbeat-{self.job_id}", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        update(Job.__table__).where(Job.id == self.job_id).values(heartbeat_at=datetime.utcnow())
+                    )
+            except Exception:
+                logger.exception("Could not record the heartbeat of job %s", self.job_id)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return False
+
+
+def execute_job(job_id: str):
+    """Runs one attempt of a job, recording the outcome and scheduling a retry if it fails.
+
+    This is the entry point of every backend (and what RQ workers import).
+    """
+    with _app_context():
+        job = db.session.get(Job, job_id)
+        if job is None or job.status not in Job.ACTIVE:
+            return None
+
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.started_at = datetime.utcnow()
+        job.next_attempt_at = None
+        db.session.commit()
+
+        try:
+            fn = resolve_task(job.task)
+            with _Heartbeat(job_id, current_app.config.get("JOBS_HEARTBEAT_INTERVAL", 60)):
+                result = fn(*job.payload.get("args", []), **job.payload.get("kwargs", {}))
+        except Exception as exc:
+            db.session.rollback()
+            job = db.session.get(Job, job_id)
+            job.error = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+            if job.attempts < job.max_attempts:
+                delay = retry_delay(job.attempts)
+                job.status = Job.RETRYING
+                job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+                db.session.commit()
+                logger.warning("Job %s (%s) failed, retrying in %ss: %s", job.id, job.task, delay, job.error)
+                current_app.extensions["jobs"].submit(job.id, delay)
+            else:
+                job.status = Job.FAILED
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+                logger.exception("Job %s (%s) failed after %d attempts", job.id, job.task, job.attempts)
+            return None
+
+        job = db.session.get(Job, job_id)
+        job.status = Job.FINISHED
+        job.result = result if _is_json(result) else None
+        job.error = None
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return result
+
+
+def _is_json(value) -> bool:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(_is_json(v) for v in value)
+    if isinstance(value, dict):
+        return all(isinstance(k, str) and _is_json(v) for k, v in value.items())
+    return False
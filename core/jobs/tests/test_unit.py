@@ -0,0 +1,127 @@
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+from app import db
+from app.modules.auth.models import User
+from core.jobs import enqueue
+from core.jobs.backends import SyncBackend
+from core.jobs.models import Job
+from core.jobs.runner import execute_job
+
+_flaky_calls = []
+
+
+def _flaky_task(failures):
+    _flaky_calls.append(failures)
+    if len(_flaky_calls) <= failures:
+        raise OSError("temporarily unavailable")
+    return {"calls": len(_flaky_calls)}
+
+
+def _quiet_task(seconds, key):
+    # Un trabajo largo que no escribe nada mientras tanto y luego pregunta por su propia clave
+    time.sleep(seconds)
+    return enqueue(_flaky_task, 0, key=key).id
+
+
+class _RecordingBackend:
+    """Runs jobs inline like the sync backend but records the retry delays."""
+
+    def __init__(self):
+        self.delays = []
+
+    def submit(self, job_id, delay=0):
+        self.delays.append(delay)
+        execute_job(job_id)
+
+
+def test_jobs_are_retried_with_backoff(clean_database, test_client, monkeypatch):
+    app = test_client.application
+    backend = _RecordingBackend()
+    monkeypatch.setitem(app.extensions, "jobs", backend)
+    monkeypatch.setitem(app.config, "JOBS_RETRY_BACKOFF", 1)
+
+    with app.app_context():
+        _flaky_calls.clear()
+        job = enqueue(_flaky_task, 2, max_attempts=3)
+        assert job.status == Job.FINISHED
+        assert job.attempts == 3
+        assert job.result == {"calls": 3}
+        assert backend.delays == [0, 1, 2]
+
+        _flaky_calls.clear()
+        job = enqueue(_flaky_task, 5, max_attempts=2)
+        assert job.status == Job.FAILED
+        assert job.attempts == 2
+        assert job.error == "OSError: temporarily unavailable"
+        job_id = job.id
+
+    response = test_client.get(f"/jobs/{job_id}")
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "failed"
+    assert test_client.get("/jobs/unknown").status_code == 404
+
+
+def test_enqueue_reuses_active_job_with_same_key(clean_database, test_client, monkeypatch):
+    submitted = []
+    monkeypatch.setitem(test_client.application.extensions, "jobs", mock.Mock(submit=submitted.append))
+
+    with test_client.application.app_context():
+        first = enqueue(_flaky_task, 0, key="columnar:1")
+        assert first.status == Job.QUEUED
+        assert enqueue(_flaky_task, 0, key="columnar:1").id == first.id
+        assert enqueue(_flaky_task, 0, key="columnar:2").id != first.id
+        assert submitted == [first.id, mock.ANY]
+
+
+def test_enqueue_replaces_stale_active_jobs(clean_database, test_client, monkeypatch):
+    submitted = []
+    monkeypatch.setitem(test_client.application.extensions, "jobs", mock.Mock(submit=submitted.append))
+    monkeypatch.setitem(test_client.application.config, "JOBS_STALE_AFTER", 60)
+
+    with test_client.application.app_context():
+        # Trabajo que un reinicio dejó "running" sin nadie que lo ejecute
+        lost = enqueue(_flaky_task, 0, key="columnar:3")
+        lost.status = Job.RUNNING
+        lost.created_at = lost.started_at = datetime.utcnow() - timedelta(seconds=120)
+        db.session.commit()
+        lost_id = lost.id
+
+        fresh = enqueue(_flaky_task, 0, key="columnar:3")
+        assert fresh.id != lost_id and fresh.status == Job.QUEUED
+        assert db.session.get(Job, lost_id).status == Job.FAILED
+        assert enqueue(_flaky_task, 0, key="columnar:3").id == fresh.id
+        assert submitted == [lost_id, fresh.id]
+
+
+def test_running_jobs_send_heartbeats_and_are_not_taken_for_lost(clean_database, test_client, monkeypatch):
+    config = test_client.application.config
+    monkeypatch.setitem(config, "JOBS_STALE_AFTER", 0.3)
+    monkeypatch.setitem(config, "JOBS_HEARTBEAT_INTERVAL", 0.05)
+
+    with test_client.application.app_context():
+        job = enqueue(_quiet_task, 0.6, "quiet:1", key="quiet:1")
+        assert job.status == Job.FINISHED
+        assert job.heartbeat_at is not None and job.heartbeat_at > job.started_at
+        # Mientras corría seguía vivo: la clave apuntaba a él y no se encoló otro
+        assert job.result == job.id
+        assert Job.query.filter_by(key="quiet:1").count() == 1
+
+
+def test_sync_jobs_do_not_roll_back_the_callers_session(clean_database, test_client, monkeypatch):
+    app = test_client.application
+    submitted = []
+    monkeypatch.setitem(app.extensions, "jobs", mock.Mock(submit=submitted.append))
+
+    with app.app_context():
+        _flaky_calls.clear()
+        job_id = enqueue(_flaky_task, 5, max_attempts=1).id
+        pending = User(email="pending-job@example.com", password="1234")
+        db.session.add(pending)
+
+        SyncBackend(app).submit(job_id)
+        assert pending in db.session.new
+        assert db.session.get(Job, job_id).status == Job.FAILED
+        db.session.commit()
+        assert User.query.filter_by(email="pending-job@example.com").count() == 1
@@ -0,0 +1,145 @@
+"""Email outbox.
+
+``queue_email`` stores the message in the ``email_outbox`` table and queues a background job
+(see ``core.jobs``) that sends it, so callers never wait for the SMTP server. The sender reuses
+pooled, logged-in SMTP connections, sends the recipients in Bcc batches of ``MAIL_BATCH_SIZE``
+and records how many were sent, so a failed attempt is retried with the job backoff and resumes
+with the next batch.
+
+The server comes from ``MAIL_SERVER``/``MAIL_PORT``/``MAIL_USE_SSL``/``MAIL_USE_TLS`` and the
+credentials from ``MAIL_USERNAME``/``MAIL_PASSWORD``; point it at a local sink (e.g. ``python -m
+aiosmtpd -n -l localhost:1025`` with ``MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_SSL=false``)
+to test without sending real mail.
+"""
+
+import logging
+import smtplib
+import threading
+from datetime import datetime
+from email.message import EmailMessage
+
+from flask import current_app
+
+from app import db
+from core.jobs import enqueue
+from core.mail.models import OutboxEmail
+from core.mail.smtp import SMTPPool
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def mail_configured() -> bool:
+    return bool(current_app.config.get("MAIL_SERVER"))
+
+
+def get_pool() -> SMTPPool:
+    """Connection pool for the configured server (one per process and configuration)."""
+    config = current_app.config
+    settings = (
+        config.get("MAIL_SERVER"),
+        int(config.get("MAIL_PORT", 465)),
+        bool(config.get("MAIL_USE_SSL")),
+        bool(config.get("MAIL_USE_TLS")),
+        config.get("MAIL_USERNAME"),
+        config.get("MAIL_PASSWORD"),
+    )
+    with _pools_lock:
+        pool = _pools.get(settings)
+        if pool is None:
+            pool = _pools[settings] = SMTPPool(
+                *settings,
+                timeout=config.get("MAIL_TIMEOUT", 30),
+                max_idle=config.get("MAIL_MAX_IDLE", 60),
+                size=config.get("MAIL_POOL_SIZE", 4),
+            )
+        return pool
+
+
+def queue_email(subject: str, body: str, recipients) -> OutboxEmail:
+    """Stores the email in the outbox and schedules its delivery. Returns None if mail is not configured."""
+    emails = queue_email_batches(subject, body, [sorted({r for r in recipients if r})])
+    return emails[0] if emails else None
+
+
+def queue_email_batches(subject: str, body: str, batches) -> list:
+    """Queues one outbox email per non-empty batch of recipients (an iterable of lists).
+
+    The batches may come from a streamed query: nothing is committed until they are exhausted,
+    then all the emails are stored in one commit and their delivery is scheduled.
+    """
+    return queue_messages((subject, body, batch) for batch in batches)
+
+
+def queue_messages(messages) -> list:
+    """Like ``queue_email_batches`` for an iterable of ``(subject, body, recipients)`` tuples."""
+    if not mail_configured():
+        logger.warning("Mail server not configured, skipping emails")
+        return []
+
+    emails = []
+    for subject, body, recipients in messages:
+        if recipients:
+            email = OutboxEmail(subject=subject[:255], body=body, recipients=list(recipients))
+            db.session.add(email)
+            emails.append(email)
+    if not emails:
+        return []
+    db.session.commit()
+    email_ids = [email.id for email in emails]
+    max_attempts = current_app.config.get("MAIL_MAX_ATTEMPTS")
+    for email_id in email_ids:
+        enqueue(send_outbox_email, email_id, key=f"mail:{email_id}", max_attempts=max_attempts)
+    return [db.session.get(OutboxEmail, email_id) for email_id in email_ids]
+
+
+def _message(email: OutboxEmail, sender: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = email.subject
+    msg["From"] = sender
+    # Los destinatarios van en Bcc (to_addrs): nadie ve las direcciones de los demás
+    msg["To"] = sender
+    msg.set_content(email.body)
+    return msg
+
+
+def send_outbox_email(email_id: int):
+    """Background task: sends the remaining batches of an outbox email."""
+    email = db.session.get(OutboxEmail, email_id)
+    if email is None or email.status != OutboxEmail.PENDING:
+        return None
+
+    config = current_app.config
+    batch_size = max(int(config.get("MAIL_BATCH_SIZE", 50)), 1)
+    sender = config.get("MAIL_DEFAULT_SENDER") or config.get("MAIL_USERNAME") or "no-reply@rubikhub.local"
+    msg = _message(email, sender)
+    pool = get_pool()
+    email.attempts += 1
+    try:
+        while email.sent_count < len(email.recipients):
+            batch = email.recipients[email.sent_count:email.sent_count + batch_size]
+            try:
+                with pool.connection() as smtp:
+                    smtp.send_message(msg, from_addr=sender, to_addrs=batch)
+            except smtplib.SMTPServerDisconnected:
+                # La conexión del pool pudo caducar entre comprobaciones: una vez más con otra nueva
+                with pool.connection() as smtp:
+                    smtp.send_message(msg, from_addr=sender, to_addrs=batch)
+            email.sent_count += len(batch)
+            db.session.commit()
+    except Exception as exc:
+        email.last_error = f"{type(exc).__name__}: {exc}"
+        max_attempts = config.get("MAIL_MAX_ATTEMPTS") or config.get("JOBS_MAX_ATTEMPTS", 3)
+        if email.attempts >= max_attempts:
+            email.status = OutboxEmail.FAILED
+        db.session.commit()
+        raise
+
+    email.status = OutboxEmail.SENT
+    email.sent_at = datetime.utcnow()
+    email.last_error = None
+    db.session.commit()
+    logger.info("Sent outbox email %s to %d recipients", email.id, len(email.recipients))
+    return {"email_id": email.id, "recipients": len(email.recipients)}
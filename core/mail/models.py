@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from app import db
+
+
+class OutboxEmail(db.Model):
+    """An email waiting to be sent (or already sent) by the background sender."""
+
+    __tablename__ = "email_outbox"
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    recipients = db.Column(db.JSON, nullable=False)
+    # Destinatarios ya enviados (en orden): un reintento continúa por el siguiente lote
+    sent_count = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(20), nullable=False, default=PENDING, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"OutboxEmail<{self.id} {self.status}>"
+
+
+class PendingNotification(db.Model):
+    """A new dataset waiting for the next hourly or daily digest of a user."""
+
+    __tablename__ = "pending_notification"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id", ondelete="CASCADE"), nullable=False)
+    # Comunidad que originó el aviso (None si viene de seguir al autor)
+    community_id = db.Column(db.Integer, db.ForeignKey("community.id", ondelete="CASCADE"), nullable=True)
+    frequency = db.Column(db.String(10), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"PendingNotification<{self.id} user={self.user_id} dataset={self.dataset_id}>"
@@ -0,0 +1,99 @@
+import logging
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPPool:
+    """Keeps logged-in SMTP connections open between messages.
+
+    Connections idle for more than ``max_idle`` seconds are closed instead of reused (servers drop
+    them anyway); one that has been idle for a while is checked with ``NOOP`` before reuse.
+    """
+
+    CHECK_AFTER = 5
+
+    def __init__(self, host, port, use_ssl=False, use_tls=False, username=None, password=None,
+                 timeout=30, max_idle=60, size=4):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def _connect(self):
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password or "")
+        self.opened += 1
+        logger.debug("Opened SMTP connection to %s:%s", self.host, self.port)
+        return smtp
+
+    def _take_idle(self):
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                smtp, since = self._idle.pop()
+            idle_for = now - since
+            if idle_for > self.max_idle:
+                self._close(smtp)
+                continue
+            if idle_for > self.CHECK_AFTER:
+                try:
+                    if smtp.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected("NOOP failed")
+                except (smtplib.SMTPException, OSError):
+                    self._close(smtp)
+                    continue
+            return smtp
+
+    @contextmanager
+    def connection(self):
+        smtp = self._take_idle() or self._connect()
+        try:
+            yield smtp
+        except smtplib.SMTPResponseException:
+            # El servidor rechazó el mensaje pero la conexión sigue siendo válida
+            self._release(smtp)
+            raise
+        except BaseException:
+            self._close(smtp)
+            raise
+        self._release(smtp)
+
+    def _release(self, smtp):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((smtp, time.monotonic()))
+                return
+        self._close(smtp)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            self._close(smtp)
+
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
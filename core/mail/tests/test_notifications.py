@@ -0,0 +1,130 @@
+from types import SimpleNamespace
+
+from sqlalchemy import event
+
+from app import db
+from app.modules.auth.models import User
+from app.modules.community.models import Community
+from app.modules.dataset.models import Author, DataSet, DSMetaData, PublicationType
+from app.modules.followAuthor.models import Followauthor
+from app.modules.followCommunity.models import Followcommunity
+from app.modules.profile.models import UserProfile
+from app.utils import notifications
+from core.mail import smtp as mail_smtp
+from core.mail.models import OutboxEmail, PendingNotification
+from core.mail.tests.test_unit import _SinkSMTP
+
+
+def test_follower_notifications_resolve_recipients_in_one_streamed_query(clean_database, test_client, monkeypatch):
+    config = test_client.application.config
+    for key, value in {"MAIL_SERVER": "localhost", "MAIL_PORT": 1025, "MAIL_USE_SSL": False}.items():
+        monkeypatch.setitem(config, key, value)
+    monkeypatch.setattr(mail_smtp.smtplib, "SMTP", _SinkSMTP)
+    _SinkSMTP.connections = []
+    _SinkSMTP.fail_on_batch = None
+
+    with test_client.application.test_request_context():
+        owner = User(email="fanout-owner@example.com", password="x")
+        db.session.add(owner)
+        db.session.flush()
+        author = Author(name="Fan-out", user_id=owner.id)
+        community = Community(slug="fan-out", name="Fan-out", created_by_id=owner.id)
+        db.session.add_all([author, community])
+        db.session.flush()
+        followers = [User(email=f"fanout{i}@example.com", password="x") for i in range(9)]
+        db.session.add_all(followers)
+        db.session.flush()
+        # 0-4 siguen al autor, 4-8 a la comunidad: el 4 sigue a ambos
+        db.session.add_all([Followauthor(follower_id=u.id, author_id=author.id) for u in followers[:5]])
+        db.session.add_all([Followcommunity(follower_id=u.id, community_id=community.id) for u in followers[4:]])
+        db.session.commit()
+        author_id, community_id = author.id, community.id
+        addresses = sorted(u.email for u in followers)
+
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", count)
+        try:
+            batches = list(notifications.follower_email_batches(author_id, community_id, chunk_size=4))
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+        assert len(statements) == 1
+        assert [len(batch) for batch in batches] == [4, 4, 1]
+        assert sorted(e for batch in batches for e in batch) == addresses
+
+        # Los seguidores del autor ya recibieron el aviso de publicación
+        monkeypatch.setattr(notifications, "RECIPIENT_CHUNK_SIZE", 2)
+        before = OutboxEmail.query.count()
+        dataset = SimpleNamespace(id=0, user_id=owner.id, ds_meta_data=SimpleNamespace(title="Cubos"))
+        notifications.notify_followers_of_community(community, dataset)
+        emails = OutboxEmail.query.order_by(OutboxEmail.id).all()[before:]
+        assert [len(e.recipients) for e in emails] == [2, 2]
+        assert sorted(r for e in emails for r in e.recipients) == addresses[5:]
+        assert all(e.status == OutboxEmail.SENT for e in emails)
+
+        # Un error al guardar los avisos no llega a quien publica, igual que con los seguidores del autor
+        def fail(*args, **kwargs):
+            raise RuntimeError("database is down")
+
+        monkeypatch.setattr(notifications, "defer_to_digests", fail)
+        before = OutboxEmail.query.count()
+        assert notifications.notify_followers_of_community(community, dataset) is None
+        assert OutboxEmail.query.count() == before
+
+
+def test_digest_followers_get_one_email_per_window(clean_database, test_client, monkeypatch):
+    config = test_client.application.config
+    for key, value in {"MAIL_SERVER": "localhost", "MAIL_PORT": 1025, "MAIL_USE_SSL": False}.items():
+        monkeypatch.setitem(config, key, value)
+    monkeypatch.setattr(mail_smtp.smtplib, "SMTP", _SinkSMTP)
+    _SinkSMTP.connections = []
+    _SinkSMTP.fail_on_batch = None
+
+    with test_client.application.test_request_context():
+        owner = User(email="digest-owner@example.com", password="x")
+        users = {name: User(email=f"digest-{name}@example.com", password="x") for name in ("now", "h1", "h2", "day")}
+        db.session.add_all([owner, *users.values()])
+        db.session.flush()
+        author = Author(name="Digest", user_id=owner.id)
+        community = Community(slug="digest", name="Digest", created_by_id=owner.id)
+        db.session.add_all([author, community])
+        for name, frequency in (("h1", "hourly"), ("h2", "hourly"), ("day", "daily")):
+            db.session.add(
+                UserProfile(user_id=users[name].id, name=name, surname="Rubik", notification_frequency=frequency)
+            )
+        db.session.flush()
+        # "h1" sigue al autor y a la comunidad, "h2" solo a la comunidad
+        for name in ("now", "h1", "day"):
+            db.session.add(Followauthor(follower_id=users[name].id, author_id=author.id))
+        for name in ("h1", "h2"):
+            db.session.add(Followcommunity(follower_id=users[name].id, community_id=community.id))
+        datasets = []
+        for title in ("Cubo 2x2", "Cubo 3x3"):
+            meta = DSMetaData(title=title, description="d", publication_type=PublicationType.RECORDS)
+            db.session.add(meta)
+            db.session.flush()
+            datasets.append(DataSet(user_id=owner.id, ds_meta_data_id=meta.id))
+        db.session.add_all(datasets)
+        db.session.commit()
+        emails = {name: user.email for name, user in users.items()}
+
+        before = OutboxEmail.query.count()
+        for dataset in datasets:
+            notifications.notify_followers_of_author(owner.id, dataset)
+            notifications.notify_followers_of_community(community, dataset)
+
+        immediate = OutboxEmail.query.order_by(OutboxEmail.id).all()[before:]
+        assert [e.recipients for e in immediate] == [[emails["now"]], [emails["now"]]]
+        assert PendingNotification.query.filter_by(frequency="hourly").count() == 4
+        assert PendingNotification.query.filter_by(frequency="daily").count() == 2
+
+        digests = notifications.send_digests("hourly")
+        assert sorted(e.recipients[0] for e in digests) == sorted([emails["h1"], emails["h2"]])
+        assert all(e.subject == "Resumen: 2 nuevo(s) dataset(s)" for e in digests)
+        assert all("- Cubo 2x2" in e.body and "- Cubo 3x3" in e.body for e in digests)
+        assert PendingNotification.query.filter_by(frequency="hourly").count() == 0
+        assert PendingNotification.query.filter_by(frequency="daily").count() == 2
+        assert notifications.send_digests("hourly") == []
@@ -0,0 +1,67 @@
+import smtplib
+
+from core.mail import queue_email
+from core.mail import smtp as mail_smtp
+from core.mail.models import OutboxEmail
+
+
+class _SinkSMTP:
+    """SMTP server falso: guarda los lotes enviados y puede cortar la conexión una vez."""
+
+    connections = []
+    fail_on_batch = None
+
+    def __init__(self, host, port, timeout=None):
+        self.logins = 0
+        self.batches = []
+        _SinkSMTP.connections.append(self)
+
+    def login(self, user, password):
+        self.logins += 1
+
+    def noop(self):
+        return (250, b"OK")
+
+    def send_message(self, msg, from_addr=None, to_addrs=None):
+        sent = sum(len(c.batches) for c in _SinkSMTP.connections)
+        if _SinkSMTP.fail_on_batch == sent:
+            _SinkSMTP.fail_on_batch = None
+            raise smtplib.SMTPDataError(451, b"try again later")
+        self.batches.append((msg["Subject"], msg["To"], list(to_addrs)))
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_notification_emails_go_through_outbox_with_pooled_connection(clean_database, test_client, monkeypatch):
+    config = test_client.application.config
+    for key, value in {
+        "MAIL_SERVER": "localhost", "MAIL_PORT": 1025, "MAIL_USE_SSL": False,
+        "MAIL_USERNAME": "sink", "MAIL_DEFAULT_SENDER": "hub@example.com",
+        "MAIL_BATCH_SIZE": 3, "JOBS_RETRY_BACKOFF": 0,
+    }.items():
+        monkeypatch.setitem(config, key, value)
+    monkeypatch.setattr(mail_smtp.smtplib, "SMTP", _SinkSMTP)
+    _SinkSMTP.connections = []
+    _SinkSMTP.fail_on_batch = 1
+
+    recipients = [f"follower{i}@example.com" for i in range(7)]
+    with test_client.application.test_request_context():
+        queue_email("Nuevo dataset", "cuerpo", recipients + ["follower0@example.com"])
+        queue_email("Otro dataset", "cuerpo", recipients[:2])
+
+    first, second = OutboxEmail.query.order_by(OutboxEmail.id).all()[-2:]
+    assert first.status == second.status == OutboxEmail.SENT
+    # El segundo lote falló una vez: el reintento continúa desde él sin repetir el primero
+    assert first.attempts == 2 and first.sent_count == 7
+    batches = [b for c in _SinkSMTP.connections for b in c.batches]
+    assert [len(to) for _, _, to in batches] == [3, 3, 1, 2]
+    assert sorted(r for subject, _, to in batches if subject == "Nuevo dataset" for r in to) == sorted(recipients)
+    assert all(to_header == "hub@example.com" for _, to_header, _ in batches)
+
+    # Una sola conexión (y un solo login) para todos los envíos
+    assert len(_SinkSMTP.connections) == 1
+    assert _SinkSMTP.connections[0].logins == 1
@@ -33,6 +33,34 @@ class Config:
     TIMEZONE = "Europe/Madrid"
     TEMPLATES_AUTO_RELOAD = True
     UPLOAD_FOLDER = "uploads"
+    # Trabajos en segundo plano: "thread" (en el propio proceso), "rq" (Redis + rq worker) o "sync"
+    JOBS_BACKEND = os.getenv("JOBS_BACKEND", "thread")
+    JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "4"))
+    JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+    JOBS_RETRY_BACKOFF = float(os.getenv("JOBS_RETRY_BACKOFF", "2"))
+    JOBS_RETRY_BACKOFF_MAX = float(os.getenv("JOBS_RETRY_BACKOFF_MAX", "300"))
+    # Un trabajo activo sin avances durante este tiempo se da por perdido (p. ej. tras reiniciar el proceso)
+    JOBS_STALE_AFTER = float(os.getenv("JOBS_STALE_AFTER", "3600"))
+    # Cada cuánto un trabajo en ejecución lo indica en su fila (debe ser menor que JOBS_STALE_AFTER)
+    JOBS_HEARTBEAT_INTERVAL = float(os.getenv("JOBS_HEARTBEAT_INTERVAL", "60"))
+    REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    # Perfil JSON de latencias y fallos de Fakenodo (ver app/modules/fakenodo/faults.py)
+    FAKENODO_FAULTS = os.getenv("FAKENODO_FAULTS", "")
+    FAKENODO_FAULTS_API = os.getenv("FAKENODO_FAULTS_API", "False").lower() == "true"
+    # Envío de correo (bandeja de salida, ver core/mail). Sin MAIL_SERVER no se envía nada
+    MAIL_SERVER = os.getenv("MAIL_SERVER", "smtp.gmail.com" if os.getenv("GMAIL_USER") else "")
+    MAIL_PORT = int(os.getenv("MAIL_PORT", "465"))
+    MAIL_USE_SSL = os.getenv("MAIL_USE_SSL", "True").lower() == "true"
+    MAIL_USE_TLS = os.getenv("MAIL_USE_TLS", "False").lower() == "true"
+    MAIL_USERNAME = os.getenv("MAIL_USERNAME", os.getenv("GMAIL_USER"))
+    MAIL_PASSWORD = os.getenv("MAIL_PASSWORD", os.getenv("GMAIL_APP_PASSWORD"))
+    MAIL_DEFAULT_SENDER = os.getenv("MAIL_DEFAULT_SENDER", os.getenv("GMAIL_USER"))
+    MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+    MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "5"))
+    MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", "4"))
+    MAIL_MAX_IDLE = float(os.getenv("MAIL_MAX_IDLE", "60"))
+    # Autores/comunidades con más seguidores no se copian a cada timeline: su feed se calcula al leer
+    FEED_FANOUT_THRESHOLD = int(os.getenv("FEED_FANOUT_THRESHOLD", "10000"))
 
 
 class DevelopmentConfig(Config):
@@ -49,6 +77,8 @@ class TestingConfig(Config):
         f"{os.getenv('MARIADB_TEST_DATABASE', 'default_db')}"
     )
     WTF_CSRF_ENABLED = False
+    JOBS_BACKEND = "sync"
+    MAIL_SERVER = ""
 
 
 class ProductionConfig(Config):
@@ -0,0 +1,11 @@
+class JobManager:
+    def __init__(self, app):
+        self.app = app
+
+    def init_jobs(self):
+        # Importación diferida: el modelo necesita ``db`` ya creado en ``app``
+        from core.jobs.backends import create_backend
+        from core.jobs.routes import jobs_bp
+
+        self.app.extensions["jobs"] = create_backend(self.app)
+        self.app.register_blueprint(jobs_bp)
@@ -0,0 +1,63 @@
+"""Validation of one chunk of a CSV file, run by the worker processes of ``validate_csv``.
+
+The workers are spawned, so they import this module from scratch: it must not import the ``app``
+package, whose import creates the Flask app (see ``app.modules.dataset.validation``).
+"""
+
+import csv
+
+from core.payloads.zstd import open_seekable
+
+MAX_ERRORS = 100
+
+
+def validate_chunk(path, delimiter, width, start, end, opener=open_seekable) -> dict:
+    """Validates the records in ``[start, end)``. Row numbers in the report are relative to the chunk.
+
+    ``opener(path, offset)`` returns the binary reader of the payload; the default one does not
+    import the app, so this runs in spawned workers.
+    """
+    errors = []
+    error_count = 0
+    rows = 0
+    position = start
+
+    def report(row, offset, message):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_ERRORS:
+            errors.append({"row": row, "byte_offset": offset, "error": message})
+
+    with opener(path, start) as f:
+
+        def lines():
+            nonlocal position
+            for raw in f:
+                offset = position
+                position += len(raw)
+                try:
+                    yield raw.decode("utf-8")
+                except UnicodeDecodeError as exc:
+                    report(rows + 1, offset + exc.start, "invalid UTF-8 byte sequence")
+                    yield raw.decode("utf-8", errors="replace")
+                if position >= end:
+                    return
+
+        reader = csv.reader(lines(), delimiter=delimiter, strict=True)
+        while True:
+            offset = position
+            try:
+                row = next(reader)
+            except StopIteration:
+                break
+            except csv.Error as exc:
+                rows += 1
+                report(rows, offset, f"malformed quoting: {exc}")
+                continue
+            if not row:
+                continue
+            rows += 1
+            if len(row) != width:
+                report(rows, offset, f"expected {width} fields, found {len(row)}")
+
+    return {"rows": rows, "errors": errors, "error_count": error_count}
@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+from core.payloads.csv_chunks import validate_chunk
+from core.payloads.zstd import open_seekable
+
+
+def test_chunk_worker_modules_do_not_import_the_app():
+    # Los procesos de validación se lanzan con "spawn": importar la app crearía una app Flask en cada uno
+    code = "import sys, core.payloads.csv_chunks; sys.exit('app' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
+
+
+def test_validate_chunk_reads_plain_and_seekable_payloads(tmp_path):
+    from app.modules.hubfile import compression
+
+    content = b"a,b\n" + b"".join(b"%d,x\n" % i for i in range(1000)) + b"1,2,3\n"
+    plain = tmp_path / "data.csv"
+    plain.write_bytes(content)
+    packed = tmp_path / "data.csv.zst"
+    compression.compress_file(str(plain), str(packed))
+
+    start = content.index(b"\n") + 1
+    for path in (plain, packed):
+        with open_seekable(str(path), start) as f:
+            assert f.readline() == b"0,x\n"
+        report = validate_chunk(str(path), ",", 2, start, len(content))
+        assert report["rows"] == 1001
+        error = {"row": 1001, "byte_offset": len(content) - 6, "error": "expected 2 fields, found 3"}
+        assert report["errors"] == [error]
@@ -0,0 +1,131 @@
+"""Reading of stored payloads that does not import the Flask app.
+
+Spawned worker processes (e.g. the CSV validation pool) use this module to read a byte range of a
+payload: importing ``app.modules.hubfile.compression`` would run ``create_app()`` in each of them.
+``app.modules.hubfile.compression`` builds on the same reader.
+"""
+
+import bisect
+import io
+import struct
+
+import zstandard
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+CHUNK_SIZE = 1024 * 1024
+SKIPPABLE_MAGIC = 0x184D2A5E
+SEEKABLE_MAGIC = 0x8F92EAB1
+SEEK_FOOTER = struct.Struct("<IBI")
+
+
+def read_seek_table(f):
+    """``(frame_offsets, payload_size)`` of a seekable zstd file, or None when it has no seek table.
+
+    ``frame_offsets`` holds one ``(compressed_offset, decompressed_offset)`` pair per frame.
+    """
+    f.seek(0, io.SEEK_END)
+    size = f.tell()
+    if size < 8 + SEEK_FOOTER.size:
+        return None
+    f.seek(size - SEEK_FOOTER.size)
+    n_frames, descriptor, magic = SEEK_FOOTER.unpack(f.read(SEEK_FOOTER.size))
+    entry_size = 12 if descriptor & 0x80 else 8
+    table_size = n_frames * entry_size + SEEK_FOOTER.size
+    if magic != SEEKABLE_MAGIC or size < 8 + table_size:
+        return None
+    f.seek(size - table_size - 8)
+    frame_magic, frame_size = struct.unpack("<II", f.read(8))
+    if frame_magic != SKIPPABLE_MAGIC or frame_size != table_size:
+        return None
+    data = f.read(table_size - SEEK_FOOTER.size)
+    offsets, compressed, decompressed = [], 0, 0
+    for i in range(n_frames):
+        frame_compressed, frame_decompressed = struct.unpack_from("<II", data, i * entry_size)
+        offsets.append((compressed, decompressed))
+        compressed += frame_compressed
+        decompressed += frame_decompressed
+    return offsets, decompressed
+
+
+class SeekableZstdReader(io.RawIOBase):
+    """Raw reader of a seekable zstd file: a seek jumps to the frame holding the target offset."""
+
+    def __init__(self, f, frame_offsets, size):
+        self._f = f
+        self._compressed = [c for c, _ in frame_offsets]
+        self._decompressed = [d for _, d in frame_offsets]
+        self._size = size
+        self._pos = 0
+        self._reader = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError("negative seek position")
+        if offset != self._pos:
+            self._drop_reader()
+            self._pos = offset
+        return self._pos
+
+    def readinto(self, buffer):
+        if self._reader is None:
+            if self._pos >= self._size:
+                return 0
+            frame = bisect.bisect_right(self._decompressed, self._pos) - 1
+            self._f.seek(self._compressed[frame])
+            self._reader = zstandard.ZstdDecompressor().stream_reader(
+                self._f, read_size=CHUNK_SIZE, read_across_frames=True, closefd=False
+            )
+            discard(self._reader, self._pos - self._decompressed[frame])
+        n = self._reader.readinto(buffer)
+        self._pos += n
+        return n
+
+    def _drop_reader(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def close(self):
+        if not self.closed:
+            self._drop_reader()
+            self._f.close()
+        super().close()
+
+
+def discard(reader, count):
+    while count > 0:
+        skipped = len(reader.read(min(count, CHUNK_SIZE)))
+        if not skipped:
+            break
+        count -= skipped
+
+
+def open_seekable(path, offset=0):
+    """Opens a plain or seekable zstd payload for binary reading at ``offset`` (decompressed).
+
+    Raises ValueError for a zstd file without a seek table: use ``compression.open_payload``.
+    """
+    f = open(path, "rb")
+    if f.read(len(ZSTD_MAGIC)) != ZSTD_MAGIC:
+        f.seek(offset)
+        return f
+    seek_table = read_seek_table(f)
+    if seek_table is None:
+        f.close()
+        raise ValueError(f"{path} is a zstd file without a seek table")
+    reader = io.BufferedReader(SeekableZstdReader(f, *seek_table), buffer_size=CHUNK_SIZE)
+    reader.seek(offset)
+    return reader
@@ -1,5 +1,9 @@
 from typing import Generic, List, NoReturn, Optional, TypeVar, Union
 
+from sqlalchemy import exists, insert, literal, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
 import app
 
 T = TypeVar("T")
@@ -19,6 +23,36 @@ class BaseRepository(Generic[T]):
             self.session.flush()
         return instance
 
+    def insert_ignore(self, **kwargs) -> bool:
+        """Inserts a row in a single statement that does nothing if it breaks a unique constraint.
+
+        Returns True if the row was inserted. It does not commit. Other errors (e.g. a foreign key
+        to a missing row) are raised.
+        """
+        table = self.model.__table__
+        dialect = self.session.get_bind(mapper=self.model).dialect.name
+        if dialect == "mysql":
+            # INSERT IGNORE también silencia las claves ajenas rotas. SQLAlchemy conecta con FOUND_ROWS,
+            # así que "ON DUPLICATE KEY UPDATE id=id" cuenta 1 fila aunque ya existiera: el NOT EXISTS
+            # deja la cuenta a 0 en ese caso y el ON DUPLICATE KEY solo cubre una inserción concurrente.
+            row = select(*[literal(value, type_=table.c[key].type).label(key) for key, value in kwargs.items()])
+            row = row.where(~exists().where(*[table.c[key] == value for key, value in kwargs.items()]))
+            pk = table.primary_key.columns.values()[0]
+            stmt = mysql.insert(table).from_select(list(kwargs), row).on_duplicate_key_update({pk.name: pk})
+            return self.session.execute(stmt).rowcount == 1
+        elif dialect == "postgresql":
+            stmt = postgresql.insert(table).on_conflict_do_nothing()
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(table).on_conflict_do_nothing()
+        else:
+            try:
+                with self.session.begin_nested():
+                    self.session.execute(insert(table).values(**kwargs))
+                return True
+            except IntegrityError:
+                return False
+        return self.session.execute(stmt.values(**kwargs)).rowcount == 1
+
     def get_by_id(self, id: int) -> Optional[T]:
         instance: Optional[T] = self.model.query.get(id)
         return instance
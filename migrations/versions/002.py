@@ -0,0 +1,39 @@
+"""file row groups (zone maps) for tabular files
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'file_row_group',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('file_id', sa.Integer(), nullable=False),
+        sa.Column('checksum', sa.String(length=120), nullable=False),
+        sa.Column('group_index', sa.Integer(), nullable=False),
+        sa.Column('row_offset', sa.BigInteger(), nullable=False),
+        sa.Column('row_count', sa.Integer(), nullable=False),
+        sa.Column('byte_offset', sa.BigInteger(), nullable=False),
+        sa.Column('byte_length', sa.BigInteger(), nullable=False),
+        sa.Column('zone_map', sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(['file_id'], ['file.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('file_id', 'group_index', name='uq_file_row_group_index'),
+    )
+    op.create_index('ix_file_row_group_file_id', 'file_row_group', ['file_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_file_row_group_file_id', table_name='file_row_group')
+    op.drop_table('file_row_group')
@@ -0,0 +1,35 @@
+"""dataset diff cache
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'dataset_diff',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('old_checksum', sa.String(length=120), nullable=False),
+        sa.Column('new_checksum', sa.String(length=120), nullable=False),
+        sa.Column('key_column', sa.String(length=255), nullable=False, server_default=''),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('summary', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('old_checksum', 'new_checksum', 'key_column', name='uq_dataset_diff_pair'),
+    )
+
+
+def downgrade():
+    op.drop_table('dataset_diff')
@@ -0,0 +1,27 @@
+"""dataset csv validation status
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('data_set', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('validation_status', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('validation_report', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('data_set', schema=None) as batch_op:
+        batch_op.drop_column('validation_report')
+        batch_op.drop_column('validation_status')
@@ -0,0 +1,31 @@
+"""dataset publication state
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('data_set', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('publication_state', sa.String(length=20), nullable=True))
+
+    # Los datasets que ya tienen DOI se consideran publicados
+    op.execute(
+        "UPDATE data_set SET publication_state = 'doi_recorded' WHERE ds_meta_data_id IN "
+        "(SELECT id FROM ds_meta_data WHERE dataset_doi IS NOT NULL)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('data_set', schema=None) as batch_op:
+        batch_op.drop_column('publication_state')
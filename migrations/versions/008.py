@@ -0,0 +1,126 @@
+"""fakenodo files and versions tables
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+import json
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def _load(value):
+    if isinstance(value, str):
+        return json.loads(value) if value else {}
+    return value or {}
+
+
+def _parse_date(value):
+    try:
+        return datetime.fromisoformat(value.rstrip('Z'))
+    except (AttributeError, ValueError):
+        return datetime.utcnow()
+
+
+def upgrade():
+    fakenodo_file = op.create_table(
+        'fakenodo_file',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('deposition_id', sa.Integer(), nullable=False),
+        sa.Column('file_name', sa.String(length=255), nullable=False),
+        sa.Column('file_path', sa.String(length=1024), nullable=False),
+        sa.Column('file_type', sa.String(length=100), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['deposition_id'], ['fakenodo.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_fakenodo_file_deposition_id', 'fakenodo_file', ['deposition_id'], unique=False)
+    fakenodo_version = op.create_table(
+        'fakenodo_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('deposition_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.String(length=50), nullable=False),
+        sa.Column('doi', sa.String(length=250), nullable=True),
+        sa.Column('changes', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['deposition_id'], ['fakenodo.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_fakenodo_version_deposition_id', 'fakenodo_version', ['deposition_id'], unique=False)
+
+    # Pasamos las listas embebidas en meta_data a las tablas nuevas y las quitamos del JSON
+    bind = op.get_bind()
+    fakenodo = sa.table('fakenodo', sa.column('id', sa.Integer), sa.column('meta_data', sa.JSON))
+    for deposition_id, raw in bind.execute(sa.select(fakenodo.c.id, fakenodo.c.meta_data)).fetchall():
+        meta_data = _load(raw)
+        files = meta_data.pop('files', None) or []
+        versions = meta_data.pop('versions', None) or []
+        if not files and not versions:
+            continue
+        now = datetime.utcnow()
+        if files:
+            op.bulk_insert(fakenodo_file, [{
+                'deposition_id': deposition_id,
+                'file_name': f.get('file_name') or 'unknown.csv',
+                'file_path': f.get('file_path') or '',
+                'file_type': f.get('file_type') or 'text/csv',
+                'created_at': now,
+            } for f in files])
+        if versions:
+            op.bulk_insert(fakenodo_version, [{
+                'deposition_id': deposition_id,
+                'version': str(v.get('version') or ''),
+                'doi': v.get('doi'),
+                'changes': v.get('changes'),
+                'created_at': _parse_date(v.get('created_at')),
+            } for v in versions])
+        bind.execute(fakenodo.update().where(fakenodo.c.id == deposition_id).values(meta_data=meta_data))
+
+
+def downgrade():
+    bind = op.get_bind()
+    fakenodo = sa.table('fakenodo', sa.column('id', sa.Integer), sa.column('meta_data', sa.JSON))
+    files = sa.table('fakenodo_file', sa.column('id', sa.Integer), sa.column('deposition_id', sa.Integer),
+                     sa.column('file_name', sa.String), sa.column('file_path', sa.String),
+                     sa.column('file_type', sa.String))
+    versions = sa.table('fakenodo_version', sa.column('id', sa.Integer), sa.column('deposition_id', sa.Integer),
+                        sa.column('version', sa.String), sa.column('doi', sa.String),
+                        sa.column('changes', sa.JSON), sa.column('created_at', sa.DateTime))
+    for deposition_id, raw in bind.execute(sa.select(fakenodo.c.id, fakenodo.c.meta_data)).fetchall():
+        file_rows = bind.execute(
+            sa.select(files.c.file_name, files.c.file_path, files.c.file_type)
+            .where(files.c.deposition_id == deposition_id).order_by(files.c.id)
+        ).fetchall()
+        version_rows = bind.execute(
+            sa.select(versions.c.version, versions.c.doi, versions.c.changes, versions.c.created_at)
+            .where(versions.c.deposition_id == deposition_id).order_by(versions.c.id)
+        ).fetchall()
+        if not file_rows and not version_rows:
+            continue
+        meta_data = _load(raw)
+        if file_rows:
+            meta_data['files'] = [
+                {'file_name': name, 'file_path': path, 'file_type': file_type} for name, path, file_type in file_rows
+            ]
+        if version_rows:
+            meta_data['versions'] = []
+            for version, doi, changes, created_at in version_rows:
+                entry = {'version': version, 'doi': doi, 'created_at': created_at.isoformat() + 'Z'}
+                if changes is not None:
+                    entry['changes'] = changes
+                meta_data['versions'].append(entry)
+        bind.execute(fakenodo.update().where(fakenodo.c.id == deposition_id).values(meta_data=meta_data))
+
+    op.drop_index('ix_fakenodo_version_deposition_id', table_name='fakenodo_version')
+    op.drop_table('fakenodo_version')
+    op.drop_index('ix_fakenodo_file_deposition_id', table_name='fakenodo_file')
+    op.drop_table('fakenodo_file')
@@ -0,0 +1,26 @@
+"""doi lookup indexes
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_doi_mapping_dataset_doi_old', 'doi_mapping', ['dataset_doi_old'], unique=False)
+    op.create_index('ix_data_set_version_doi', 'data_set', ['version_doi'], unique=False)
+    op.create_index('ix_ds_meta_data_dataset_doi', 'ds_meta_data', ['dataset_doi'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_ds_meta_data_dataset_doi', table_name='ds_meta_data')
+    op.drop_index('ix_data_set_version_doi', table_name='data_set')
+    op.drop_index('ix_doi_mapping_dataset_doi_old', table_name='doi_mapping')
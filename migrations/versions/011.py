@@ -0,0 +1,45 @@
+"""notification digests
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_profile', schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column('notification_frequency', sa.String(length=10), server_default='immediate', nullable=False)
+        )
+
+    op.create_table(
+        'pending_notification',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('dataset_id', sa.Integer(), nullable=False),
+        sa.Column('community_id', sa.Integer(), nullable=True),
+        sa.Column('frequency', sa.String(length=10), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['community_id'], ['community.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['dataset_id'], ['data_set.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_pending_notification_frequency', 'pending_notification', ['frequency'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_pending_notification_frequency', table_name='pending_notification')
+    op.drop_table('pending_notification')
+
+    with op.batch_alter_table('user_profile', schema=None) as batch_op:
+        batch_op.drop_column('notification_frequency')
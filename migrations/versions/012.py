@@ -0,0 +1,41 @@
+"""follower counters on author and community
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('author', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('followers_count', sa.Integer(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('community', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('followers_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Contadores iniciales a partir de los seguimientos existentes
+    op.execute(
+        'UPDATE author SET followers_count = '
+        '(SELECT COUNT(*) FROM followauthor WHERE followauthor.author_id = author.id)'
+    )
+    op.execute(
+        'UPDATE community SET followers_count = '
+        '(SELECT COUNT(*) FROM followcommunity WHERE followcommunity.community_id = community.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('community', schema=None) as batch_op:
+        batch_op.drop_column('followers_count')
+
+    with op.batch_alter_table('author', schema=None) as batch_op:
+        batch_op.drop_column('followers_count')
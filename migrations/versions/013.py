@@ -0,0 +1,48 @@
+"""unique follows
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+FOLLOW_TABLES = (
+    ('followauthor', 'author_id', 'author', 'uq_followauthor_follower_author'),
+    ('followcommunity', 'community_id', 'community', 'uq_followcommunity_follower_community'),
+)
+
+
+def upgrade():
+    for table, column, target, constraint in FOLLOW_TABLES:
+        # Se conserva el seguimiento más antiguo de cada par (la tabla derivada lo permite también en MySQL)
+        op.execute(
+            f'DELETE FROM {table} WHERE id NOT IN ('
+            f'SELECT id FROM (SELECT MIN(id) AS id FROM {table} GROUP BY follower_id, {column}) AS keep)'
+        )
+        op.execute(
+            f'UPDATE {target} SET followers_count = '
+            f'(SELECT COUNT(*) FROM {table} WHERE {table}.{column} = {target}.id)'
+        )
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_unique_constraint(constraint, ['follower_id', column])
+            batch_op.create_index(f'ix_{table}_{column}_follower_id', [column, 'follower_id'], unique=False)
+
+
+def downgrade():
+    mysql = op.get_bind().dialect.name == 'mysql'
+    for table, column, target, constraint in reversed(FOLLOW_TABLES):
+        if mysql:
+            # MySQL/MariaDB borraron los índices de las claves ajenas al cubrirlos los nuevos: sin
+            # recrearlos antes, el DROP falla con "needed in a foreign key constraint"
+            op.create_index('follower_id', table, ['follower_id'], unique=False)
+            op.create_index(column, table, [column], unique=False)
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_{column}_follower_id')
+            batch_op.drop_constraint(constraint, type_='unique')
@@ -0,0 +1,39 @@
+"""timeline entries for the activity feed
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-20 09:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'timeline_entry',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('dataset_id', sa.Integer(), nullable=False),
+        sa.Column('community_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['community_id'], ['community.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['dataset_id'], ['data_set.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'dataset_id', name='uq_timeline_entry_user_dataset'),
+    )
+    op.create_index(
+        'ix_timeline_entry_user_id_created_at', 'timeline_entry', ['user_id', 'created_at', 'dataset_id'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_timeline_entry_user_id_created_at', table_name='timeline_entry')
+    op.drop_table('timeline_entry')
@@ -0,0 +1,24 @@
+"""community dataset index by status
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_community_dataset_community_id_status', 'community_dataset', ['community_id', 'status'], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_community_dataset_community_id_status', table_name='community_dataset')
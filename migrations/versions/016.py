@@ -0,0 +1,35 @@
+"""comment index and counter
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-20 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_comments_dataset_id_date_posted', 'comments', ['dataset_id', 'date_posted'], unique=False)
+
+    with op.batch_alter_table('data_set', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('comments_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Contadores iniciales a partir de los comentarios existentes
+    op.execute(
+        'UPDATE data_set SET comments_count = '
+        '(SELECT COUNT(*) FROM comments WHERE comments.dataset_id = data_set.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('data_set', schema=None) as batch_op:
+        batch_op.drop_column('comments_count')
+
+    op.drop_index('ix_comments_dataset_id_date_posted', table_name='comments')
@@ -0,0 +1,27 @@
+"""timeline entries sorted by dataset date
+
+Revision ID: 018
+Revises: 017
+Create Date: 2026-10-22 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '018'
+down_revision = '017'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # El feed pagina por la fecha del dataset, también en las entradas ya escritas
+    op.execute(
+        'UPDATE timeline_entry SET created_at = '
+        '(SELECT created_at FROM data_set WHERE data_set.id = timeline_entry.dataset_id)'
+    )
+
+
+def downgrade():
+    # La fecha de escritura anterior no se guarda; las entradas se quedan con la del dataset
+    pass
@@ -0,0 +1,11 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command("blobs:gc", help="Deletes stored upload blobs that no dataset or file references anymore.")
+@with_appcontext
+def blobs_gc():
+    from app.modules.hubfile.services import HubfileService
+
+    removed = HubfileService().collect_garbage()
+    click.echo(click.style(f"Removed {len(removed)} unreferenced blobs.", fg="green"))
@@ -0,0 +1,18 @@
+import click
+
+
+@click.command("jobs:worker", help="Runs a worker for the background jobs queue (requires JOBS_BACKEND=rq).")
+@click.option("--burst", is_flag=True, help="Exit once the queue is empty.")
+def jobs_worker(burst):
+    from redis import Redis
+    from rq import Queue, SimpleWorker
+
+    from app import app
+    from core.jobs.runner import set_worker_app
+
+    # Cada trabajo abre su propio contexto de aplicación en este mismo proceso (sin fork por trabajo)
+    set_worker_app(app)
+    connection = Redis.from_url(app.config["REDIS_URL"])
+    queue = Queue(app.config.get("JOBS_QUEUE", "rubikhub"), connection=connection)
+    click.echo(click.style(f"Listening on queue '{queue.name}'...", fg="green"))
+    SimpleWorker([queue], connection=connection).work(burst=burst, with_scheduler=True)
@@ -0,0 +1,12 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command("notifications:digest", help="Sends the hourly or daily digests of new datasets (run it from cron).")
+@click.argument("frequency", type=click.Choice(["hourly", "daily"]))
+@with_appcontext
+def notifications_digest(frequency):
+    from app.utils.notifications import send_digests
+
+    emails = send_digests(frequency)
+    click.echo(click.style(f"Queued {len(emails)} {frequency} digests.", fg="green"))
@@ -9,10 +9,11 @@ import click
 @click.option("-k", "keyword", help="Only run tests that match the given substring expression.")
 def test(module_name, keyword):
     base_path = os.path.join(os.getenv("WORKING_DIR", ""), "app/modules")
-    test_path = base_path
+    test_paths = [base_path, os.path.join(os.getenv("WORKING_DIR", ""), "core")]
 
     if module_name:
         test_path = os.path.join(base_path, module_name)
+        test_paths = [test_path]
         if not os.path.exists(test_path):
             click.echo(click.style(f"Module '{module_name}' does not exist.", fg="red"))
             return
@@ -20,7 +21,7 @@ def test(module_name, keyword):
     else:
         click.echo("Running tests for all modules...")
 
-    pytest_cmd = ["pytest", "-v", "--ignore-glob=*selenium*", test_path]
+    pytest_cmd = ["pytest", "-v", "--ignore-glob=*selenium*", *test_paths]
 
     if keyword:
         pytest_cmd.extend(["-k", keyword])
@@ -0,0 +1,11 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command("uploads:expire", help="Deletes abandoned resumable upload sessions and their files (run it from cron).")
+@with_appcontext
+def uploads_expire():
+    from app.modules.dataset.services import UploadSessionService
+
+    expired = UploadSessionService().expire_stale()
+    click.echo(click.style(f"Expired {expired} upload sessions.", fg="green"))